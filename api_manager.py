@@ -7,26 +7,111 @@
 """
 
 import asyncio
-import json
+import heapq
+import itertools
 import logging
-import re
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Set, Tuple
-
-import aiohttp
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional, Set, Tuple
 
 from config import (
+    BURST_MAX_POLL_RATE,
     BURST_MODE_DURATION,
+    BURST_MODE_INTERVAL,
+    CACHE_MAX_STALENESS,
     CACHE_TTL_MAX,
     CACHE_TTL_MIN,
     CACHE_TTL_NORMAL,
-    CSRF_TOKEN_TTL,
     FINAL_STATUSES,
+    FULL_RESYNC_INTERVAL,
+    INCREMENTAL_SYNC_ENABLED,
+    LOOKUP_COST_ALPHA,
+    SNAPSHOT_FILE,
+    SNAPSHOT_MAX_AGE,
+    SNAPSHOT_SAVE_INTERVAL,
 )
+from events import SNAPSHOT_DIFF_TOPIC, compute_diff, event_bus
+from http_client import http_pool
+from records import SENDER_SCHEMA, UPSTREAM_INDEX_MAP, SenderRecord
+from scheduler import Priority, Ticket, request_scheduler
 from stats import stats  # ✅ استيراد من ملف منفصل
+from storage import read_json, storage_writer
 
 logger = logging.getLogger(__name__)
 
+# ═══════════════════════════════════════════════════════════════
+# 🗂️ Account Index (فهارس ثابتة للـ snapshot)
+# ═══════════════════════════════════════════════════════════════
+
+
+def _empty_mapping() -> Mapping:
+    return MappingProxyType({})
+
+
+@dataclass(frozen=True)
+class AccountIndex:
+    """
+    فهارس Hash ثابتة (immutable) بتتبني مرة واحدة مع كل snapshot
+
+    - by_id: idAccount → الحساب
+    - by_email: Sender (lower) → الحساب
+    - by_group_status: (Group, STATUS) → tuple الحسابات
+    """
+
+    by_id: Mapping[str, Dict] = field(default_factory=_empty_mapping)
+    by_email: Mapping[str, Dict] = field(default_factory=_empty_mapping)
+    by_group_status: Mapping[Tuple[str, str], Tuple[Dict, ...]] = field(
+        default_factory=_empty_mapping
+    )
+
+    @classmethod
+    def build(cls, accounts: List[Dict]) -> "AccountIndex":
+        """بناء الفهارس في لفة واحدة (أول تطابق هو اللي يكسب زي البحث الخطي القديم)"""
+        by_id: Dict[str, Dict] = {}
+        by_email: Dict[str, Dict] = {}
+        by_group_status: Dict[Tuple[str, str], List[Dict]] = {}
+
+        for account in accounts:
+            account_id = str(account.get("idAccount", ""))
+            if account_id:
+                by_id.setdefault(account_id, account)
+
+            email = account.get("Sender", "").lower()
+            if email:
+                by_email.setdefault(email, account)
+
+            key = (account.get("Group", ""), account.get("Status", "").upper())
+            by_group_status.setdefault(key, []).append(account)
+
+        return cls(
+            by_id=MappingProxyType(by_id),
+            by_email=MappingProxyType(by_email),
+            by_group_status=MappingProxyType(
+                {key: tuple(group) for key, group in by_group_status.items()}
+            ),
+        )
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🎯 Burst Targets (عمر مستقل لكل حساب)
+# ═══════════════════════════════════════════════════════════════
+
+
+class BurstTarget:
+    """هدف Burst واحد: بدايته وموعد انتهائه وعدد الـ ticks اللي خدمته"""
+
+    __slots__ = ("account_id", "started_at", "deadline", "ticks")
+
+    def __init__(self, account_id: str, started_at: float, deadline: float):
+        self.account_id = account_id
+        self.started_at = started_at
+        self.deadline = deadline
+        self.ticks = 0
+
+
 # ═══════════════════════════════════════════════════════════════
 # 🧠 Smart Cache Manager (النسخة الهجينة النهائية - الأفضل)
 # ═══════════════════════════════════════════════════════════════
@@ -39,16 +124,19 @@ class SmartCacheManager:
     - ✅ Burst Mode جماعي فائق الكفاءة
     - ✅ Timeout Safety (حماية من التعليق)
     - Fallback mechanism
+    - 🗂️ فهارس O(1) للبحث بالـ ID / الإيميل / الجروب+الحالة
     """
 
     def __init__(self):
         self.cache: Optional[List[Dict]] = None
         self.cache_timestamp: Optional[datetime] = None
         self.cache_ttl: float = CACHE_TTL_NORMAL
+        self.index: AccountIndex = AccountIndex()
 
-        # ✅ نظام Burst Mode المحسّن
-        self.burst_targets: Set[str] = set()  # قائمة IDs الحسابات النشطة
-        self.burst_window_start: Optional[datetime] = None  # بداية النافذة الزمنية
+        # ✅ نظام Burst Mode: كل هدف ليه deadline خاص بيه (min-heap للانتهاء)
+        self.burst_targets: Dict[str, BurstTarget] = {}  # ID → الهدف النشط
+        self._burst_deadlines: List[Tuple[float, int, str]] = []
+        self._burst_seq = itertools.count()
 
         # Activity tracking for Smart TTL
         self.last_changes_count: int = 0
@@ -57,61 +145,130 @@ class SmartCacheManager:
         # Fallback
         self.last_successful_cache: Optional[List[Dict]] = None
         self.last_successful_timestamp: Optional[datetime] = None
+        self.last_successful_index: AccountIndex = AccountIndex()
+
+        # 🩹 الـ snapshot اتعلّم إنه محتاج تحديث (بعد add)
+        self.stale: bool = False
+
+        # 💾 Warm start: snapshot محمّل من الديسك (قديم لكن صالح للعرض)
+        self.warm_start: bool = False
+        self.last_persist: float = 0.0
 
     def is_cache_valid(self) -> bool:
-        """✅ التحقق الذكي: طالما فيه أهداف، الكاش غير صالح"""
-        if self.cache is None or self.cache_timestamp is None:
+        """✅ التحقق الذكي: طالما فيه أهداف، الكاش صالح لمدة tick واحد بس"""
+        if self.cache is None or self.cache_timestamp is None or self.stale:
             return False
 
-        # ✅ لو فيه حسابات في قائمة الانتظار، نحدّث باستمرار
-        if self.burst_targets:
+        # 💾 الـ warm start snapshot عمره ما بيتحسب صالح (مهما كان جديد)
+        # → أي fetch بيجيب من الموقع، والبحث بس بيرد بيه عن طريق stale-while-revalidate
+        if self.warm_start:
             return False
 
         age = (datetime.now() - self.cache_timestamp).total_seconds()
+
+        # ✅ لو فيه حسابات في قائمة الانتظار، الـ Burst ticker بيحدّث كل tick
+        # فأي طلب تاني في نفس الـ tick بياخد نفس النسخة
+        if self.burst_mode_active:
+            return age < BURST_MODE_INTERVAL
+
         return age < self.cache_ttl
 
+    def age(self) -> Optional[float]:
+        """عمر الـ snapshot الحالي بالثواني (None لو الـ cache فاضي)"""
+        if self.cache is None or self.cache_timestamp is None:
+            return None
+        return (datetime.now() - self.cache_timestamp).total_seconds()
+
+    # ───────────────────────────────────────────────────────────
+    # 🚀 Burst Mode (deadline لكل هدف)
+    # ───────────────────────────────────────────────────────────
+
+    @property
+    def burst_mode_active(self) -> bool:
+        """فيه أهداف Burst لسه وقتها ما خلصش؟"""
+        self.check_burst_mode()
+        return bool(self.burst_targets)
+
     def activate_burst_mode(self, account_id: str):
-        """✅ تفعيل Burst لحساب معين (مع تتبع البداية)"""
+        """✅ تفعيل Burst لحساب معين لمدة BURST_MODE_DURATION من دلوقتي"""
         global stats
 
-        # لو دي أول إضافة، سجّل البداية
-        if not self.burst_targets:
-            self.burst_window_start = datetime.now()
-            stats.burst_activations += 1
-            logger.info(f"🚀 BURST MODE ACTIVATED (first target: {account_id})")
+        now = time.monotonic()
+        deadline = now + BURST_MODE_DURATION
+
+        target = self.burst_targets.get(account_id)
+        if target is None:
+            if not self.burst_targets:
+                stats.burst_activations += 1
+                logger.info(f"🚀 BURST MODE ACTIVATED (first target: {account_id})")
+            target = self.burst_targets[account_id] = BurstTarget(
+                account_id, now, deadline
+            )
+        else:
+            # إعادة تفعيل → نمد عمره (الـ entry القديم في الـ heap بيتشال lazy)
+            target.deadline = deadline
 
-        self.burst_targets.add(account_id)
+        heapq.heappush(
+            self._burst_deadlines, (deadline, next(self._burst_seq), account_id)
+        )
         logger.info(
             f"🎯 Added {account_id} to burst targets. Total: {len(self.burst_targets)}"
         )
 
     def deactivate_burst_target(self, account_id: str):
-        """✅ إزالة حساب من قائمة الـ Burst (إزالة فردية)"""
-        if account_id in self.burst_targets:
-            self.burst_targets.discard(account_id)
-            logger.info(
-                f"✅ Deactivated burst for {account_id}. Remaining: {len(self.burst_targets)}"
-            )
+        """✅ إزالة حساب من قائمة الـ Burst (وصل لحالة نهائية)"""
+        target = self.burst_targets.pop(account_id, None)
+        if target is None:
+            return
 
-            # لو القائمة فضت، امسح البداية
-            if not self.burst_targets:
-                self.burst_window_start = None
-                logger.info("⚡ BURST MODE DEACTIVATED (all targets processed)")
+        self._record_burst_target(target, resolved=True)
+        logger.info(
+            f"✅ Deactivated burst for {account_id} after "
+            f"{time.monotonic() - target.started_at:.1f}s / {target.ticks} ticks. "
+            f"Remaining: {len(self.burst_targets)}"
+        )
+        if not self.burst_targets:
+            logger.info("⚡ BURST MODE DEACTIVATED (all targets processed)")
 
     def check_burst_mode(self):
-        """✅ فحص الـ timeout وإلغاء الـ Burst لو تعدى الوقت المسموح"""
-        if not self.burst_targets or not self.burst_window_start:
-            return
+        """✅ شيل الأهداف اللي الـ deadline بتاعها عدى بس (O(log n) لكل هدف)"""
+        now = time.monotonic()
+        heap = self._burst_deadlines
+
+        while heap and heap[0][0] <= now:
+            deadline, _, account_id = heapq.heappop(heap)
+            target = self.burst_targets.get(account_id)
 
-        elapsed = (datetime.now() - self.burst_window_start).total_seconds()
+            # entry قديم (الهدف اتشال أو اتمد عمره)
+            if target is None or target.deadline != deadline:
+                continue
 
-        if elapsed >= BURST_MODE_DURATION:
-            # ⚠️ Timeout - امسح كل القائمة
+            del self.burst_targets[account_id]
+            self._record_burst_target(target, resolved=False)
             logger.warning(
-                f"⏱️ BURST MODE TIMEOUT after {elapsed:.1f}s - clearing {len(self.burst_targets)} targets"
+                f"⏱️ BURST TIMEOUT for {account_id} after {BURST_MODE_DURATION}s "
+                f"({target.ticks} ticks). Remaining: {len(self.burst_targets)}"
             )
-            self.burst_targets.clear()
-            self.burst_window_start = None
+
+        if not self.burst_targets:
+            heap.clear()
+
+    def record_burst_tick(self, account_ids):
+        """تسجيل tick خدم الأهداف دي"""
+        for account_id in account_ids:
+            target = self.burst_targets.get(account_id)
+            if target is not None:
+                target.ticks += 1
+
+    def _record_burst_target(self, target: BurstTarget, resolved: bool):
+        global stats
+
+        if resolved:
+            stats.burst_targets_resolved += 1
+        else:
+            stats.burst_targets_expired += 1
+        stats.burst_target_seconds += time.monotonic() - target.started_at
+        stats.burst_target_ticks += target.ticks
 
     def adjust_ttl(self, changes_detected: int):
         """
@@ -148,19 +305,188 @@ class SmartCacheManager:
                 f"🎯 TTL adjusted: {old_ttl:.0f}s → {self.cache_ttl:.0f}s (changes={changes_detected})"
             )
 
-    def update_cache(self, new_data: List[Dict], success: bool = True):
-        """تحديث الـ cache مع fallback mechanism"""
+    def update_cache(
+        self,
+        new_data: List[Dict],
+        success: bool = True,
+        fetched_at: Optional[datetime] = None,
+    ):
+        """
+        تحديث الـ cache مع fallback mechanism (والفهارس معاه)
+
+        📣 مع كل snapshot ناجح بنحسب الفرق عن اللي قبله وننشره على الـ event bus
+
+        Args:
+            fetched_at: وقت البيانات لو مش جاية من fetch دلوقتي (patch محلي
+                بيحتفظ بعمر الـ snapshot الأصلي وحالته)
+        """
         if success:
+            new_index = AccountIndex.build(new_data)
+            diff = compute_diff(self.last_successful_index.by_id, new_index.by_id)
+
             self.cache = new_data
-            self.cache_timestamp = datetime.now()
+            self.cache_timestamp = fetched_at or datetime.now()
+            self.index = new_index
             self.last_successful_cache = new_data
-            self.last_successful_timestamp = datetime.now()
+            self.last_successful_timestamp = self.cache_timestamp
+            self.last_successful_index = new_index
+
+            if fetched_at is None:
+                self.warm_start = False
+                self.stale = False
+
+            if not diff.is_empty:
+                logger.debug(f"📣 Snapshot diff: {diff.summary()}")
+                event_bus.publish(SNAPSHOT_DIFF_TOPIC, diff)
+
+            self._schedule_persist()
         else:
             # فشل التحديث - نستخدم آخر نسخة ناجحة
             logger.warning("⚠️ Cache update failed, using last successful cache")
             if self.last_successful_cache:
                 self.cache = self.last_successful_cache
                 self.cache_timestamp = self.last_successful_timestamp
+                self.index = self.last_successful_index
+
+    def merge_changes(
+        self, changed: List[Dict], fetched_at: Optional[datetime] = None
+    ) -> List[Dict]:
+        """
+        🔀 دمج الصفوف المتغيرة بس (Incremental sync) في آخر snapshot ناجح
+
+        - صف موجود → يتبدل بالنسخة الجديدة (نفس المكان)
+        - صف جديد → يتضاف في الآخر
+        - الصفوف المحذوفة بتتصلح في الـ full resync الدوري
+        """
+        changed_by_id = {str(row.get("idAccount", "")): row for row in changed}
+        base = self.last_successful_cache or []
+
+        merged = [
+            changed_by_id.pop(str(row.get("idAccount", "")), row) for row in base
+        ]
+        merged.extend(changed_by_id.values())
+
+        self.update_cache(merged, success=True, fetched_at=fetched_at)
+        return merged
+
+    def patch_account(self, account_id: str, **changes: str) -> bool:
+        """
+        🩹 تعديل حساب واحد في الـ snapshot بعد عملية كتابة (edit) من غير refetch
+
+        الـ snapshot بيحتفظ بعمره الأصلي - الـ patch مش بيعتبر تحديث من الموقع
+        """
+        current = self.last_successful_index.by_id.get(str(account_id))
+        if current is None:
+            return False
+
+        if isinstance(current, SenderRecord):
+            patched = current.replace(**changes)
+        else:
+            patched = {**current, **changes}
+
+        self.merge_changes([patched], fetched_at=self.last_successful_timestamp)
+        logger.info(f"🩹 Patched account {account_id} in cache: {list(changes)}")
+        return True
+
+    def mark_stale(self):
+        """
+        الـ snapshot محتاج تحديث (بعد add مثلاً) من غير ما نرميه
+
+        البحث بيفضل يرد منه (stale-while-revalidate)، والحساب اللي مش موجود
+        فيه بيعمل sync (delta لو الـ incremental مفعّل)
+        """
+        self.stale = True
+
+    # ───────────────────────────────────────────────────────────
+    # 💾 Warm start snapshot
+    # ───────────────────────────────────────────────────────────
+
+    def persist_snapshot(self) -> bool:
+        """
+        حفظ آخر snapshot ناجح بشكل columnar مضغوط (أعمدة مرة واحدة + صفوف قيم)
+
+        الصفوف بتتنسخ هنا والتحويل لـ JSON والكتابة (atomic) في storage_writer
+        """
+        accounts = self.last_successful_cache
+        saved_at = self.last_successful_timestamp
+        if not accounts or saved_at is None:
+            return False
+
+        payload = {
+            "v": 1,
+            "saved_at": saved_at.isoformat(),
+            "columns": SENDER_SCHEMA.columns,
+            "rows": [
+                account.values_tuple
+                if isinstance(account, SenderRecord)
+                else [str(account.get(c) or "") for c in SENDER_SCHEMA.columns]
+                for account in accounts
+            ],
+        }
+
+        storage_writer.write_json(SNAPSHOT_FILE, payload)
+        logger.debug(f"💾 Snapshot queued ({len(accounts)} accounts)")
+        return True
+
+    def _schedule_persist(self):
+        """حفظ throttled (الكتابة نفسها في storage_writer بعيد عن الـ event loop)"""
+        now = time.monotonic()
+        if now - self.last_persist < SNAPSHOT_SAVE_INTERVAL:
+            return
+
+        self.last_persist = now
+        self.persist_snapshot()
+
+    def load_snapshot(self) -> bool:
+        """
+        💾 تحميل آخر snapshot من الديسك عند التشغيل
+
+        الـ cache بيتحمل بوقته الأصلي و warm_start=True → is_cache_valid() بترجع
+        False لحد أول fetch حقيقي، فالمراقبة عمرها ما بتقارن بالنسخة دي،
+        والبحث بس بيرد منها فوراً (stale-while-revalidate)
+        """
+        path = Path(SNAPSHOT_FILE)
+        if self.cache is not None or not path.exists():
+            return False
+
+        try:
+            payload = read_json(path)
+
+            saved_at = datetime.fromisoformat(payload["saved_at"])
+            age = (datetime.now() - saved_at).total_seconds()
+            if age > SNAPSHOT_MAX_AGE:
+                logger.info(f"💾 Snapshot too old ({age:.0f}s) - skipping warm start")
+                return False
+
+            columns = payload["columns"]
+            if tuple(columns) == SENDER_SCHEMA.columns:
+                accounts = [SENDER_SCHEMA.from_values(row) for row in payload["rows"]]
+            else:
+                # الأعمدة اتغيرت في config من آخر حفظ
+                accounts = [
+                    SENDER_SCHEMA.from_dict(dict(zip(columns, row)))
+                    for row in payload["rows"]
+                ]
+
+        except Exception as e:
+            logger.error(f"❌ Snapshot load error: {e}")
+            return False
+
+        self.cache = accounts
+        self.cache_timestamp = saved_at
+        self.index = AccountIndex.build(accounts)
+        self.last_successful_cache = accounts
+        self.last_successful_timestamp = saved_at
+        self.last_successful_index = self.index
+        self.warm_start = True
+
+        logger.info(f"💾 Warm start: {len(accounts)} accounts (age {age:.0f}s)")
+        return True
+
+    def invalidate(self):
+        """إلغاء الـ cache لإجبار تحديث في الطلب الجاي"""
+        self.cache = None
+        self.cache_timestamp = None
 
     def get_cache(self) -> Optional[List[Dict]]:
         """الحصول على الـ cache"""
@@ -168,34 +494,202 @@ class SmartCacheManager:
 
     def get_account_by_id(self, account_id: str) -> Optional[Dict]:
         """
-        🎯 البحث بالـ ID (أكثر أماناً من البحث بالإيميل)
+        🎯 البحث بالـ ID (أكثر أماناً من البحث بالإيميل) - O(1)
         """
         if not self.cache:
             return None
 
-        for account in self.cache:
-            if str(account.get("idAccount", "")) == str(account_id):
-                return account
-
-        return None
+        return self.index.by_id.get(str(account_id))
 
     def get_account_by_email(self, email: str) -> Optional[Dict]:
-        """البحث بالإيميل (للبحث الأولي)"""
+        """البحث بالإيميل (للبحث الأولي) - O(1)"""
         if not self.cache:
             return None
 
-        email = email.lower().strip()
-        for account in self.cache:
-            if account.get("Sender", "").lower() == email:
-                return account
+        return self.index.by_email.get(email.lower().strip())
 
-        return None
+    def get_accounts_by_group_status(
+        self, group: str, status: str
+    ) -> Tuple[Dict, ...]:
+        """كل الحسابات في جروب معين بحالة معينة - O(k)"""
+        if not self.cache:
+            return ()
+
+        return self.index.by_group_status.get((group, status.upper()), ())
 
 
 # Global smart cache
 smart_cache = SmartCacheManager()
 
 
+# ═══════════════════════════════════════════════════════════════
+# ⏱️ Burst Coordinator (Ticker مشترك لكل حسابات الـ Burst)
+# ═══════════════════════════════════════════════════════════════
+
+
+class BurstCoordinator:
+    """
+    منسق Burst مشترك:
+    - Ticker واحد بيعمل batch fetch واحد كل BURST_MODE_INTERVAL
+    - كل حساب منتظر بياخد Future خاص بيه ويصحى بنتيجته بعد الـ tick
+    - تكلفة N حساب في Burst = طلب واحد لكل tick (مش N طلب)
+    - أقصى معدل fetch = BURST_MAX_POLL_RATE، ولو الـ snapshot اتحدث من
+      مصدر تاني خلال الفاصل ده الـ tick بيستخدمه من غير fetch
+    """
+
+    def __init__(self, api_manager: "OptimizedAPIManager"):
+        self.api_manager = api_manager
+        self._waiters: Dict[str, List[asyncio.Future]] = {}
+        self._ticker: Optional[asyncio.Task] = None
+
+        # 🚦 حد المعدل (محفوظ بين تشغيلات الـ ticker)
+        self._last_fetch: float = 0.0
+        self._own_snapshot: Optional[datetime] = None  # الـ snapshot اللي جابه آخر tick
+
+    @property
+    def waiting_count(self) -> int:
+        """عدد الحسابات المنتظرة للـ tick الجاي"""
+        return len(self._waiters)
+
+    async def wait_for_update(self, account_id: str) -> Optional[Dict]:
+        """
+        انتظار الـ tick الجاي والحصول على بيانات الحساب منه
+
+        Returns:
+            بيانات الحساب أو None لو مش موجود في الـ batch
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(account_id, []).append(future)
+        self._ensure_ticker()
+
+        try:
+            return await future
+        finally:
+            # لو المنتظر اتلغى قبل الـ tick، شيله من القائمة
+            futures = self._waiters.get(account_id)
+            if futures and future in futures:
+                futures.remove(future)
+                if not futures:
+                    del self._waiters[account_id]
+
+    def _ensure_ticker(self):
+        if self._ticker is None or self._ticker.done():
+            self._ticker = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        """الـ Ticker: يشتغل طول ما فيه منتظرين ويقف لوحده لما يفضوا"""
+        global stats
+
+        logger.info("⏱️ Burst ticker started")
+
+        min_gap = max(BURST_MODE_INTERVAL, 1.0 / BURST_MAX_POLL_RATE)
+
+        while self._waiters:
+            # 🚦 مش أسرع من BURST_MAX_POLL_RATE مهما كان عدد الأهداف
+            await asyncio.sleep(
+                max(
+                    BURST_MODE_INTERVAL,
+                    self._last_fetch + min_gap - time.monotonic(),
+                )
+            )
+
+            # المنتظرين اللي يوصلوا أثناء الـ fetch هيتخدموا في الـ tick الجاي
+            waiters, self._waiters = self._waiters, {}
+            if not waiters:
+                continue
+
+            smart_cache.check_burst_mode()
+            smart_cache.record_burst_tick(waiters)
+
+            age = smart_cache.age()
+            if (
+                age is not None
+                and age < min_gap
+                and not smart_cache.stale
+                and smart_cache.cache_timestamp != self._own_snapshot
+            ):
+                # ♻️ حد تاني (بحث / المراقب) جاب snapshot طازة خلال الفاصل ده
+                stats.burst_ticks_reused += 1
+            else:
+                stats.burst_ticks += 1
+                self._last_fetch = time.monotonic()
+                try:
+                    await self.api_manager.fetch_all_accounts_batch(
+                        force_refresh=True, priority=Priority.BURST
+                    )
+                except Exception as e:
+                    logger.error(f"❌ Burst tick fetch error: {e}")
+                    stats.errors += 1
+                self._own_snapshot = smart_cache.cache_timestamp
+
+            for account_id, futures in waiters.items():
+                account = smart_cache.get_account_by_id(account_id)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(account)
+
+            logger.debug(f"⏱️ Burst tick served {len(waiters)} accounts")
+
+        logger.info("⏱️ Burst ticker stopped (no waiters)")
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧮 Lookup Planner (delta ولا full batch؟)
+# ═══════════════════════════════════════════════════════════════
+
+
+class LookupPlanner:
+    """
+    اختيار أرخص طريق لحساب مش موجود في الـ snapshot:
+
+    - delta: updateSenderPage بالـ marker (الصفوف المتغيرة بس) - رخيص لكن ممكن
+      ما يجيبش الحساب (انحراف/حساب مش موجود) فنحتاج full بعده
+    - full: الجدول كامل - غالي لكن مضمون
+
+    التكلفة المتوقعة لـ delta = cost(delta) + P(miss) × cost(full)
+    و P(miss) لـ k lookup مستنيين = 1 - (1 - miss_rate)^k
+    التكاليف والـ miss rate متوسطات متحركة (EWMA) من الطلبات الفعلية
+    """
+
+    def __init__(self, alpha: float = LOOKUP_COST_ALPHA):
+        self.alpha = alpha
+        self.costs: Dict[str, Optional[float]] = {"delta": None, "full": None}
+        self.delta_miss_rate: float = 0.0
+
+    def _ewma(self, old: Optional[float], value: float) -> float:
+        return value if old is None else old + self.alpha * (value - old)
+
+    def record_cost(self, path: str, seconds: float):
+        self.costs[path] = self._ewma(self.costs[path], seconds)
+
+    def record_delta_result(self, resolved: bool):
+        self.delta_miss_rate = self._ewma(
+            self.delta_miss_rate, 0.0 if resolved else 1.0
+        )
+
+    def choose(self, pending: int) -> str:
+        """المسار الأرخص لـ pending lookup مش موجودين في الـ snapshot"""
+        delta_cost = self.costs["delta"]
+        full_cost = self.costs["full"]
+
+        # لسه ما قسناش واحد منهم → نجرب delta (أرخص في الغالب)
+        if delta_cost is None or full_cost is None:
+            return "delta"
+
+        miss_probability = 1 - (1 - self.delta_miss_rate) ** max(pending, 1)
+        expected_delta = delta_cost + miss_probability * full_cost
+        return "delta" if expected_delta < full_cost else "full"
+
+    def summary(self) -> str:
+        def fmt(value):
+            return "n/a" if value is None else f"{value * 1000:.0f}ms"
+
+        return (
+            f"delta={fmt(self.costs['delta'])} full={fmt(self.costs['full'])} "
+            f"miss={self.delta_miss_rate:.0%}"
+        )
+
+
 # ═══════════════════════════════════════════════════════════════
 # 🔐 Optimized API Manager
 # ═══════════════════════════════════════════════════════════════
@@ -209,66 +703,134 @@ class OptimizedAPIManager:
         self.cookies = config["website"]["cookies"]
         self.defaults = config["website"]["defaults"]
 
-        # CSRF Token cache
-        self.csrf_token = None
-        self.csrf_expires_at = None
-
-        # aiohttp session
+        # 🔌 Session + CSRF مشتركين مع باقي الموديولات
+        http_pool.configure(self.base_url, self.cookies)
         self.session = None
 
+        # 🔗 Single-flight: الـ batch اللي شغال حالياً (لو فيه) + تذكرته في الـ scheduler
+        self._inflight_batch: Optional[asyncio.Task] = None
+        self._inflight_ticket: Optional[Ticket] = None
+
+        # 🔀 Incremental sync: آخر marker من الموقع + وقت آخر full sync
+        self.sync_marker: Optional[str] = None
+        self.last_full_sync: Optional[datetime] = None
+
+        # ⏱️ Ticker مشترك لكل حسابات الـ Burst
+        self.burst = BurstCoordinator(self)
+
+        # 🧮 اختيار delta/full للحسابات اللي مش في الـ snapshot
+        self.planner = LookupPlanner()
+        self._pending_lookups: Set[str] = set()
+
     async def initialize(self):
         """Initialize API manager"""
         await self._ensure_session()
+
+        # 💾 Warm start: نرد من آخر snapshot محفوظ ونحدّث في الخلفية
+        if smart_cache.load_snapshot():
+            self._revalidate_in_background()
+
         logger.info("🚀 API Manager initialized (Hybrid Mode)")
 
-    async def _ensure_session(self):
-        """Ensure aiohttp session exists"""
-        if self.session is None or self.session.closed:
-            connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
-            timeout = aiohttp.ClientTimeout(total=30)
+    def _revalidate_in_background(self):
+        """تشغيل batch fetch في الخلفية (لو مفيش واحد شغال بالفعل)"""
+        if self._inflight_batch is not None and not self._inflight_batch.done():
+            return
+        stats.background_revalidations += 1
+        self._start_batch(Priority.BACKGROUND)
+
+    def _start_batch(
+        self, priority: Priority, incremental: Optional[bool] = None
+    ) -> asyncio.Task:
+        """بدء batch جديد بتذكرة في الـ scheduler (المنضمين بعدين ممكن يرقوها)"""
+        self._inflight_ticket = Ticket(priority)
+        self._inflight_batch = asyncio.ensure_future(
+            self._fetch_batch_upstream(
+                ticket=self._inflight_ticket, incremental=incremental
+            )
+        )
+        return self._inflight_batch
+
+    async def _ensure_fresh_cache(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+        max_staleness: Optional[float] = None,
+    ) -> bool:
+        """
+        ♻️ Stale-while-revalidate قبل البحث
 
-            self.session = aiohttp.ClientSession(
-                connector=connector, timeout=timeout, cookies=self.cookies
+        - الـ cache صالح → مفيش حاجة
+        - قديم لكن عمره ≤ max_staleness → نرد بيه فوراً + revalidation واحد في الخلفية
+        - أقدم من كده (أو فاضي) → fetch متزامن
+
+        Args:
+            max_staleness: أقصى عمر مقبول للطالب ده (None = CACHE_MAX_STALENESS،
+                أو عمر الـ warm start snapshot لو لسه ما اتحدثش)، 0 = لازم بيانات طازة
+
+        Returns:
+            True لو الرد هيكون من snapshot قديم
+        """
+        if smart_cache.is_cache_valid():
+            return False
+
+        if max_staleness is None:
+            # 💾 الـ warm start snapshot بيترد بيه لحد أول تحديث مهما كان عمره
+            max_staleness = (
+                SNAPSHOT_MAX_AGE if smart_cache.warm_start else CACHE_MAX_STALENESS
             )
 
-    async def get_csrf_token(self, force_refresh: bool = False) -> Optional[str]:
-        """Get CSRF token with caching"""
-        global stats
+        age = smart_cache.age()
+        if age is not None and age <= max_staleness:
+            stats.stale_serves += 1
+            self._revalidate_in_background()
+            return True
 
-        if not force_refresh and self.csrf_token and self.csrf_expires_at:
-            if datetime.now() < self.csrf_expires_at:
-                stats.cache_hits += 1  # ✅ رجعنا التتبع
-                return self.csrf_token
+        await self.fetch_all_accounts_batch(priority=priority)
+        return False
 
-        logger.info("🔄 Fetching CSRF token...")
-        stats.csrf_refreshes += 1  # ✅ رجعنا التتبع
-        stats.total_requests += 1  # ✅ رجعنا التتبع
+    async def get_snapshot(
+        self,
+        max_staleness: Optional[float] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> Tuple[List[Dict], Optional[float]]:
+        """
+        ♻️ الـ snapshot الحالي + عمره بالثواني (من غير انتظار لو عمره مقبول)
+        """
+        await self._ensure_fresh_cache(priority, max_staleness)
+        return smart_cache.get_cache() or [], smart_cache.age()
 
-        await self._ensure_session()
+    @property
+    def csrf_token(self) -> Optional[str]:
+        return http_pool.csrf_token
 
-        try:
-            async with self.session.get(f"{self.base_url}/senderPage") as response:
-                if response.status == 200:
-                    html = await response.text()
-                    match = re.search(
-                        r'<meta name="csrf-token" content="([^"]+)"', html
-                    )
-                    if match:
-                        self.csrf_token = match.group(1)
-                        self.csrf_expires_at = datetime.now() + timedelta(
-                            seconds=CSRF_TOKEN_TTL
-                        )
-                        logger.info(f"✅ CSRF cached ({CSRF_TOKEN_TTL}s)")
-                        return self.csrf_token
-        except Exception as e:
-            logger.error(f"❌ CSRF fetch error: {e}")
-            stats.errors += 1  # ✅ رجعنا التتبع
+    @property
+    def csrf_expires_at(self) -> Optional[datetime]:
+        return http_pool.csrf_expires_at
 
-        return None
+    async def _ensure_session(self):
+        """Ensure the shared aiohttp session exists"""
+        self.session = await http_pool.get_session()
 
-    async def fetch_all_accounts_batch(self, force_refresh: bool = False) -> List[Dict]:
+    async def get_csrf_token(
+        self,
+        force_refresh: bool = False,
+        priority: Priority = Priority.INTERACTIVE,
+        ticket: Optional[Ticket] = None,
+    ) -> Optional[str]:
+        """Get CSRF token (مشترك عن طريق http_pool)"""
+        return await http_pool.get_csrf_token(force_refresh, priority, ticket)
+
+    async def fetch_all_accounts_batch(
+        self,
+        force_refresh: bool = False,
+        priority: Priority = Priority.BACKGROUND,
+        incremental: Optional[bool] = None,
+    ) -> List[Dict]:
         """
         🎯 جلب مركزي للحسابات مع Smart Cache
+
+        🔗 Single-flight: لو فيه batch شغال بالفعل، كل الطلبات المتزامنة
+        بتستنى نفس الطلب وبتاخد نفس النتيجة بدل ما كل واحد يبعت POST لوحده
         """
         global stats
 
@@ -279,20 +841,73 @@ class OptimizedAPIManager:
             if cached:
                 return cached
 
-        logger.info("🔄 Batch fetch...")
+        # 🔗 انضم للطلب الشغال لو موجود (نتيجته أحدث من أي cache)
+        if self._inflight_batch is not None and not self._inflight_batch.done():
+            stats.coalesced_fetches += 1
+            logger.debug("🔗 Joining in-flight batch fetch")
+            # 🚦 لو المنضم أهم من صاحب الطلب، الطلب كله يترقى في الطابور
+            request_scheduler.promote(self._inflight_ticket, priority)
+            return await asyncio.shield(self._inflight_batch)
+
+        # shield: إلغاء أحد المنتظرين ما يلغيش الطلب على الباقيين
+        return await asyncio.shield(self._start_batch(priority, incremental))
+
+    def _should_sync_incrementally(self) -> bool:
+        """
+        Incremental لو: مفعّل + عندنا marker + snapshot سابق
+        + آخر full sync لسه أحدث من FULL_RESYNC_INTERVAL (تصحيح الانحراف)
+        """
+        if not INCREMENTAL_SYNC_ENABLED:
+            return False
+
+        if not self.sync_marker or smart_cache.last_successful_cache is None:
+            return False
+
+        if self.last_full_sync is None:
+            return False
+
+        age = (datetime.now() - self.last_full_sync).total_seconds()
+        return age < FULL_RESYNC_INTERVAL
+
+    async def _fetch_batch_upstream(
+        self,
+        retry_on_csrf: bool = True,
+        incremental: Optional[bool] = None,
+        ticket: Optional[Ticket] = None,
+    ) -> List[Dict]:
+        """
+        الطلب الفعلي لـ updateSenderPage (يتنفذ مرة واحدة لكل مجموعة متزامنة)
+
+        - Full: date="0" → الجدول كامل
+        - Incremental: date=<آخر marker> → الصفوف المتغيرة بس وبتتدمج في الـ snapshot
+        """
+        global stats
+
+        ticket = ticket or Ticket(Priority.BACKGROUND)
+        if incremental is None:
+            incremental = self._should_sync_incrementally()
+
+        logger.info(f"🔄 Batch fetch ({'incremental' if incremental else 'full'})...")
         stats.batch_fetches += 1  # ✅ رجعنا التتبع
         stats.total_requests += 1  # ✅ رجعنا التتبع
+        if incremental:
+            stats.incremental_fetches += 1
 
-        csrf = await self.get_csrf_token()
+        csrf = await self.get_csrf_token(priority=ticket.priority, ticket=ticket)
         if not csrf:
             # استخدام Fallback
             smart_cache.update_cache([], success=False)
             return smart_cache.get_cache() or []
 
         await self._ensure_session()
+        await request_scheduler.acquire(ticket.priority, ticket)
 
         try:
-            payload = {"date": "0", "bigUpdate": "0", "csrf_token": csrf}
+            date = self.sync_marker if incremental else "0"
+            payload = {"date": date, "bigUpdate": "0", "csrf_token": csrf}
+            # الـ marker الجديد = وقت بداية الطلب (لو الموقع ما رجعش marker بنفسه)
+            request_marker = str(int(time.time()))
+            started = time.monotonic()
 
             async with self.session.post(
                 f"{self.base_url}/dataFunctions/updateSenderPage", data=payload
@@ -304,46 +919,41 @@ class OptimizedAPIManager:
                     if "data" in data:
                         accounts = data["data"]
 
-                        INDEX_MAP = {
-                            "idAccount": 0,
-                            "image": 1,
-                            "Sender": 2,
-                            "Start": 3,
-                            "Last Update": 4,
-                            "Taken": 5,
-                            "Status": 6,
-                            "Available": 7,
-                            "password": 8,
-                            "backupCodes": 9,
-                            "Group": 10,
-                            "groupNameId": 11,
-                            "Take": 12,
-                            "Keep": 13,
-                        }
-
-                        parsed = []
-                        for account in accounts:
-                            if len(account) > INDEX_MAP["Sender"]:
-                                acc = {}
-                                for key, idx in INDEX_MAP.items():
-                                    acc[key] = (
-                                        str(account[idx])
-                                        if idx < len(account) and account[idx]
-                                        else ""
-                                    )
-                                parsed.append(acc)
+                        # 🧱 صفوف مضغوطة (SenderRecord) بالأعمدة المطلوبة بس
+                        parsed = [
+                            SENDER_SCHEMA.from_row(account)
+                            for account in accounts
+                            if len(account) > UPSTREAM_INDEX_MAP["Sender"]
+                        ]
+
+                        self.sync_marker = str(data.get("date") or request_marker)
+                        self.planner.record_cost(
+                            "delta" if incremental else "full",
+                            time.monotonic() - started,
+                        )
 
                         # تحديث الـ cache
+                        if incremental:
+                            snapshot = smart_cache.merge_changes(parsed)
+                            logger.info(
+                                f"✅ Synced {len(parsed)} changed accounts "
+                                f"(total {len(snapshot)}, TTL={smart_cache.cache_ttl:.0f}s)"
+                            )
+                            return snapshot
+
                         smart_cache.update_cache(parsed, success=True)
+                        self.last_full_sync = datetime.now()
 
                         logger.info(
                             f"✅ Fetched {len(parsed)} accounts (TTL={smart_cache.cache_ttl:.0f}s)"
                         )
                         return parsed
 
-                elif response.status in [403, 419]:
-                    self.csrf_token = None
-                    return await self.fetch_all_accounts_batch(force_refresh=True)
+                elif response.status in [403, 419] and retry_on_csrf:
+                    http_pool.invalidate_csrf()
+                    return await self._fetch_batch_upstream(
+                        retry_on_csrf=False, incremental=incremental, ticket=ticket
+                    )
 
         except Exception as e:
             logger.error(f"❌ Batch fetch error: {e}")
@@ -353,23 +963,113 @@ class OptimizedAPIManager:
 
         return smart_cache.get_cache() or []
 
-    async def search_sender_by_id(self, account_id: str) -> Optional[Dict]:
+    async def _refresh_for_lookup(self, key: str, lookup, priority: Priority):
+        """
+        🧮 الحساب مش في الـ snapshot: تحديث بأرخص طريق (delta أو full)
+
+        Args:
+            key: مفتاح الـ lookup (لعدّ الـ lookups المختلفة المستنية)
+            lookup: دالة بتدور في الـ snapshot بعد التحديث
+        """
+        global stats
+
+        self._pending_lookups.add(key)
+        try:
+            # 🔗 فيه batch شغال بالفعل؟ ننضم له الأول
+            # (لو ما جابش الحساب، delta تاني وراه مش هيفرق → full على طول)
+            joined = (
+                self._inflight_batch is not None and not self._inflight_batch.done()
+            )
+            if joined:
+                await self.fetch_all_accounts_batch(priority=priority)
+                account = lookup()
+                if account is not None:
+                    return account
+
+            use_delta = not joined and self._should_sync_incrementally()
+            if use_delta:
+                use_delta = self.planner.choose(len(self._pending_lookups)) == "delta"
+
+            if use_delta:
+                stats.lookup_delta_decisions += 1
+                await self.fetch_all_accounts_batch(
+                    force_refresh=True, priority=priority, incremental=True
+                )
+                account = lookup()
+                self.planner.record_delta_result(account is not None)
+                if account is not None:
+                    return account
+                stats.lookup_delta_misses += 1
+
+            stats.lookup_full_decisions += 1
+            await self.fetch_all_accounts_batch(
+                force_refresh=True, priority=priority, incremental=False
+            )
+            return lookup()
+        finally:
+            self._pending_lookups.discard(key)
+
+    async def search_sender_by_id(
+        self,
+        account_id: str,
+        priority: Priority = Priority.INTERACTIVE,
+        max_staleness: Optional[float] = None,
+    ) -> Optional[Dict]:
         """
         🎯 البحث بالـ ID (أكثر أماناً)
         """
-        # تحديث الـ cache إذا لزم الأمر
-        if not smart_cache.is_cache_valid():
-            await self.fetch_all_accounts_batch()
+        # تحديث الـ cache إذا لزم الأمر (أو رد من snapshot قديم مقبول)
+        stale = await self._ensure_fresh_cache(priority, max_staleness)
+        account = smart_cache.get_account_by_id(account_id)
+
+        if account is None and stale:
+            # ممكن يكون حساب جديد لسه مش في النسخة القديمة
+            account = await self._refresh_for_lookup(
+                f"id:{account_id}",
+                lambda: smart_cache.get_account_by_id(account_id),
+                priority,
+            )
 
-        return smart_cache.get_account_by_id(account_id)
+        return account
 
-    async def search_sender_by_email(self, email: str) -> Optional[Dict]:
+    async def search_sender_by_email(
+        self,
+        email: str,
+        priority: Priority = Priority.INTERACTIVE,
+        max_staleness: Optional[float] = None,
+    ) -> Optional[Dict]:
         """البحث بالإيميل"""
-        # تحديث الـ cache إذا لزم الأمر
-        if not smart_cache.is_cache_valid():
-            await self.fetch_all_accounts_batch()
+        # تحديث الـ cache إذا لزم الأمر (أو رد من snapshot قديم مقبول)
+        stale = await self._ensure_fresh_cache(priority, max_staleness)
+        account = smart_cache.get_account_by_email(email)
+
+        if account is None and stale:
+            # ممكن يكون حساب جديد لسه مش في النسخة القديمة
+            account = await self._refresh_for_lookup(
+                f"email:{email.lower().strip()}",
+                lambda: smart_cache.get_account_by_email(email),
+                priority,
+            )
+
+        return account
+
+    def _sync_added_account(self, priority: Priority):
+        """
+        ➕ جلب الحساب المضاف بـ delta واحد فوراً (addAccount مش بيرجع الـ idAccount)
 
-        return smart_cache.get_account_by_email(email)
+        - الـ snapshot بيتعلم stale عشان البحث عن الحساب الجديد ينضم للـ delta ده
+        - الـ delta بيتبعت حتى لو INCREMENTAL_SYNC_ENABLED مقفول (صف واحد بدل الجدول كله)
+        - مفيش marker أو snapshot لسه → الـ sync الجاي هيجيبه عادي
+        """
+        smart_cache.mark_stale()
+
+        if not self.sync_marker or smart_cache.last_successful_cache is None:
+            return
+        if self._inflight_batch is not None and not self._inflight_batch.done():
+            # batch شغال بالفعل: لو ما جابش الحساب البحث بيكمل بـ full بعده
+            return
+
+        self._start_batch(priority, incremental=True)
 
     async def add_sender(
         self,
@@ -378,11 +1078,12 @@ class OptimizedAPIManager:
         backup_codes: str = "",
         amount_take: str = "",
         amount_keep: str = "",
+        priority: Priority = Priority.INTERACTIVE,
     ) -> Tuple[bool, str]:
         """Add sender"""
         global stats
 
-        csrf = await self.get_csrf_token()
+        csrf = await self.get_csrf_token(priority=priority)
         if not csrf:
             return False, "No CSRF"
 
@@ -403,6 +1104,8 @@ class OptimizedAPIManager:
             "csrf_token": csrf,
         }
 
+        await request_scheduler.acquire(priority)
+
         try:
             async with self.session.post(
                 f"{self.base_url}/dataFunctions/addAccount", json=payload
@@ -412,9 +1115,7 @@ class OptimizedAPIManager:
                     try:
                         data = await response.json()
                         if "success" in data:
-                            # إلغاء الـ cache لإجبار تحديث
-                            smart_cache.cache = None
-                            smart_cache.cache_timestamp = None
+                            self._sync_added_account(priority)
                             return True, data.get("success", "Success")
                         elif "error" in data:
                             error = data.get("error", "")
@@ -424,13 +1125,12 @@ class OptimizedAPIManager:
                     except:
                         text = await response.text()
                         if "success" in text.lower():
-                            smart_cache.cache = None
-                            smart_cache.cache_timestamp = None
+                            self._sync_added_account(priority)
                             return True, "Success"
                         return False, text[:100]
 
                 elif response.status in [403, 419]:
-                    self.csrf_token = None
+                    http_pool.invalidate_csrf()
                     return False, "CSRF expired"
 
                 return False, f"Status {response.status}"
@@ -440,6 +1140,7 @@ class OptimizedAPIManager:
             return False, str(e)
 
     async def close(self):
-        """Cleanup"""
-        if self.session and not self.session.closed:
-            await self.session.close()
+        """Cleanup (مع حفظ آخر snapshot للـ warm start الجاي)"""
+        smart_cache.persist_snapshot()
+        storage_writer.flush()
+        await http_pool.close()
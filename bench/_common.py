@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔧 إعداد مشترك لسكريبتات bench/
+
+- جذر الريبو في sys.path (السكريبتات بتتشغل بـ python bench/<name>.py)
+- الشغل جوه مجلد مؤقت عشان ملفات الحالة (data/...) ما تتكتبش في الريبو
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup() -> Path:
+    """تجهيز sys.path + chdir لمجلد مؤقت (بيرجع مساره)"""
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench-"))
+    (workdir / "data").mkdir()
+    os.chdir(workdir)
+    return workdir
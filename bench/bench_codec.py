@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 Benchmark: حفظ/تحميل ملف الحسابات المراقبة بالـ codecs المختلفة
+✅ indent=2 json (الشكل القديم) / json مضغوط / orjson (لو متسطب)
+✅ أحسن زمن من 3 مرات + حجم الملف
+
+Usage:
+    python bench/bench_codec.py [--sizes 1000 10000 100000]
+"""
+
+import argparse
+import json
+import os
+import time
+
+import _common
+
+_common.setup()
+
+from storage import JsonCodec, OrjsonCodec, orjson  # noqa: E402
+
+LEGACY_FILE = "legacy.json"
+CODEC_FILE = "codec.json"
+
+
+def make_record(i: int) -> dict:
+    return {
+        "id": str(10**8 + i),
+        "email": f"user{i}@example.com",
+        "group": "مجموعة 1",
+        "last_known_status": "LOGGED",
+        "last_check": "2026-10-16T12:00:00.123456",
+        "chat_id": 123456789,
+        "source": "telegram",
+        "added_at": "2026-10-10T09:00:00",
+    }
+
+
+def best_of(fn, repeat: int = 3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def run(n: int):
+    data = {str(10**8 + i): make_record(i) for i in range(n)}
+    rows = []
+
+    # الشكل القديم: json.dump بـ indent=2
+    def legacy_save():
+        with open(LEGACY_FILE, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+
+    def legacy_load():
+        with open(LEGACY_FILE, encoding="utf-8") as f:
+            return json.load(f)
+
+    save, _ = best_of(legacy_save)
+    load, _ = best_of(legacy_load)
+    rows.append(("indent=2 json", save, load, os.path.getsize(LEGACY_FILE)))
+
+    codecs = [JsonCodec()] + ([OrjsonCodec()] if orjson is not None else [])
+    for codec in codecs:
+
+        def codec_save():
+            with open(CODEC_FILE, "wb") as f:
+                f.write(codec.dumps(data))
+
+        def codec_load():
+            with open(CODEC_FILE, "rb") as f:
+                return codec.loads(f.read())
+
+        save, _ = best_of(codec_save)
+        load, loaded = best_of(codec_load)
+        assert loaded == data
+        rows.append((codec.name, save, load, os.path.getsize(CODEC_FILE)))
+
+    print(f"N={n}")
+    for name, save, load, size in rows:
+        print(
+            f"  {name:14s} save {save * 1e3:8.1f} ms  load {load * 1e3:8.1f} ms  "
+            f"size {size / 1024:8.0f} KiB"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    args = parser.parse_args(argv)
+
+    if orjson is None:
+        print("ℹ️ orjson not installed - skipping the orjson codec")
+    for n in args.sizes:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 Benchmark: فهرس الـ snapshot (SmartCacheManager.index) مقابل البحث الخطي القديم
+✅ زمن بناء الفهرس لكل update_cache
+✅ زمن البحث بالـ ID وبالإيميل (لكل lookup)
+
+Usage:
+    python bench/bench_index.py [--sizes 10000 100000]
+"""
+
+import argparse
+import random
+import timeit
+
+import _common
+
+_common.setup()
+
+from api_manager import SmartCacheManager  # noqa: E402
+
+LOOKUPS = 200
+
+
+def make_rows(n: int) -> list:
+    return [
+        {
+            "idAccount": str(i),
+            "Sender": f"User{i}@x.com",
+            "Group": "1111",
+            "Status": "AVAILABLE" if i % 3 else "LOGGING",
+        }
+        for i in range(n)
+    ]
+
+
+# ───────────────────────────────────────────────────────────
+# البحث الخطي القديم (قبل الفهرس)
+# ───────────────────────────────────────────────────────────
+
+
+def linear_by_id(cache: list, account_id: str):
+    for account in cache:
+        if str(account.get("idAccount", "")) == str(account_id):
+            return account
+    return None
+
+
+def linear_by_email(cache: list, email: str):
+    email = email.lower().strip()
+    for account in cache:
+        if account.get("Sender", "").lower() == email:
+            return account
+    return None
+
+
+def run(n: int):
+    cache = SmartCacheManager()
+    rows = make_rows(n)
+
+    build = timeit.timeit(lambda: cache.update_cache(rows), number=3) / 3
+
+    keys = [str(random.randrange(n)) for _ in range(LOOKUPS)]
+    emails = [f"user{key}@x.com" for key in keys]
+
+    for key, email in zip(keys, emails):
+        assert cache.get_account_by_id(key) is linear_by_id(rows, key)
+        assert cache.get_account_by_email(email) is linear_by_email(rows, email)
+
+    lin_id = timeit.timeit(lambda: [linear_by_id(rows, k) for k in keys], number=1)
+    idx_id = timeit.timeit(
+        lambda: [cache.get_account_by_id(k) for k in keys], number=50
+    )
+    lin_email = timeit.timeit(
+        lambda: [linear_by_email(rows, e) for e in emails], number=1
+    )
+    idx_email = timeit.timeit(
+        lambda: [cache.get_account_by_email(e) for e in emails], number=50
+    )
+
+    print(
+        f"n={n}: build {build * 1e3:.1f}ms | "
+        f"by_id {lin_id / LOOKUPS * 1e6:.0f}us -> {idx_id / (LOOKUPS * 50) * 1e6:.2f}us | "
+        f"by_email {lin_email / LOOKUPS * 1e6:.0f}us -> "
+        f"{idx_email / (LOOKUPS * 50) * 1e6:.2f}us"
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    for n in args.sizes:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
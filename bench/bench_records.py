@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📊 Benchmark: ذاكرة الصفوف المتحللة (dict لكل صف مقابل SenderRecord)
+✅ dict بـ 14 مفتاح (الشكل القديم)
+✅ SenderRecord بكل الأعمدة / بالأعمدة المحتفظ بيها بس (SENDER_COLUMNS)
+
+Usage:
+    python bench/bench_records.py [--sizes 10000 100000]
+"""
+
+import argparse
+import random
+import tracemalloc
+
+import _common
+
+_common.setup()
+
+from records import SENDER_SCHEMA, UPSTREAM_INDEX_MAP, RecordSchema  # noqa: E402
+
+STATUSES = ["AVAILABLE", "LOGGING", "AMOUNT TAKEN", "DISABLED", "WRONG DETAILS"]
+
+
+def make_upstream_rows(n: int) -> list:
+    """صفوف بنفس شكل updateSenderPage (14 عمود)"""
+    return [
+        [
+            i,
+            f"https://img/{i}.png",
+            f"user{i}@example.com",
+            str(random.randint(0, 10**6)),
+            "2025-11-22 10:00",
+            str(random.randint(0, 10**6)),
+            random.choice(STATUSES),
+            str(random.randint(0, 10**6)),
+            f"pw{i}xyz",
+            "11111111,22222222",
+            "1111",
+            "3",
+            "100",
+            "50",
+        ]
+        for i in range(n)
+    ]
+
+
+def parse_dicts(rows: list) -> list:
+    """التحويل القديم: dict لكل صف بكل الأعمدة"""
+    parsed = []
+    for account in rows:
+        parsed.append(
+            {
+                key: str(account[idx]) if idx < len(account) and account[idx] else ""
+                for key, idx in UPSTREAM_INDEX_MAP.items()
+            }
+        )
+    return parsed
+
+
+def measure(parse, rows: list) -> int:
+    tracemalloc.start()
+    data = parse(rows)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return current
+
+
+def run(n: int):
+    rows = make_upstream_rows(n)
+    full_schema = RecordSchema(list(UPSTREAM_INDEX_MAP))
+
+    variants = {
+        "dict x14": parse_dicts,
+        "records (all cols)": lambda r: [full_schema.from_row(x) for x in r],
+        "records (projected)": lambda r: [SENDER_SCHEMA.from_row(x) for x in r],
+    }
+    results = {name: measure(parse, rows) for name, parse in variants.items()}
+
+    print(
+        f"n={n}: "
+        + " | ".join(f"{name} {size / 1e6:.1f}MB" for name, size in results.items())
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args(argv)
+
+    for n in args.sizes:
+        run(n)
+
+
+if __name__ == "__main__":
+    main()
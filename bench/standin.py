@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 Stand-in محلي للموقع (aiohttp) لتجربة api_manager من غير الموقع الحقيقي
+✅ /senderPage (CSRF) + updateSenderPage (full / delta بالـ date)
+✅ عدّاد لكل نوع طلب (calls) عشان نقيس عدد الطلبات الفعلية
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from aiohttp import web
+
+# أماكن الأعمدة في صف updateSenderPage اللي الـ stand-in بيعدلها
+COLUMN_POSITIONS = {"Sender": 2, "Taken": 5, "Status": 6}
+
+
+class Upstream:
+    """
+    جدول حسابات في الذاكرة بنفس شكل updateSenderPage
+
+    - date="0" → الجدول كامل
+    - date=<marker> → الصفوف اللي اتغيرت بعد الـ marker بس
+    - الـ marker اللي بيرجع = ساعة داخلية بتزيد مع كل تعديل
+    """
+
+    def __init__(self, n: int = 5000, delay: float = 0.0, group: str = "1111"):
+        self.rows: List[List[str]] = [
+            [
+                str(i), "img", f"user{i}@x.com", "0", "now", "0",
+                "LOGGING" if i % 2 else "AVAILABLE",
+                "0", "pw", "", group, "1", "", "",
+            ]
+            for i in range(1, n + 1)
+        ]
+        self.group = group
+        self.delay = delay
+        self.calls: Dict[str, int] = {"csrf": 0, "full": 0, "delta": 0}
+        self.changed: Dict[str, int] = {}
+        self.clock = 1000
+        self.runner: Optional[web.AppRunner] = None
+        self.base_url = ""
+
+    # ───────────────────────────────────────────────────────────
+    # ✏️ تعديل الجدول (من السكريبت)
+    # ───────────────────────────────────────────────────────────
+
+    def touch(self, account_id: str, **changes: str):
+        for row in self.rows:
+            if row[0] == account_id:
+                for key, value in changes.items():
+                    row[COLUMN_POSITIONS[key]] = value
+        self.clock += 1
+        self.changed[account_id] = self.clock
+
+    # ───────────────────────────────────────────────────────────
+    # 🌐 الـ endpoints
+    # ───────────────────────────────────────────────────────────
+
+    async def _csrf(self, request):
+        self.calls["csrf"] += 1
+        return web.Response(
+            text='<meta name="csrf-token" content="tok">', content_type="text/html"
+        )
+
+    async def _update_sender_page(self, request):
+        form = await request.post()
+        await asyncio.sleep(self.delay)
+
+        date = form.get("date", "0")
+        if date not in ("0", ""):
+            self.calls["delta"] += 1
+            rows = [r for r in self.rows if self.changed.get(r[0], 0) > int(date)]
+        else:
+            self.calls["full"] += 1
+            rows = self.rows
+        return web.json_response({"data": rows, "date": str(self.clock)})
+
+    # ───────────────────────────────────────────────────────────
+    # ▶️ التشغيل
+    # ───────────────────────────────────────────────────────────
+
+    async def start(self) -> str:
+        """تشغيل السيرفر على port فاضي (بيرجع الـ base_url)"""
+        app = web.Application()
+        app.router.add_get("/senderPage", self._csrf)
+        app.router.add_post("/dataFunctions/updateSenderPage", self._update_sender_page)
+
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+
+        host, port = self.runner.addresses[0][:2]
+        self.base_url = f"http://{host}:{port}"
+        return self.base_url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    def config(self) -> Dict:
+        """config بالشكل اللي OptimizedAPIManager مستنيه"""
+        return {
+            "website": {
+                "urls": {"base": self.base_url},
+                "cookies": {},
+                "defaults": {"group_name": self.group, "account_lock": 1},
+            }
+        }
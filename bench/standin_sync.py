@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧪 تجربة الـ Incremental sync ضد stand-in محلي (bench/standin.py)
+
+1. full sync أول مرة (date="0")
+2. حساب واحد اتغير → delta بصف واحد بيتدمج في الـ snapshot
+3. delta فاضي → الـ snapshot زي ما هو
+4. last_full_sync = None → full sync تاني (تصحيح الانحراف)
+
+Usage:
+    python bench/standin_sync.py [--accounts 5000]
+"""
+
+import argparse
+import asyncio
+
+import _common
+
+_common.setup()
+
+import api_manager  # noqa: E402
+from api_manager import OptimizedAPIManager, smart_cache  # noqa: E402
+from standin import Upstream  # noqa: E402
+
+
+async def run(accounts: int):
+    api_manager.INCREMENTAL_SYNC_ENABLED = True
+
+    upstream = Upstream(n=accounts)
+    await upstream.start()
+    api = OptimizedAPIManager(upstream.config())
+    await api.initialize()
+
+    try:
+        full = await api.fetch_all_accounts_batch(force_refresh=True)
+        assert len(full) == accounts and upstream.calls["full"] == 1
+        print(f"1. full sync: {len(full)} accounts, calls {upstream.calls}")
+
+        upstream.touch("7", Status="AMOUNT TAKEN", Taken="12345")
+        snapshot = await api.fetch_all_accounts_batch(force_refresh=True)
+        account = smart_cache.get_account_by_id("7")
+        assert upstream.calls["delta"] == 1 and len(snapshot) == accounts
+        assert account["Status"] == "AMOUNT TAKEN" and account["Taken"] == "12345"
+        print(f"2. one changed row: merged via delta, calls {upstream.calls}")
+
+        snapshot = await api.fetch_all_accounts_batch(force_refresh=True)
+        assert upstream.calls["delta"] == 2 and len(snapshot) == accounts
+        print(f"3. empty delta: snapshot intact ({len(snapshot)}), calls {upstream.calls}")
+
+        api.last_full_sync = None
+        await api.fetch_all_accounts_batch(force_refresh=True)
+        assert upstream.calls["full"] == 2
+        print(f"4. forced resync: full fetch, calls {upstream.calls}")
+    finally:
+        await api.close()
+        await upstream.stop()
+
+    print("✅ incremental sync OK")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--accounts", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    asyncio.run(run(args.accounts))
+
+
+if __name__ == "__main__":
+    main()
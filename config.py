@@ -13,15 +13,54 @@ from typing import Set
 
 # CSRF Token caching
 CSRF_TOKEN_TTL = 1200  # 20 دقيقة
+CSRF_REFRESH_MARGIN = 120  # تجديد استباقي قبل الانتهاء بدقيقتين
+
+# Upstream rate limiting (token bucket مشترك لكل الطلبات للموقع)
+UPSTREAM_RATE_LIMIT = 2.0  # طلب/ثانية على المدى الطويل
+UPSTREAM_BURST_SIZE = 5  # أقصى طلبات متتالية من غير انتظار
 
 # Smart Cache Settings
 CACHE_TTL_MIN = 60  # 2 دقيقة (عند نشاط عالي)
 CACHE_TTL_NORMAL = 90  # 1.5 دقيقة (عادي)
 CACHE_TTL_MAX = 120  # 2 دقيقة (عند هدوء)
+# Stale-while-revalidate: أقصى عمر للـ snapshot يترد بيه فوراً (والتحديث في الخلفية)
+CACHE_MAX_STALENESS = 300  # 5 دقايق - أقدم من كده البحث بيستنى fetch
+
+# Incremental Sync (updateSenderPage date=<marker>)
+INCREMENTAL_SYNC_ENABLED = False  # فعّلها بعد التأكد إن الموقع بيرجع الصفوف المتغيرة بس
+FULL_RESYNC_INTERVAL = 600  # full sync كل 10 دقايق لتصحيح أي انحراف (حذف/تعديلات فايتة)
+LOOKUP_COST_ALPHA = 0.3  # وزن آخر قياس في متوسط تكلفة delta/full (EWMA)
+
+# Warm start (آخر snapshot ناجح محفوظ على الديسك)
+SNAPSHOT_FILE = "data/accounts_snapshot.json"
+SNAPSHOT_SAVE_INTERVAL = 120  # أقل فاصل بين كل حفظ والتاني (ثواني)
+SNAPSHOT_MAX_AGE = 21600  # snapshot أقدم من 6 ساعات ما يتحملش
 
 # Burst Mode Settings
-BURST_MODE_DURATION = 60  # مدة الـ Burst: 60 ثانية
+BURST_MODE_DURATION = 60  # مدة الـ Burst لكل حساب (من وقت إضافته): 60 ثانية
 BURST_MODE_INTERVAL = 2.5  # فاصل التحديث في وضع Burst: 2.5 ثانية
+BURST_MAX_POLL_RATE = 0.4  # أقصى fetches/ثانية للـ Burst مهما كان عدد الأهداف
+
+# Predictive burst polling (أزمنة الانتقال المتعلمة لكل حالة + جروب)
+TRANSITION_STATS_FILE = "data/transition_latencies.json"
+TRANSITION_MIN_SAMPLES = 5  # أقل عدد عينات قبل ما نعتمد على التوقع
+TRANSITION_MAX_SAMPLES = 50  # آخر N عينة لكل انتقال
+TRANSITION_MAX_POLL_GAP = 15.0  # أقصى فاصل بين فحصين أثناء مراقبة الـ Burst
+
+# Sender columns kept in memory (Column projection)
+# الأعمدة اللي محدش بيقراها (image, password, backupCodes, groupNameId) مش بتتخزن
+SENDER_COLUMNS = [
+    "idAccount",
+    "Sender",
+    "Start",
+    "Last Update",
+    "Taken",
+    "Status",
+    "Available",
+    "Group",
+    "Take",
+    "Keep",
+]
 
 # Background monitor intervals
 POLLING_INTERVALS = {
@@ -78,7 +117,11 @@ FINAL_STATUSES: Set[str] = {
 
 # Database files
 MONITORED_ACCOUNTS_FILE = "monitored_accounts.json"
+MONITORED_FLUSH_INTERVAL = 5  # حفظ الحسابات المراقبة المتعدلة كل 5 ثواني (write-behind)
 STATS_FILE = "request_stats.json"
+# Codec ملفات الحالة: "auto" (orjson لو متسطب وإلا json) / "orjson" / "json"
+# الاتنين بيكتبوا JSON مضغوط (من غير مسافات) فالملفات بتتقري بأي واحد فيهم
+STORAGE_CODEC = "auto"
 
 # Status Emojis
 STATUS_EMOJIS = {
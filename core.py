@@ -12,24 +12,29 @@ import json
 import logging
 import random
 import re
+import time
 from datetime import datetime, timedelta
-from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 from api_manager import smart_cache
 from config import (
     BURST_MODE_INTERVAL,
     FINAL_STATUSES,
-    MONITORED_ACCOUNTS_FILE,
     POLLING_INTERVALS,
     STATUS_DESCRIPTIONS_AR,
     STATUS_EMOJIS,
     TRANSITIONAL_STATUSES,
 )
 
+from events import SNAPSHOT_DIFF_TOPIC, drain_queue, event_bus
+from monitored_store import monitored_store
+from polling import PollingScheduler
+
 # 🆕 استيراد Taken Handler
+from sheets.queue_manager import add_to_pending
 from sheets.taken import add_to_taken_queue
 from stats import stats
+from transitions import transition_model
 
 logger = logging.getLogger(__name__)
 
@@ -48,8 +53,17 @@ with open("config.json", "r", encoding="utf-8") as f:
 
 CLEANUP_INTERVAL = 21600  # 6 ساعات بالثواني
 
-# 🎯 تحديد حد أقصى 10 خيوط مؤقتة في نفس الوقت
-MAX_CONCURRENT_MONITORS = 10
+# 🔍 Auto-discovery: أقصى مدة من غير fetch عشان نلاقي الحسابات الجديدة في الجروب
+# (أي fetch تاني - burst / بحث - بيوصل فروقاته للمراقب فوراً عن طريق الـ event bus)
+DISCOVERY_INTERVAL = 300
+
+# ⏰ حدود نوم المراقب بين الدورات
+MONITOR_MIN_SLEEP = 1.0
+MONITOR_MAX_SLEEP = 60.0
+
+# 🎯 حد أقصى للمراقبات المؤقتة في نفس الوقت
+# (الـ Burst ticker المشترك بيعمل طلب واحد لكل tick مهما كان العدد)
+MAX_CONCURRENT_MONITORS = 100
 monitoring_semaphore = asyncio.Semaphore(MAX_CONCURRENT_MONITORS)
 CLEANUP_AGE_HOURS = 50  # حذف الحسابات الأقدم من 50 ساعة
 CLEANUP_THRESHOLD = 5  # الحد الأدنى للتنفيذ
@@ -61,23 +75,13 @@ CLEANUP_THRESHOLD = 5  # الحد الأدنى للتنفيذ
 
 
 def load_monitored_accounts() -> Dict:
-    """تحميل الحسابات المراقبة"""
-    if Path(MONITORED_ACCOUNTS_FILE).exists():
-        try:
-            with open(MONITORED_ACCOUNTS_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except:
-            pass
-    return {}
+    """تحميل الحسابات المراقبة (من الذاكرة - الملف بيتقري مرة واحدة بس)"""
+    return monitored_store.all()
 
 
 def save_monitored_accounts(accounts: Dict):
-    """حفظ الحسابات المراقبة"""
-    try:
-        with open(MONITORED_ACCOUNTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(accounts, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"❌ Save error: {e}")
+    """حفظ الحسابات المراقبة (بيتكتب على الديسك في الـ flush الجاي)"""
+    monitored_store.replace_all(accounts)
 
 
 def add_monitored_account(
@@ -90,21 +94,19 @@ def add_monitored_account(
     """
     🎯 إضافة حساب للمراقبة مع تخزين الـ ID الموثوق + المصدر
     """
-    accounts = load_monitored_accounts()
-
-    # استخدام الـ ID كـ key رئيسي (أكثر أماناً من الإيميل)
-    key = f"{account_id}_{email}"
-
-    accounts[key] = {
-        "email": email,
-        "account_id": account_id,
-        "last_known_status": status,
-        "chat_id": chat_id,
-        "source": source,  # 🆕 تتبع المصدر
-        "added_at": datetime.now().isoformat(),
-        "last_check": datetime.now().isoformat(),
-    }
-    save_monitored_accounts(accounts)
+    # الـ ID هو المفتاح (تعديل الإيميل بيحدّث نفس الـ entry من غير تكرار)
+    monitored_store.upsert(
+        account_id,
+        {
+            "email": email,
+            "account_id": account_id,
+            "last_known_status": status,
+            "chat_id": chat_id,
+            "source": source,  # 🆕 تتبع المصدر
+            "added_at": datetime.now().isoformat(),
+            "last_check": datetime.now().isoformat(),
+        },
+    )
 
     source_label = "البوت 🤖" if source == "bot" else "يدوي 👤"
     logger.info(
@@ -116,17 +118,17 @@ def update_monitored_account_status(account_id: str, new_status: str):
     """
     🎯 تحديث الحالة باستخدام الـ ID
     """
-    accounts = load_monitored_accounts()
-
-    # البحث بالـ ID
-    for key, data in accounts.items():
-        if data.get("account_id") == account_id:
-            data["last_known_status"] = new_status
-            data["last_check"] = datetime.now().isoformat()
-            save_monitored_accounts(accounts)
-            return
+    if not monitored_store.update_status(account_id, new_status):
+        logger.warning(f"⚠️ Account ID {account_id} not found in monitoring list")
+
+
+def touch_monitored_accounts(account_ids) -> int:
+    """
+    🕒 تحديث last_check لمجموعة حسابات مرة واحدة
 
-    logger.warning(f"⚠️ Account ID {account_id} not found in monitoring list")
+    بيحافظ على منطق الـ cleanup: الحساب اللي لسه موجود في الموقع ما يتمسحش
+    """
+    return monitored_store.touch(account_ids)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -367,8 +369,8 @@ def add_to_pending_queue_immediately(email: str, account_id: str, is_edit: bool
         is_edit: True = تعديل (update existing row), False = إضافة جديدة (new row)
     
     التدفق:
-    - is_edit=False → pending.json → إضافة صف جديد في الشيت
-    - is_edit=True → edit_queue.json → تحديث الصف الموجود
+    - is_edit=False → pending queue → إضافة صف جديد في الشيت
+    - is_edit=True → edit queue → تحديث الصف الموجود
     """
     # 🆕 إذا كان تعديل، نستخدم Edit Handler
     if is_edit:
@@ -382,28 +384,8 @@ def add_to_pending_queue_immediately(email: str, account_id: str, is_edit: bool
             # Fallback: نضيفه للـ pending كصف جديد
             logger.warning("⚠️ Falling back to add as new row")
     
-    # الكود الأصلي (للإضافات الجديدة)
-    pending_file = Path("data/pending.json")
-    pending_file.parent.mkdir(exist_ok=True)
-
-    # تحميل البيانات الحالية
-    if pending_file.exists():
-        try:
-            with open(pending_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except:
-            data = {"emails": []}
-    else:
-        data = {"emails": []}
-
-    # إضافة الإيميل والـ ID فوراً
-    data["emails"].append(
-        {"email": email, "id": account_id, "added_at": datetime.now().isoformat()}
-    )
-
-    # حفظ
-    with open(pending_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # الكود الأصلي (للإضافات الجديدة) - سطر واحد في الـ journal
+    add_to_pending(email, account_id)
 
     logger.info(f"📝 Added {email} (ID: {account_id}) to pending queue IMMEDIATELY")
 
@@ -412,31 +394,8 @@ def add_to_pending_queue(email: str):
     """
     دالة للتوافق مع Web API - تضيف بدون ID
     """
-    pending_file = Path("data/pending.json")
-    pending_file.parent.mkdir(exist_ok=True)
-
-    # تحميل البيانات الحالية
-    if pending_file.exists():
-        try:
-            with open(pending_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-        except:
-            data = {"emails": []}
-    else:
-        data = {"emails": []}
-
-    # إضافة الإيميل بدون ID
-    data["emails"].append(
-        {
-            "email": email,
-            "id": "N/A",  # سيتم تحديثه لاحقاً
-            "added_at": datetime.now().isoformat(),
-        }
-    )
-
-    # حفظ
-    with open(pending_file, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    # "N/A" = سيتم تحديثه لاحقاً
+    add_to_pending(email, "N/A")
 
     logger.info(f"📝 Added {email} to pending queue (via API)")
 
@@ -448,7 +407,7 @@ def add_to_pending_queue(email: str):
 
 async def monitor_account_task(api_manager, email, msg, chat_id, group_name, is_edit_context=False, account_id=None):
     """
-    🚀 Task منفصل لمراقبة الحساب (يدعم 10 متزامنين)
+    🚀 Task منفصل لمراقبة الحساب (يدعم MAX_CONCURRENT_MONITORS متزامنين)
 
     ✅ النسخة النهائية المحسّنة:
        - تشغل المراقبة في الخلفية.
@@ -476,7 +435,7 @@ async def monitor_account_task(api_manager, email, msg, chat_id, group_name, is_
         status_ar = "غير محدد"
 
         try:
-            result = await api_manager.search_sender_by_email(email)
+            result = await api_manager.search_sender_by_email(email, max_staleness=0)
             if result:
                 final_status = result.get("Status", "N/A")
                 status_emoji = get_status_emoji(final_status)
@@ -526,7 +485,7 @@ async def wait_for_status_change(
     🚀 مراقبة مع Burst Mode المؤقت + تحديد المصدر
 
     عند إضافة حساب جديد:
-    1. تفعيل Burst Mode (تحديث cache كل 2.5 ثانية)
+    1. تفعيل Burst Mode (Ticker مشترك بيحدّث الـ cache كل 2.5 ثانية)
     2. 🆕 إضافة فورية لـ pending.json عند اكتشاف ID
     3. مراقبة سريعة جداً للحساب الجديد
     4. إضافة للمراقبة فقط لو: AVAILABLE + جروب مطابق
@@ -556,7 +515,7 @@ async def wait_for_status_change(
         
         # جلب البيانات بالـ ID مباشرة
         try:
-            result = await api_manager.search_sender_by_id(account_id)
+            result = await api_manager.search_sender_by_id(account_id, max_staleness=0)
             if not result:
                 print(f"[BURST] ❌ Account not found by ID: {account_id}")
                 return False, None
@@ -568,7 +527,7 @@ async def wait_for_status_change(
         # الطريقة القديمة: البحث بالإيميل
         print(f"\n[BURST] 🔍 Searching for account: {email}")
         
-        result = await api_manager.search_sender_by_email(email)
+        result = await api_manager.search_sender_by_email(email, max_staleness=0)
         
         if not result:
             print(f"[BURST] ❌ Account not found: {email}")
@@ -595,9 +554,13 @@ async def wait_for_status_change(
     # 🚀 الخطوة 2: مراقبة سريعة مع Burst Mode
     logger.info(f"🚀 Starting burst monitoring for {email} (ID: {account_id})")
 
-    max_attempts = 40  # 40 محاولة * 2.5 ثانية = 100 ثانية max
+    # ⏱️ ميزانية وقت بدل عدد محاولات (الفحص المتوقع بيتباعد أحياناً)
+    watch_timeout = 100
+    group_name = result.get("Group", "")
+    attempt = 0
 
-    for attempt in range(1, max_attempts + 1):
+    while (datetime.now() - start_time).total_seconds() < watch_timeout:
+        attempt += 1
         try:
             # ✅ تحديث مؤشر الـ Burst ليعرض العدد الفعلي للحسابات النشطة
             mode_indicator = (
@@ -607,20 +570,52 @@ async def wait_for_status_change(
             )
 
             # 🎯 البحث بالـ ID (أكثر أماناً)
-            account_info = await api_manager.search_sender_by_id(account_id)
+            in_burst = account_id in smart_cache.burst_targets
+            if in_burst:
+                # 🔮 متباعد في أول الحالة وكثيف قرب زمن الانتقال المتوقع
+                if last_status:
+                    in_status = (
+                        datetime.now() - start_time
+                    ).total_seconds() - status_changes[-1]["elapsed"]
+                    delay = transition_model.poll_delay(
+                        last_status, group_name, in_status
+                    )
+                    if delay > BURST_MODE_INTERVAL:
+                        await asyncio.sleep(delay - BURST_MODE_INTERVAL)
+
+                # ⏱️ استنى الـ tick المشترك بدل fetch خاص بالحساب ده
+                account_info = await api_manager.burst.wait_for_update(account_id)
+            else:
+                # المراقبة محتاجة بيانات طازة (مش stale)
+                account_info = await api_manager.search_sender_by_id(
+                    account_id, max_staleness=0
+                )
+
+            total_elapsed = (datetime.now() - start_time).total_seconds()
 
             if not account_info:
                 logger.warning(f"⚠️ Account ID {account_id} disappeared!")
-                await asyncio.sleep(2.0)
+                if not in_burst:
+                    await asyncio.sleep(2.0)
                 continue
 
             status = account_info.get("Status", "غير محدد").upper()
+            group_name = account_info.get("Group", group_name)
 
             # تتبع التغييرات
             if status != last_status:
                 change_time = (datetime.now() - start_time).total_seconds()
                 logger.info(f"📊 {email} status: {status} ({change_time:.1f}s)")
 
+                # 🔮 تعلم زمن الانتقال (من أول ما شفنا الحالة القديمة)
+                if last_status:
+                    transition_model.record(
+                        last_status,
+                        status,
+                        group_name,
+                        total_elapsed - status_changes[-1]["elapsed"],
+                    )
+
                 status_changes.append(
                     {"status": status, "time": datetime.now(), "elapsed": total_elapsed}
                 )
@@ -668,7 +663,7 @@ async def wait_for_status_change(
                 f"🔄 الاستقرار: {stable_count}/2\n"
                 f"{changes_text}\n"
                 f"⏱️ الوقت: {int(total_elapsed)}s\n"
-                f"🔍 المحاولة: {attempt}/{max_attempts}",
+                f"🔍 المحاولة: {attempt} (حد أقصى {watch_timeout}s)",
                 parse_mode="Markdown",
             )
 
@@ -713,19 +708,15 @@ async def wait_for_status_change(
 
                 return True, account_info
 
-            # ✅ فاصل زمني ذكي يعتمد على قائمة الأهداف
-            if smart_cache.burst_targets:
-                interval = BURST_MODE_INTERVAL
-            else:
+            # ✅ في الـ Burst الـ ticker هو اللي بيحدد الإيقاع
+            # بره الـ Burst (بعد الـ timeout) نرجع لفاصل زمني عادي
+            if account_id not in smart_cache.burst_targets:
                 interval = 4.0 if is_transitional else 5.0
-
-            total_elapsed += interval
-            await asyncio.sleep(interval)
+                await asyncio.sleep(interval)
 
         except Exception as e:
             logger.exception(f"❌ Monitoring error #{attempt}: {e}")
             await asyncio.sleep(2.0)
-            total_elapsed += 2.0
 
     # انتهت المحاولات
     logger.warning(f"⏱️ {email}: Timeout, final status: {last_status}")
@@ -993,7 +984,7 @@ async def send_status_notification(
 # ═══════════════════════════════════════════════════════════════
 
 
-def cleanup_old_accounts(accounts: Dict) -> int:
+def cleanup_old_accounts() -> int:
     """
     🧹 تنظيف الحسابات القديمة (>50 ساعة بدون تحديث)
 
@@ -1003,53 +994,25 @@ def cleanup_old_accounts(accounts: Dict) -> int:
     - Zero resources overhead
     - Flexible & Simple
     - Auto-removes future unknown statuses
+    - ⏳ بيلف على الحسابات اللي عدت الـ cutoff بس (heap مرتب بـ last_check)
 
     Returns:
         int: عدد الحسابات المحذوفة
     """
-    if not accounts:
-        return 0
-
     # ✅ الحالات المهمة اللي نخليها 50 ساعة
     KEEP_STATUSES = ["AVAILABLE", "REFRESHING", "TRANSFERRING"]
 
     try:
-        now = datetime.now()
-        cutoff_time = now - timedelta(hours=CLEANUP_AGE_HOURS)  # 50 ساعة
-
-        # جمع مفاتيح الحسابات اللي هنحذفها
-        old_keys = []
-
-        for key, data in accounts.items():
-            try:
-                last_check_str = data.get("last_check")
-                if not last_check_str:
-                    continue
+        cutoff_time = datetime.now() - timedelta(hours=CLEANUP_AGE_HOURS)  # 50 ساعة
 
-                last_check = datetime.fromisoformat(last_check_str)
-                status = data.get("last_known_status", "")
-
-                # ✅ القرار الذكي (Lazy Timestamp):
-                # احذف لو: (الحساب أقدم من 50 ساعة) AND (حالته مش من المهمين)
-                if last_check < cutoff_time and status not in KEEP_STATUSES:
-                    old_keys.append(key)
-
-            except (ValueError, TypeError, AttributeError):
-                # لو في مشكلة في التاريخ، نتخطى الحساب ده
-                continue
-
-        # Early exit: لو مفيش حسابات كفاية للحذف
-        if len(old_keys) < CLEANUP_THRESHOLD:
+        # احذف لو: (الحساب أقدم من 50 ساعة) AND (حالته مش من المهمين)
+        # Early exit: لو مفيش حسابات كفاية للحذف (CLEANUP_THRESHOLD)
+        old_keys = monitored_store.expire(
+            cutoff_time, KEEP_STATUSES, min_count=CLEANUP_THRESHOLD
+        )
+        if not old_keys:
             return 0
 
-        # حذف الحسابات (in-place)
-        for key in old_keys:
-            del accounts[key]
-
-        # حفظ التغييرات
-        if old_keys:
-            save_monitored_accounts(accounts)
-
         logger.info(
             f"🧹 Cleanup: Deleted {len(old_keys)} old accounts (non-critical statuses)"
         )
@@ -1065,6 +1028,14 @@ def cleanup_old_accounts(accounts: Dict) -> int:
 # ═══════════════════════════════════════════════════════════════
 
 
+async def _wait_for_diffs(diff_queue: asyncio.Queue, timeout: float) -> list:
+    """نوم لحد timeout أو لحد ما يوصل snapshot diff (أيهما أقرب)"""
+    try:
+        return [await asyncio.wait_for(diff_queue.get(), timeout=timeout)]
+    except asyncio.TimeoutError:
+        return []
+
+
 async def continuous_monitor(
     api_manager,
     telegram_bot,
@@ -1079,46 +1050,94 @@ async def continuous_monitor(
         "🔄 Background monitor started (Smart TTL + Auto-Discovery + Taken Handler)"
     )
 
-    while True:
-        try:
-            accounts = load_monitored_accounts()
+    # 📣 الاشتراك في فروقات الـ snapshot (أي fetch - burst / بحث / دورة - بيوصلنا هنا)
+    diff_queue = event_bus.subscribe_queue(SNAPSHOT_DIFF_TOPIC)
+    pending_diffs = []
 
-            # Fetch all accounts
-            all_accounts = await api_manager.fetch_all_accounts_batch()
+    # ⏰ موعد الفحص الجاي لكل حساب حسب حالته (POLLING_INTERVALS)
+    polling = PollingScheduler(get_adaptive_interval)
+    last_discovery = 0.0
 
-            # Build ID dictionary
-            accounts_by_id = {
-                acc.get("idAccount"): acc
-                for acc in all_accounts
-                if acc.get("idAccount")
-            }
+    # 🆕 قائمة الحالات المراقبة
+    monitored_statuses = ["AVAILABLE", "REFRESHING", "TRANSFERRING"]
 
-            # 🆕 AUTO-DISCOVERY LOGIC
-            existing_ids = {
-                data.get("account_id")
-                for data in accounts.values()
-                if data.get("account_id")
-            }
+    # أول دورة بتلف على كل حاجة (الـ cache ممكن يكون اتملى قبل ما نشترك)
+    full_scan = True
+
+    # ⏳ انتظار بين محاولات الـ fetch الأولى لو فشلت (بيتضاعف لحد MONITOR_MAX_SLEEP)
+    warm_start_retry = MONITOR_MIN_SLEEP
+
+    while True:
+        try:
+            # 💾 لسه على الـ warm start snapshot (ممكن يكون أقدم من حالات المراقبة)
+            # → fetch حقيقي الأول، ومفيش مقارنة لحد ما ينجح
+            if smart_cache.warm_start:
+                await api_manager.fetch_all_accounts_batch(force_refresh=True)
+                if smart_cache.warm_start:
+                    # الموقع واقع / الـ CSRF فشل → backoff بدل طلب كل ثانية
+                    await asyncio.sleep(warm_start_retry)
+                    warm_start_retry = min(warm_start_retry * 2, MONITOR_MAX_SLEEP)
+                    continue
+                warm_start_retry = MONITOR_MIN_SLEEP
+
+            now = time.monotonic()
+
+            # ⏰ حسابات جديدة في المراقبة عليها الدور فوراً
+            polling.sync(monitored_store.ids(), now)
+            due_ids = set(polling.pop_due(now))
+            discovery_due = now - last_discovery >= DISCOVERY_INTERVAL
+
+            # Fetch بس لو فيه حسابات عليها الدور أو محتاجين discovery
+            # (الـ Smart TTL لسه بيحدد إذا كان الـ cache يكفي)
+            fetched = bool(due_ids) or discovery_due or full_scan
+            if fetched:
+                await api_manager.fetch_all_accounts_batch()
+            if discovery_due:
+                last_discovery = now
+
+            # 📣 تجميع الفروقات اللي اتنشرت من آخر دورة
+            touched_ids = set()
+            removed_ids = set()
+            for diff in pending_diffs + drain_queue(diff_queue):
+                if diff.is_initial:
+                    full_scan = True
+                touched_ids |= diff.touched_ids()
+                removed_ids.update(
+                    str(account.get("idAccount", "")) for account in diff.removed
+                )
+            pending_diffs = []
 
-            auto_added = False
-            # 🆕 قائمة الحالات المراقبة
-            monitored_statuses = ["AVAILABLE", "REFRESHING", "TRANSFERRING"]
+            # 🆕 AUTO-DISCOVERY LOGIC
 
-            for account in all_accounts:
+            if full_scan:
+                # 🗂️ فهرس (Group, Status): بنلف على المرشحين بس مش على كل الحسابات
+                candidates = [
+                    account
+                    for status in monitored_statuses
+                    for account in smart_cache.get_accounts_by_group_status(
+                        default_group_name, status  # 🎯 exact match
+                    )
+                ]
+            else:
+                # 📣 الحسابات اللي اتضافت أو اتغيرت بس
+                candidates = []
+                for account_id in touched_ids:
+                    account = smart_cache.get_account_by_id(account_id)
+                    if (
+                        account
+                        and account.get("Group") == default_group_name
+                        and account.get("Status", "").upper() in monitored_statuses
+                    ):
+                        candidates.append(account)
+
+            for account in candidates:
                 account_id = account.get("idAccount")
                 account_status = account.get("Status", "").upper()
 
                 # Skip if:
                 # - No ID
                 # - Already monitored
-                # - Not in monitored statuses (AVAILABLE, REFRESHING, TRANSFERRING)
-                # - Group doesn't match
-                if (
-                    not account_id
-                    or account_id in existing_ids
-                    or account_status not in monitored_statuses
-                    or account.get("Group", "") != default_group_name  # 🎯 exact match
-                ):
+                if not account_id or account_id in monitored_store:
                     continue
 
                 # Auto-add
@@ -1131,31 +1150,46 @@ async def continuous_monitor(
                     chat_id,
                     source="manual",  # 🆕 auto-discovered = manual
                 )
-                existing_ids.add(account_id)
-                auto_added = True
                 logger.info(
                     f"✅ Auto-monitored {email} ({account_status} + default group)"
                 )
 
-            # Reload if auto-added
-            if auto_added:
-                accounts = load_monitored_accounts()
-
             # Skip if no accounts
-            if not accounts:
-                await asyncio.sleep(30)
+            if not len(monitored_store):
+                full_scan = False
+                pending_diffs = await _wait_for_diffs(diff_queue, 30)
                 continue
 
+            # حسابات اتضافت للمراقبة في الدورة دي (auto-discovery)
+            monitored_ids = monitored_store.ids()
+            due_ids.update(polling.sync(monitored_ids))
+
+            # ⏰📣 نقيّم بس اللي عليه الدور أو اتغير في الـ snapshot - O(k)
+            if full_scan:
+                check_ids = monitored_ids
+            else:
+                check_ids = (due_ids | touched_ids) & monitored_ids
+
             changes_detected = 0
+            present_ids = set()  # الحسابات اللي لسه موجودة (نحدث last_check بتاعها)
 
-            for key, data in list(accounts.items()):
+            for account_id in check_ids:
                 try:
-                    account_id = data.get("account_id")
-                    if not account_id:
+                    data = monitored_store.get(account_id)
+                    if data is None:
+                        continue
+
+                    # الموعد الجاي (بيتحدث تحت لو الحالة اتغيرت)
+                    polling.schedule(account_id, data["last_known_status"])
+
+                    if account_id in removed_ids:
+                        logger.warning(
+                            f"⚠️ Account ID {account_id} disappeared from batch"
+                        )
                         continue
 
-                    # 🎯 البحث بالـ ID (أكثر أماناً من الإيميل)
-                    account_info = accounts_by_id.get(account_id)
+                    # 🎯 البحث بالـ ID (أكثر أماناً من الإيميل) - O(1)
+                    account_info = smart_cache.get_account_by_id(account_id)
 
                     if not account_info:
                         logger.warning(f"⚠️ Account ID {account_id} not found in batch")
@@ -1203,6 +1237,8 @@ async def continuous_monitor(
                             logger.info(f"📦 {email} transfer list full")
 
                         update_monitored_account_status(account_id, current_status)
+                        data["last_known_status"] = current_status
+                        polling.schedule(account_id, current_status)
 
                         # ✅ الحل النهائي: استدعاء دالة الإشعارات مرة واحدة فقط
                         await send_status_notification(
@@ -1216,13 +1252,18 @@ async def continuous_monitor(
                             data.get("source", "manual"),
                         )
                     else:
-                        update_monitored_account_status(account_id, current_status)
+                        present_ids.add(account_id)
 
                 except Exception as e:
                     logger.exception(f"❌ Error checking account")
 
-            # 🎯 تعديل ذكي للـ TTL بناءً على النشاط
-            smart_cache.adjust_ttl(changes_detected)
+            # 🕒 last_check للحسابات اللي اتفحصت وما اتغيرتش: load + save واحد بس
+            touch_monitored_accounts(present_ids)
+            full_scan = False
+
+            # 🎯 تعديل ذكي للـ TTL بناءً على النشاط (في دورات الـ fetch بس)
+            if fetched:
+                smart_cache.adjust_ttl(changes_detected)
 
             # 🧹 Cleanup old accounts (every 6 hours)
             if not hasattr(cleanup_old_accounts, "last_run"):
@@ -1233,30 +1274,25 @@ async def continuous_monitor(
             ).total_seconds()
 
             if time_since_cleanup >= CLEANUP_INTERVAL:
-                removed_count = cleanup_old_accounts(accounts)
+                removed_count = cleanup_old_accounts()
                 if removed_count > 0:
                     logger.info(
                         f"🧹 Cleaned {removed_count} old accounts (>50h inactive)"
                     )
                 cleanup_old_accounts.last_run = datetime.now()
 
-            # فترة الانتظار
-            statuses = [d["last_known_status"] for d in accounts.values()]
-
-            if "LOGGING" in statuses:
-                cycle_delay = random.uniform(10, 20)
-            elif any(
-                s in statuses
-                for s in ["AVAILABLE", "ACTIVE", "REFRESHING", "TRANSFERRING"]
-            ):
-                cycle_delay = random.uniform(30, 60)
-            else:
-                cycle_delay = random.uniform(60, 120)
+            # ⏰ نوم لحد أقرب موعد فحص (أو discovery) - وأي diff بيصحينا بدري
+            next_due = polling.next_due_in()
+            cycle_delay = DISCOVERY_INTERVAL - (time.monotonic() - last_discovery)
+            if next_due is not None:
+                cycle_delay = min(cycle_delay, next_due)
+            cycle_delay = min(max(cycle_delay, MONITOR_MIN_SLEEP), MONITOR_MAX_SLEEP)
 
             logger.debug(
-                f"💤 Next check in {cycle_delay:.1f}s (TTL={smart_cache.cache_ttl:.0f}s, changes={changes_detected})"
+                f"💤 Next check in {cycle_delay:.1f}s (scheduled={len(polling)}, "
+                f"TTL={smart_cache.cache_ttl:.0f}s, changes={changes_detected})"
             )
-            await asyncio.sleep(cycle_delay)
+            pending_diffs = await _wait_for_diffs(diff_queue, cycle_delay)
 
         except Exception as e:
             logger.exception("❌ Monitor error")
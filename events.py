@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📣 Snapshot Diff & Event Bus
+حساب الفرق بين كل snapshot والتاني + نشره على Pub/Sub داخلي
+✅ المشتركين بيتفاعلوا مع التغييرات بس بدل ما يلفوا على كل الحسابات
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Mapping, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ═══════════════════════════════════════════════════════════════
+# ⚙️ ثوابت
+# ═══════════════════════════════════════════════════════════════
+
+SNAPSHOT_DIFF_TOPIC = "snapshot.diff"
+
+# الحقول اللي بنتابع تغييرها بين الـ snapshots
+DIFF_FIELDS: Tuple[str, ...] = ("Status", "Taken", "Available", "Sender", "Group")
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🧮 Snapshot Diff
+# ═══════════════════════════════════════════════════════════════
+
+
+@dataclass(frozen=True)
+class AccountChange:
+    """تغيير حساب واحد: field → (القيمة القديمة, القيمة الجديدة)"""
+
+    account_id: str
+    old: Mapping
+    new: Mapping
+    fields: Mapping[str, Tuple[str, str]]
+
+    @property
+    def status_changed(self) -> bool:
+        return "Status" in self.fields
+
+
+@dataclass(frozen=True)
+class SnapshotDiff:
+    """
+    الفرق بين snapshot قديم وجديد
+
+    - added: حسابات جديدة (في أول snapshot كل الحسابات بتعتبر added)
+    - removed: حسابات اختفت
+    - changed: حسابات اتغير فيها حقل من DIFF_FIELDS
+    """
+
+    added: Tuple[Mapping, ...] = ()
+    removed: Tuple[Mapping, ...] = ()
+    changed: Tuple[AccountChange, ...] = ()
+    is_initial: bool = False
+    created_at: datetime = field(default_factory=datetime.now)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+    def status_changes(self) -> List[AccountChange]:
+        return [change for change in self.changed if change.status_changed]
+
+    def touched_ids(self) -> Set[str]:
+        """كل IDs الحسابات اللي اتضافت أو اتغيرت"""
+        ids = {change.account_id for change in self.changed}
+        ids.update(str(account.get("idAccount", "")) for account in self.added)
+        ids.discard("")
+        return ids
+
+    def summary(self) -> str:
+        return (
+            f"+{len(self.added)} -{len(self.removed)} ~{len(self.changed)} "
+            f"(status: {len(self.status_changes())})"
+        )
+
+
+def compute_diff(
+    old_by_id: Mapping[str, Mapping],
+    new_by_id: Mapping[str, Mapping],
+    fields: Tuple[str, ...] = DIFF_FIELDS,
+) -> SnapshotDiff:
+    """
+    حساب الفرق بين فهرسين (idAccount → الحساب) في لفة واحدة O(N)
+
+    الصفوف اللي ما اتغيرتش في الـ incremental merge هي نفس الـ object
+    فبنتخطاها من غير مقارنة الحقول
+    """
+    is_initial = not old_by_id
+    added: List[Mapping] = []
+    changed: List[AccountChange] = []
+
+    for account_id, new in new_by_id.items():
+        old = old_by_id.get(account_id)
+        if old is None:
+            added.append(new)
+            continue
+
+        if old is new:
+            continue
+
+        diff_fields = {}
+        for name in fields:
+            old_value = old.get(name, "")
+            new_value = new.get(name, "")
+            if old_value != new_value:
+                diff_fields[name] = (old_value, new_value)
+
+        if diff_fields:
+            changed.append(AccountChange(account_id, old, new, diff_fields))
+
+    removed = tuple(
+        old for account_id, old in old_by_id.items() if account_id not in new_by_id
+    )
+
+    return SnapshotDiff(
+        added=tuple(added),
+        removed=removed,
+        changed=tuple(changed),
+        is_initial=is_initial,
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📣 Event Bus (Pub/Sub داخل نفس العملية)
+# ═══════════════════════════════════════════════════════════════
+
+
+class EventBus:
+    """
+    Pub/Sub بسيط:
+    - subscribe(topic, callback): callback عادي أو async (بيتشغل كـ task)
+    - subscribe_queue(topic): asyncio.Queue للـ workers اللي بتسحب في دورتها
+    """
+
+    def __init__(self):
+        self._callbacks: Dict[str, List[Callable[[Any], Any]]] = {}
+        self._queues: Dict[str, List[asyncio.Queue]] = {}
+
+    def subscribe(self, topic: str, callback: Callable[[Any], Any]):
+        self._callbacks.setdefault(topic, []).append(callback)
+
+    def unsubscribe(self, topic: str, callback: Callable[[Any], Any]):
+        callbacks = self._callbacks.get(topic, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def subscribe_queue(self, topic: str) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue()
+        self._queues.setdefault(topic, []).append(queue)
+        return queue
+
+    def unsubscribe_queue(self, topic: str, queue: asyncio.Queue):
+        queues = self._queues.get(topic, [])
+        if queue in queues:
+            queues.remove(queue)
+
+    def publish(self, topic: str, event: Any):
+        """نشر حدث لكل المشتركين (أخطاء المشترك ما بتوقفش الباقيين)"""
+        for queue in self._queues.get(topic, []):
+            queue.put_nowait(event)
+
+        for callback in list(self._callbacks.get(topic, [])):
+            try:
+                result = callback(event)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.exception(f"❌ Event subscriber error on '{topic}': {e}")
+
+
+def drain_queue(queue: asyncio.Queue) -> List[Any]:
+    """سحب كل الأحداث المتراكمة من غير انتظار"""
+    events = []
+    while True:
+        try:
+            events.append(queue.get_nowait())
+        except asyncio.QueueEmpty:
+            return events
+
+
+# Global event bus
+event_bus = EventBus()
@@ -18,7 +18,6 @@ import json
 import re
 from typing import Dict, List, Optional, Tuple
 
-import aiohttp
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
 # ═══════════════════════════════════════════════════════════
@@ -44,7 +43,10 @@ COOKIES = WEBSITE_CONFIG.get("cookies", {})
 # 🆕 استيرادات إضافية للتكامل مع المراقبة
 # ═══════════════════════════════════════════════════════════
 
+from api_manager import smart_cache
 from core import monitor_account_task
+from http_client import http_pool
+from scheduler import Priority, request_scheduler
 
 # 📊 Global vars
 api_manager_instance = None  # 🆕 سيتم تعيينه من main.py عند التشغيل
@@ -223,63 +225,19 @@ def parse_inputs(field1, field2, field3):
 
 
 # ═══════════════════════════════════════════════════════════
-# 🔐 CSRF Token Manager (مبسط)
+# 🔐 Session + CSRF Token (مشتركين مع api_manager عن طريق http_pool)
 # ═══════════════════════════════════════════════════════════
 
+http_pool.configure(BASE_URL, COOKIES)
 
-class SimpleCSRFManager:
-    """مدير CSRF Token بسيط"""
-
-    def __init__(self, base_url: str, cookies: dict):
-        self.base_url = base_url
-        self.cookies = cookies
-        self.token = None
-        self.session = None
-
-    async def get_token(self) -> str:
-        """الحصول على CSRF Token"""
-        if self.token:
-            return self.token
-
-        await self._refresh_token()
-        return self.token
-
-    async def _refresh_token(self) -> bool:
-        """جلب Token جديد من الموقع"""
-        print(f"\n🔄 جلب CSRF Token جديد...")
-
-        try:
-            if not self.session or self. closed:
-                self.session = aiohttp.ClientSession(cookies=self.cookies)
-
-            async with self.session.get(f"{self.base_url}/senderPage") as resp:
-                if resp.status != 200:
-                    print(f"❌ فشل الطلب: {resp.status}")
-                    return False
-
-                html = await resp.text()
-
-                match = re.search(r'<meta name="csrf-token" content="([^"]+)"', html)
-                if not match:
-                    print("❌ لم يتم العثور على CSRF Token في الصفحة")
-                    return False
-
-                self.token = match.group(1)
-                print(f"✅ تم جلب Token جديد")
-                return True
-
-        except Exception as e:
-            print(f"❌ خطأ في جلب Token: {e}")
-            return False
-
-    async def close(self):
-        """إغلاق الـ Session"""
-        if self.session and not self.session.closed:
-            await self.session.close()
-
-
-# مثيل عام من الـ CSRF Manager
-csrf_manager = SimpleCSRFManager(BASE_URL, COOKIES)
+# Headers بتاعة صفحة الموقع (بتتبعت مع كل طلب على الـ session المشتركة)
+EDIT_HEADERS = {
+    "Accept": "*/*",
+    "Accept-Language": "en-US,en;q=0.9,ar;q=0.8",
+    "Origin": BASE_URL,
+    "Referer": f"{BASE_URL}/senderPage",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
+}
 
 
 # ═══════════════════════════════════════════════════════════
@@ -290,15 +248,19 @@ csrf_manager = SimpleCSRFManager(BASE_URL, COOKIES)
 async def get_account_data(session, account_id):
     """جلب بيانات الحساب الحالية"""
     try:
-        csrf = await csrf_manager.get_token()
+        csrf = await http_pool.get_csrf_token()
         get_data = f"idAccount={account_id}&csrf_token={csrf}"
+        await request_scheduler.acquire(Priority.INTERACTIVE)
 
         async with session.post(
             f"{BASE_URL}/dataFunctions/getAccountData",
-            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            headers={**EDIT_HEADERS, "Content-Type": "application/x-www-form-urlencoded"},
             data=get_data,
         ) as resp:
 
+            if resp.status in [403, 419]:
+                http_pool.invalidate_csrf()
+
             if resp.status != 200:
                 return None
 
@@ -323,7 +285,7 @@ async def get_account_data(session, account_id):
 async def edit_account(session, account_id, final_data):
     """إرسال طلب التعديل للسيرفر"""
     try:
-        csrf = await csrf_manager.get_token()
+        csrf = await http_pool.get_csrf_token()
 
         edit_payload = {
             "idAccount": account_id,
@@ -340,14 +302,18 @@ async def edit_account(session, account_id, final_data):
             "csrf_token": csrf,
         }
 
+        await request_scheduler.acquire(Priority.INTERACTIVE)
         async with session.post(
             f"{BASE_URL}/dataFunctions/editAccount",
-            headers={"Content-Type": "application/json"},
+            headers={**EDIT_HEADERS, "Content-Type": "application/json"},
             json=edit_payload,
         ) as resp:
 
             text = await resp.text()
 
+            if resp.status in [403, 419]:
+                http_pool.invalidate_csrf()
+
             if resp.status == 200:
                 return True, text
             else:
@@ -398,78 +364,75 @@ async def smart_edit_account(account_id, field1="", field2="", field3="") -> Tup
 
     print("\n[SMART EDIT] 2️⃣ Fetching current account data...")
 
-    headers = {
-        "Accept": "*/*",
-        "Accept-Language": "en-US,en;q=0.9,ar;q=0.8",
-        "Origin": BASE_URL,
-        "Referer": f"{BASE_URL}/senderPage",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36",
-    }
+    # 🔌 الـ Session المشتركة (اتصال keep-alive دافي بدل handshake جديد لكل تعديل)
+    session = await http_pool.get_session()
 
-    async with aiohttp.ClientSession(cookies=COOKIES, headers=headers) as session:
+    current_data = await get_account_data(session, account_id)
 
-        current_data = await get_account_data(session, account_id)
+    if not current_data:
+        print("[SMART EDIT]   ❌ Failed to fetch current data")
+        return False, "فشل جلب البيانات", None, changes_report
 
-        if not current_data:
-            print("[SMART EDIT]   ❌ Failed to fetch current data")
-            return False, "فشل جلب البيانات", None, changes_report
+    print(f"[SMART EDIT]   ✅ Current email: {current_data['email']}")
+    print(f"[SMART EDIT]   ✅ Group: {current_data['group']}")
 
-        print(f"[SMART EDIT]   ✅ Current email: {current_data['email']}")
-        print(f"[SMART EDIT]   ✅ Group: {current_data['group']}")
-
-        print("\n[SMART EDIT] 3️⃣ Preparing final data for edit...")
+    print("\n[SMART EDIT] 3️⃣ Preparing final data for edit...")
+    
+    # 🆕 معالجة خاصة للـ backup codes (دمج ذكي)
+    if parsed["backup"]:
+        # User أدخل أكواد جديدة → دمج مع القديمة
+        final_backup_codes = merge_backup_codes(
+            current_data["backup"],  # الأكواد القديمة من الموقع
+            parsed["backup"]          # النص الجديد من User
+        )
+        print(f"[SMART EDIT]   🔀 Smart Merge enabled for backup codes")
         
-        # 🆕 معالجة خاصة للـ backup codes (دمج ذكي)
-        if parsed["backup"]:
-            # User أدخل أكواد جديدة → دمج مع القديمة
-            final_backup_codes = merge_backup_codes(
-                current_data["backup"],  # الأكواد القديمة من الموقع
-                parsed["backup"]          # النص الجديد من User
-            )
-            print(f"[SMART EDIT]   🔀 Smart Merge enabled for backup codes")
-            
-            # عرض التفاصيل
-            old_count = len(current_data["backup"].split(",")) if current_data["backup"] else 0
-            new_count = len(extract_codes_smart(parsed["backup"]))
-            final_count = len(final_backup_codes.split(",")) if final_backup_codes else 0
-            
-            print(f"[SMART EDIT]      📊 Old codes: {old_count}")
-            print(f"[SMART EDIT]      ➕ New codes: {new_count}")
-            print(f"[SMART EDIT]      ✅ Final (merged): {final_count} unique code(s)")
-        else:
-            # User لم يدخل أكواد جديدة → استخدم القديمة فقط
-            final_backup_codes = current_data["backup"]
-
-        final_data = {
-            "email": parsed["email"] or current_data["email"],
-            "password": parsed["password"] or current_data["password"],
-            "backup": final_backup_codes,  # ← استخدام الدمج الذكي
-            "group": current_data["group"],
-        }
+        # عرض التفاصيل
+        old_count = len(current_data["backup"].split(",")) if current_data["backup"] else 0
+        new_count = len(extract_codes_smart(parsed["backup"]))
+        final_count = len(final_backup_codes.split(",")) if final_backup_codes else 0
+        
+        print(f"[SMART EDIT]      📊 Old codes: {old_count}")
+        print(f"[SMART EDIT]      ➕ New codes: {new_count}")
+        print(f"[SMART EDIT]      ✅ Final (merged): {final_count} unique code(s)")
+    else:
+        # User لم يدخل أكواد جديدة → استخدم القديمة فقط
+        final_backup_codes = current_data["backup"]
+
+    final_data = {
+        "email": parsed["email"] or current_data["email"],
+        "password": parsed["password"] or current_data["password"],
+        "backup": final_backup_codes,  # ← استخدام الدمج الذكي
+        "group": current_data["group"],
+    }
 
-        print(f"[SMART EDIT]   📧 Final email: {final_data['email']}")
-        if parsed["email"]:
-            print(f"[SMART EDIT]      ↪️ Changed from: {current_data['email']}")
-        if parsed["password"]:
-            print(f"[SMART EDIT]   🔑 Password: Will be changed")
-        if parsed["backup"]:
-            print(f"[SMART EDIT]   📋 Backup codes: Merged successfully")
+    print(f"[SMART EDIT]   📧 Final email: {final_data['email']}")
+    if parsed["email"]:
+        print(f"[SMART EDIT]      ↪️ Changed from: {current_data['email']}")
+    if parsed["password"]:
+        print(f"[SMART EDIT]   🔑 Password: Will be changed")
+    if parsed["backup"]:
+        print(f"[SMART EDIT]   📋 Backup codes: Merged successfully")
 
-        print("\n[SMART EDIT] 4️⃣ Sending edit request to server...")
+    print("\n[SMART EDIT] 4️⃣ Sending edit request to server...")
 
-        success, response = await edit_account(session, account_id, final_data)
+    success, response = await edit_account(session, account_id, final_data)
 
-        print("\n" + "=" * 60)
-        if success:
-            print("[SMART EDIT] ✅ Edit completed successfully!")
-            print(f"[SMART EDIT] 📋 Response: {response[:100]}")
-        else:
-            print("[SMART EDIT] ❌ Ed failed!")
-            print(f"[SMART EDIT] 📋 Response: {response[:200]}")
-        print("=" * 60)
+    print("\n" + "=" * 60)
+    if success:
+        print("[SMART EDIT] ✅ Edit completed successfully!")
+        print(f"[SMART EDIT] 📋 Response: {response[:100]}")
+
+        # 🩹 تحديث الصف ده بس في الـ cache (من غير full refetch)
+        if parsed["email"]:
+            smart_cache.patch_account(account_id, Sender=final_data["email"])
+    else:
+        print("[SMART EDIT] ❌ Ed failed!")
+        print(f"[SMART EDIT] 📋 Response: {response[:200]}")
+    print("=" * 60)
 
-        # 🆕 إرجاع Email + changes_report للرسالة الديناميكية
-        return success, response, final_data.get("email"), changes_report
+    # 🆕 إرجاع Email + changes_report للرسالة الديناميكية
+    return success, response, final_data.get("email"), changes_report
 
 
 # ═══════════════════════════════════════════════════════════
@@ -523,10 +486,10 @@ async def handle_edit_sender_button(update, context):
     # 🆕 جلب Email وحفظه في الحالة
     email_to_store = None
     try:
-        async with aiohttp.ClientSession(cookies=COOKIES) as session:
-            account_data = await get_account_data(session, account_id)
-            if account_data:
-                email_to_store = account_data.get("email")
+        session = await http_pool.get_session()
+        account_data = await get_account_data(session, account_id)
+        if account_data:
+            email_to_store = account_data.get("email")
     except Exception as e:
         print(f"[EDIT MODE] ⚠️ Failed to fetch email for {account_id}: {e}")
 
@@ -784,4 +747,4 @@ def register_handlers(application):
 
 async def cleanup():
     """تنظيف الموارد"""
-    await csrf_manager.close()
+    await http_pool.close()
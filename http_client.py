@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔌 Shared HTTP Client Pool
+Session واحدة (keep-alive) + CSRF Token مشترك لكل الموديولات
+✅ api_manager و edit-sender بيستخدموا نفس الاتصالات الدافية
+✅ تجديد الـ Token قبل ما يخلص (مش بعد ما الطلب يفشل)
+"""
+
+import asyncio
+import logging
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import aiohttp
+
+from config import CSRF_REFRESH_MARGIN, CSRF_TOKEN_TTL
+from scheduler import Priority, Ticket, request_scheduler
+from stats import stats
+
+logger = logging.getLogger(__name__)
+
+CSRF_META_PATTERN = re.compile(r'<meta name="csrf-token" content="([^"]+)"')
+
+
+class HTTPClientPool:
+    """
+    مدير HTTP مشترك:
+    - aiohttp.ClientSession واحدة بـ connector مشترك (TCP/TLS بيتعمل مرة واحدة)
+    - CSRF Token واحد بـ TTL + Lock (طلب تجديد واحد مهما كان عدد المنتظرين)
+    - Task في الخلفية بتجدد الـ Token قبل انتهائه بـ CSRF_REFRESH_MARGIN
+    """
+
+    def __init__(self):
+        self.base_url: Optional[str] = None
+        self.cookies: Dict = {}
+
+        self.session: Optional[aiohttp.ClientSession] = None
+
+        # CSRF Token cache
+        self.csrf_token: Optional[str] = None
+        self.csrf_expires_at: Optional[datetime] = None
+
+        self._csrf_lock: Optional[asyncio.Lock] = None
+        self._refresher: Optional[asyncio.Task] = None
+        self._refresh_wakeup: Optional[asyncio.Event] = None
+
+    def configure(self, base_url: str, cookies: Dict):
+        """ضبط الموقع والكوكيز (بيتنادى من أي موديول قبل أول طلب)"""
+        self.base_url = base_url
+        self.cookies = cookies or {}
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """الـ Session المشتركة (بتتعمل أول مرة بس)"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=10, limit_per_host=5)
+            timeout = aiohttp.ClientTimeout(total=30)
+
+            self.session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout, cookies=self.cookies
+            )
+        return self.session
+
+    def is_csrf_valid(self) -> bool:
+        return bool(
+            self.csrf_token
+            and self.csrf_expires_at
+            and datetime.now() < self.csrf_expires_at
+        )
+
+    def invalidate_csrf(self):
+        """إلغاء الـ Token (بعد 403/419) - التجديد الاستباقي بيصحى يجيب واحد على طول"""
+        self.csrf_token = None
+        self.csrf_expires_at = None
+        if self._refresh_wakeup is not None:
+            self._refresh_wakeup.set()
+
+    async def get_csrf_token(
+        self,
+        force_refresh: bool = False,
+        priority: Priority = Priority.INTERACTIVE,
+        ticket: Optional[Ticket] = None,
+    ) -> Optional[str]:
+        """Get CSRF token with caching (التجديد بياخد تصريح بأولوية الطالب)"""
+        global stats
+
+        if not force_refresh and self.is_csrf_valid():
+            stats.cache_hits += 1
+            return self.csrf_token
+
+        if self._csrf_lock is None:
+            self._csrf_lock = asyncio.Lock()
+
+        async with self._csrf_lock:
+            # حد تاني جدده واحنا مستنيين الـ Lock
+            if not force_refresh and self.is_csrf_valid():
+                stats.cache_hits += 1
+                return self.csrf_token
+
+            await request_scheduler.acquire(priority, ticket)
+            return await self._fetch_csrf_token()
+
+    async def _fetch_csrf_token(self) -> Optional[str]:
+        global stats
+
+        logger.info("🔄 Fetching CSRF token...")
+        stats.csrf_refreshes += 1
+        stats.total_requests += 1
+
+        session = await self.get_session()
+
+        try:
+            async with session.get(f"{self.base_url}/senderPage") as response:
+                if response.status == 200:
+                    html = await response.text()
+                    match = CSRF_META_PATTERN.search(html)
+                    if match:
+                        self.csrf_token = match.group(1)
+                        self.csrf_expires_at = datetime.now() + timedelta(
+                            seconds=CSRF_TOKEN_TTL
+                        )
+                        logger.info(f"✅ CSRF cached ({CSRF_TOKEN_TTL}s)")
+                        self._ensure_refresher()
+                        return self.csrf_token
+        except Exception as e:
+            logger.error(f"❌ CSRF fetch error: {e}")
+            stats.errors += 1
+
+        return None
+
+    def _ensure_refresher(self):
+        if self._refresher is None or self._refresher.done():
+            self._refresher = asyncio.ensure_future(self._refresh_loop())
+
+    async def _wait_for_wakeup(self, delay: float):
+        """نوم لحد delay أو لحد ما الـ Token يتلغي (invalidate_csrf)"""
+        try:
+            await asyncio.wait_for(self._refresh_wakeup.wait(), timeout=delay)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _refresh_loop(self):
+        """
+        🔁 تجديد استباقي: قبل الانتهاء بـ CSRF_REFRESH_MARGIN
+
+        مفيش expiry (الـ Token اتلغى) = تجديد فوراً، عشان أول طلب تفاعلي
+        ما يستناش fetch متزامن
+        """
+        if self._refresh_wakeup is None:
+            self._refresh_wakeup = asyncio.Event()
+
+        while self.session is not None and not self.session.closed:
+            self._refresh_wakeup.clear()
+
+            if self.csrf_expires_at is None:
+                delay = 0
+            else:
+                delay = (
+                    self.csrf_expires_at - datetime.now()
+                ).total_seconds() - CSRF_REFRESH_MARGIN
+
+            if delay > 0:
+                await self._wait_for_wakeup(delay)
+                continue
+
+            logger.debug("🔁 Proactive CSRF refresh")
+            # Token لسه صالح (قرب يخلص) → force، ملغي → لو حد جدده خلاص مفيش طلب
+            if not await self.get_csrf_token(
+                force_refresh=self.is_csrf_valid(), priority=Priority.BACKGROUND
+            ):
+                await self._wait_for_wakeup(30)
+
+    async def close(self):
+        """إغلاق الـ Session وإيقاف التجديد"""
+        if self._refresher is not None and not self._refresher.done():
+            self._refresher.cancel()
+        self._refresher = None
+
+        if self.session and not self.session.closed:
+            await self.session.close()
+
+
+# Global HTTP pool
+http_pool = HTTPClientPool()
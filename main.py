@@ -24,18 +24,23 @@ from telegram.ext import (
 from api_manager import OptimizedAPIManager, smart_cache
 from config import FINAL_STATUSES, TRANSITIONAL_STATUSES
 from core import (
+    MAX_CONCURRENT_MONITORS,  # 🎯 حد المراقبات المؤقتة (متعرف في core.py بس)
     continuous_monitor,
     format_number,
     get_status_description_ar,
     get_status_emoji,
     is_admin,
-    load_monitored_accounts,
     monitor_account_task,  # 🆕 استيراد من core.py
+    monitoring_semaphore,
     parse_sender_data,
     wait_for_status_change,
 )
+from monitored_store import monitored_store
+from scheduler import request_scheduler
 from sheets.worker import start_sheet_worker
 from stats import stats
+from storage import storage_writer
+from transitions import transition_model
 from web_api.server import start_web_api
 
 # 🔧 استيراد معالجات تعديل السيندر
@@ -63,10 +68,6 @@ with open("config.json", "r", encoding="utf-8") as f:
 # 🎯 Global Constants
 # ═══════════════════════════════════════════════════════════════
 
-# 🎯 تحديد حد أقصى 10 خيوط مؤقتة في نفس الوقت
-MAX_CONCURRENT_MONITORS = 10
-monitoring_semaphore = asyncio.Semaphore(MAX_CONCURRENT_MONITORS)
-
 # Global vars
 telegram_app = None
 api_manager = None
@@ -288,15 +289,15 @@ async def search_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 f"💵 المتاح: {format_number(result.get('Available', '0'))}"
             )
 
-            accounts = load_monitored_accounts()
-            # تحقق بالـ ID
-            is_monitored = any(
-                d.get("account_id") == account_id for d in accounts.values()
-            )
-
-            if is_monitored:
+            # تحقق بالـ ID - O(1)
+            if account_id in monitored_store:
                 text += f"\n\n🔄 *هذا الحساب تحت المراقبة* (ID-based)"
 
+            # ♻️ الرد من snapshot قديم (التحديث شغال في الخلفية)
+            cache_age = smart_cache.age()
+            if cache_age is not None and not smart_cache.is_cache_valid():
+                text += f"\n\n♻️ _بيانات من الكاش منذ {cache_age:.0f}s (جاري التحديث)_"
+
             await msg.edit_text(text, parse_mode="Markdown")
         else:
             await msg.edit_text(
@@ -315,13 +316,12 @@ async def monitored_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not is_admin(update.effective_user.id, admin_ids):
         return
 
-    accounts = load_monitored_accounts()
-    if not accounts:
+    if not len(monitored_store):
         await update.message.reply_text("📭 لا توجد حسابات تحت المراقبة حالياً")
         return
 
     # ✅ عرض الصفحة الأولى
-    await send_monitored_page(update.message, page=1, accounts=accounts)
+    await send_monitored_page(update.message, page=1)
 
 
 def create_pagination_keyboard(page: int, total_pages: int) -> InlineKeyboardMarkup:
@@ -350,18 +350,23 @@ def create_pagination_keyboard(page: int, total_pages: int) -> InlineKeyboardMar
     return InlineKeyboardMarkup([buttons])
 
 
-async def send_monitored_page(message, page: int, accounts: dict):
+def _monitored_sources_line() -> str:
+    """عدد الحسابات لكل مصدر (من الفهرس - من غير لف على الحسابات)"""
+    sources = monitored_store.counts_by("source")
+    bot_count = sources.get("bot", 0)
+    return f" (🤖 {bot_count} | 👤 {len(monitored_store) - bot_count})"
+
+
+async def send_monitored_page(message, page: int):
     """
     عرض صفحة من الحسابات المراقبة (رسالة جديدة)
 
     Args:
         message: رسالة التليجرام
         page: رقم الصفحة (يبدأ من 1)
-        accounts: dict الحسابات المراقبة
     """
     items_per_page = 10  # ✅ 10 حسابات لكل صفحة
-    accounts_list = list(accounts.items())
-    total_accounts = len(accounts_list)
+    total_accounts = len(monitored_store)
 
     # حساب عدد الصفحات
     total_pages = max(1, (total_accounts + items_per_page - 1) // items_per_page)
@@ -369,10 +374,9 @@ async def send_monitored_page(message, page: int, accounts: dict):
     # التأكد من رقم الصفحة صحيح
     page = max(1, min(page, total_pages))
 
-    # حساب الحسابات المعروضة في الصفحة الحالية
+    # حساب الحسابات المعروضة في الصفحة الحالية (من غير نسخ كل الحسابات)
     start_idx = (page - 1) * items_per_page
-    end_idx = start_idx + items_per_page
-    page_accounts = accounts_list[start_idx:end_idx]
+    page_accounts = monitored_store.page(start_idx, items_per_page)
 
     # بناء النص
     text = f"📊 *الحسابات المراقبة* (صفحة {page}/{total_pages})\n"
@@ -387,7 +391,7 @@ async def send_monitored_page(message, page: int, accounts: dict):
         text += f"{idx}. {source} `{email}` | {status_emoji} `{status}`\n"
 
     text += f"\n━━━━━━━━━━━━━━━━━━━━━━━━\n"
-    text += f"📈 الإجمالي: {total_accounts} حساب"
+    text += f"📈 الإجمالي: {total_accounts} حساب{_monitored_sources_line()}"
 
     # إضافة أزرار التنقل (لو في أكتر من صفحة)
     keyboard = None
@@ -397,21 +401,19 @@ async def send_monitored_page(message, page: int, accounts: dict):
     await message.reply_text(text, parse_mode="Markdown", reply_markup=keyboard)
 
 
-async def update_monitored_page(message, page: int, accounts: dict):
+async def update_monitored_page(message, page: int):
     """
     تحديث صفحة موجودة (عند التنقل بين الصفحات)
 
     نفس المنطق تماماً، لكن بدل reply_text نستخدم edit_text
     """
     items_per_page = 10
-    accounts_list = list(accounts.items())
-    total_accounts = len(accounts_list)
+    total_accounts = len(monitored_store)
     total_pages = max(1, (total_accounts + items_per_page - 1) // items_per_page)
     page = max(1, min(page, total_pages))
 
     start_idx = (page - 1) * items_per_page
-    end_idx = start_idx + items_per_page
-    page_accounts = accounts_list[start_idx:end_idx]
+    page_accounts = monitored_store.page(start_idx, items_per_page)
 
     text = f"📊 *الحسابات المراقبة* (صفحة {page}/{total_pages})\n"
     text += "━━━━━━━━━━━━━━━━━━━━━━━━\n\n"
@@ -424,7 +426,7 @@ async def update_monitored_page(message, page: int, accounts: dict):
         text += f"{idx}. {source} `{email}` | {status_emoji} `{status}`\n"
 
     text += f"\n━━━━━━━━━━━━━━━━━━━━━━━━\n"
-    text += f"📈 الإجمالي: {total_accounts} حساب"
+    text += f"📈 الإجمالي: {total_accounts} حساب{_monitored_sources_line()}"
 
     keyboard = None
     if total_pages > 1:
@@ -471,13 +473,12 @@ async def handle_monitored_pagination(
             )
             return
 
-        # ✅ تحميل الحسابات وعرض الصفحة
-        accounts = load_monitored_accounts()
-        if not accounts:
+        # ✅ عرض الصفحة
+        if not len(monitored_store):
             await query.answer("❌ لا توجد حسابات", show_alert=True)
             return
 
-        await update_monitored_page(query.message, page, accounts)
+        await update_monitored_page(query.message, page)
         await query.answer()  # ✅ إشعار بسيط (بدون نص)
 
     except ValueError as e:
@@ -511,18 +512,40 @@ async def stats_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     hours = max((datetime.now() - reset_time).seconds / 3600, 0.01)
     requests_per_hour = stats.total_requests / hours
 
+    burst_done = stats.burst_targets_resolved + stats.burst_targets_expired
+    burst_avg_life = stats.burst_target_seconds / burst_done if burst_done else 0.0
+    burst_avg_ticks = stats.burst_target_ticks / burst_done if burst_done else 0.0
+
     text = (
         "📊 *إحصائيات النظام*\n\n"
         f"📈 إجمالي الطلبات: {stats.total_requests}\n"
         f"⏱️ المعدل: {requests_per_hour:.1f} طلب/ساعة\n"
         f"🚀 Burst activations: {stats.burst_activations}\n"
+        f"🎯 Burst targets: resolved {stats.burst_targets_resolved} / "
+        f"expired {stats.burst_targets_expired} "
+        f"(avg {burst_avg_life:.0f}s, {burst_avg_ticks:.1f} ticks, "
+        f"active {len(smart_cache.burst_targets)})\n"
+        f"⏱️ Burst ticks: {stats.burst_ticks} fetched / "
+        f"{stats.burst_ticks_reused} reused\n"
+        f"🔮 Transitions learned: {transition_model.summary()}\n"
+        f"💾 Storage writer: {storage_writer.summary()}\n"
         f"⚡ اكتشافات سريعة: {stats.fast_detections}\n"
         f"🎯 TTL adjustments: {stats.adaptive_adjustments}\n"
         f"🔄 CSRF refreshes: {stats.csrf_refreshes}\n"
         f"📦 Batch fetches: {stats.batch_fetches}\n"
+        f"🔀 Incremental fetches: {stats.incremental_fetches}\n"
+        f"🔗 Coalesced fetches: {stats.coalesced_fetches}\n"
+        f"🧮 Lookups: delta {stats.lookup_delta_decisions} / "
+        f"full {stats.lookup_full_decisions} "
+        f"(delta misses {stats.lookup_delta_misses})\n"
+        f"🧮 Costs: {api_manager.planner.summary()}\n"
         f"💾 Cache hits: {stats.cache_hits}\n"
+        f"♻️ Stale serves: {stats.stale_serves} "
+        f"(revalidations: {stats.background_revalidations})\n"
         f"❌ Errors: {stats.errors}\n"
         f"💾 Cache rate: {(stats.cache_hits / max(stats.total_requests, 1) * 100):.1f}%\n\n"
+        f"🚦 *Upstream scheduler* ({request_scheduler.rate:g} req/s):\n"
+        f"```\n{request_scheduler.metrics_summary()}\n```\n"
         f"⚡ Mode: Adaptive Hybrid\n"
         f"🧠 Current TTL: {smart_cache.cache_ttl:.0f}s\n"
         f"🕐 منذ: {reset_time.strftime('%Y-%m-%d %H:%M:%S')}"
@@ -540,7 +563,6 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     from datetime import datetime
 
-    accounts = load_monitored_accounts()
     csrf_valid = (
         api_manager.csrf_expires_at and datetime.now() < api_manager.csrf_expires_at
     )
@@ -564,7 +586,7 @@ async def status_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         f"🕐 Cache Age: {cache_age}\n"
         f"🧠 Current TTL: {smart_cache.cache_ttl:.0f}s\n"
         f"🚀 Burst Mode: {'✅ نشط' if smart_cache.burst_mode_active else '❌ معطل'}\n"
-        f"🔄 الحسابات المراقبة: {len(accounts)}\n\n"
+        f"🔄 الحسابات المراقبة: {len(monitored_store)}\n\n"
         f"*⚡ التحسينات:*\n"
         f"• Strict ID validation: ✅\n"
         f"• Burst mode (60s): ✅\n"
@@ -595,6 +617,9 @@ async def post_init(application: Application):
     logger.info("🔧 Initializing API Manager...")
     await api_manager.initialize()
 
+    # 🗃️ حفظ الحسابات المراقبة دورياً (write-behind)
+    monitored_store.start_flusher()
+
     # ------------------- تشغيل الـ Workers الأساسية -------------------
 
     # المراقب المستمر للحسابات
@@ -738,6 +763,10 @@ if __name__ == "__main__":
 
         if api_manager:
             asyncio.run(api_manager.close())
+
+        # 🗃️ آخر تعديلات الحسابات المراقبة + أي كتابات مستنية
+        monitored_store.flush()
+        storage_writer.flush()
         
         # تنظيف موارد edit_sender
         asyncio.run(edit_sender_module.cleanup())
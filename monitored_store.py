@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🗃️ Monitored Accounts Store
+الحسابات المراقبة في الذاكرة + حفظ مؤجل (write-behind) على الديسك
+✅ كل تعديل بيحصل في الذاكرة بس ويتعلّم dirty
+✅ flush دوري واحد (atomic) بدل load + save كامل لكل حساب
+✅ انتهاء الحسابات القديمة بـ heap مرتب بـ last_check بدل اللف على الكل
+✅ المفتاح هو account_id + فهارس ثانوية (الحالة / المصدر / الشات)
+"""
+
+import asyncio
+import atexit
+import heapq
+import itertools
+import logging
+from collections import defaultdict
+from datetime import datetime
+from typing import DefaultDict, Dict, Iterable, List, Optional, Set, Tuple
+
+from config import MONITORED_ACCOUNTS_FILE, MONITORED_FLUSH_INTERVAL
+from storage import read_json, storage_writer
+
+logger = logging.getLogger(__name__)
+
+
+def _timestamp(value: Optional[str]) -> Optional[float]:
+    """last_check (ISO) → epoch seconds"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (ValueError, TypeError):
+        return None
+
+
+# الحقول اللي ليها فهرس ثانوي: اسم الفهرس → الحقل في بيانات الحساب
+INDEXED_FIELDS: Dict[str, str] = {
+    "status": "last_known_status",
+    "source": "source",
+    "chat": "chat_id",
+}
+
+
+class MonitoredAccountStore:
+    """
+    مخزن الحسابات المراقبة (account_id → data)
+
+    - القراءة من الذاكرة (الملف بيتقري مرة واحدة بس)
+    - التعديلات بتتعلّم في _dirty وبتتكتب في flush واحد كل MONITORED_FLUSH_INTERVAL
+    - _expiry: min-heap (last_check, key) - entries القديمة بتتشال lazy
+    - _indexes: قيمة الحقل → IDs (by status / source / chat) بتتحدث مع كل تعديل
+    - المفاتيح القديمة f"{account_id}_{email}" بتتحول لـ account_id عند التحميل
+    """
+
+    def __init__(self, path: str = MONITORED_ACCOUNTS_FILE):
+        self.path = path
+        self._accounts: Optional[Dict[str, Dict]] = None
+        self._dirty: Set[str] = set()
+        self._indexes: Dict[str, DefaultDict[object, Set[str]]] = {
+            name: defaultdict(set) for name in INDEXED_FIELDS
+        }
+
+        self._expiry: List[Tuple[float, int, str]] = []
+        self._seq = itertools.count()
+
+        self._flusher: Optional[asyncio.Task] = None
+        atexit.register(self.flush)
+
+    # ───────────────────────────────────────────────────────────
+    # 📥 التحميل
+    # ───────────────────────────────────────────────────────────
+
+    def _load(self) -> Dict[str, Dict]:
+        if self._accounts is not None:
+            return self._accounts
+
+        raw: Dict[str, Dict] = {}
+        try:
+            raw = read_json(self.path, default={})
+        except Exception as e:
+            logger.error(f"❌ Error loading monitored accounts: {e}")
+
+        self._accounts = self._rekey(raw)
+        self._rebuild_indexes()
+
+        migrated = set(raw) ^ set(self._accounts)
+        if migrated:
+            # الملف لسه بالمفاتيح القديمة → يتكتب من جديد في الـ flush الجاي
+            self._dirty.update(self._accounts)
+            logger.info(
+                f"🗃️ Migrated {len(raw)} monitored entries to account_id keys "
+                f"({len(raw) - len(self._accounts)} duplicates dropped)"
+            )
+        return self._accounts
+
+    @staticmethod
+    def _rekey(accounts: Dict[str, Dict]) -> Dict[str, Dict]:
+        """
+        account_id كمفتاح - لو الحساب متكرر (تعديل إيميل قديم) الأحدث last_check يكسب
+        """
+        rekeyed: Dict[str, Dict] = {}
+        for key, data in accounts.items():
+            account_id = str(data.get("account_id") or "") or key
+            current = rekeyed.get(account_id)
+            if current is None or (data.get("last_check") or "") > (
+                current.get("last_check") or ""
+            ):
+                rekeyed[account_id] = dict(data)
+        return rekeyed
+
+    def _rebuild_indexes(self):
+        for index in self._indexes.values():
+            index.clear()
+        for key, data in self._accounts.items():
+            self._index(key, data)
+        self._rebuild_expiry()
+
+    def _index(self, key: str, data: Dict):
+        for name, field in INDEXED_FIELDS.items():
+            self._indexes[name][data.get(field)].add(key)
+
+    def _unindex(self, key: str, data: Dict):
+        for name, field in INDEXED_FIELDS.items():
+            index = self._indexes[name]
+            value = data.get(field)
+            keys = index.get(value)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del index[value]
+
+    def _rebuild_expiry(self):
+        self._expiry = []
+        for key, data in self._accounts.items():
+            ts = _timestamp(data.get("last_check"))
+            if ts is not None:
+                self._expiry.append((ts, next(self._seq), key))
+        heapq.heapify(self._expiry)
+
+    def _push_expiry(self, key: str, data: Dict):
+        ts = _timestamp(data.get("last_check"))
+        if ts is not None:
+            heapq.heappush(self._expiry, (ts, next(self._seq), key))
+
+        # entries قديمة كتير (touch كل دورة) → نعيد البناء
+        if len(self._expiry) > 2 * len(self._accounts) + 64:
+            self._rebuild_expiry()
+
+    # ───────────────────────────────────────────────────────────
+    # 📖 القراءة
+    # ───────────────────────────────────────────────────────────
+
+    def all(self) -> Dict[str, Dict]:
+        """نسخة من كل الحسابات (تعديلها ما بيأثرش على المخزن)"""
+        return {key: dict(data) for key, data in self._load().items()}
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __contains__(self, account_id: object) -> bool:
+        return account_id in self._load()
+
+    def get(self, account_id: str) -> Optional[Dict]:
+        """نسخة من بيانات حساب واحد - O(1)"""
+        data = self._load().get(account_id)
+        return dict(data) if data is not None else None
+
+    def ids(self) -> Set[str]:
+        return set(self._load())
+
+    def page(self, offset: int, limit: int) -> List[Tuple[str, Dict]]:
+        """صفحة بترتيب الإضافة - O(offset + limit) من غير نسخ الكل"""
+        accounts = self._load()
+        return [
+            (key, dict(accounts[key]))
+            for key in itertools.islice(accounts, offset, offset + limit)
+        ]
+
+    def ids_by(self, index: str, value: object) -> Set[str]:
+        """IDs الحسابات اللي الحقل بتاعها = value (index: status / source / chat)"""
+        self._load()
+        return set(self._indexes[index].get(value, ()))
+
+    def counts_by(self, index: str) -> Dict[object, int]:
+        """عدد الحسابات لكل قيمة في الفهرس"""
+        self._load()
+        return {value: len(keys) for value, keys in self._indexes[index].items()}
+
+    # ───────────────────────────────────────────────────────────
+    # ✏️ التعديل (في الذاكرة + dirty)
+    # ───────────────────────────────────────────────────────────
+
+    def replace_all(self, accounts: Dict[str, Dict]):
+        """استبدال كل الحسابات (واجهة save_monitored_accounts القديمة)"""
+        self._load()
+        self._dirty.update(self._accounts)
+        self._accounts = self._rekey(accounts)
+        self._dirty.update(self._accounts)
+        self._rebuild_indexes()
+
+    def upsert(self, account_id: str, data: Dict):
+        """إضافة/استبدال حساب (تعديل الإيميل بيستبدل نفس الـ entry)"""
+        accounts = self._load()
+        old = accounts.get(account_id)
+        if old is not None:
+            self._unindex(account_id, old)
+
+        accounts[account_id] = dict(data)
+        self._index(account_id, accounts[account_id])
+        self._dirty.add(account_id)
+        self._push_expiry(account_id, accounts[account_id])
+
+    def update_status(self, account_id: str, new_status: str) -> bool:
+        """تحديث الحالة + last_check - O(1) (False لو الحساب مش مراقب)"""
+        accounts = self._load()
+        data = accounts.get(account_id)
+        if data is None:
+            return False
+
+        self._unindex(account_id, data)
+        # copy-on-write: الـ dict القديم ممكن يكون في snapshot مستني الكتابة
+        data = {
+            **data,
+            "last_known_status": new_status,
+            "last_check": datetime.now().isoformat(),
+        }
+        accounts[account_id] = data
+        self._index(account_id, data)
+        self._dirty.add(account_id)
+        self._push_expiry(account_id, data)
+        return True
+
+    def touch(self, account_ids: Iterable[str]) -> int:
+        """تحديث last_check لمجموعة حسابات - O(k)"""
+        accounts = self._load()
+        now_iso = datetime.now().isoformat()
+        touched = 0
+        for account_id in set(account_ids):
+            data = accounts.get(account_id)
+            if data is None:
+                continue
+            data = accounts[account_id] = {**data, "last_check": now_iso}
+            self._dirty.add(account_id)
+            self._push_expiry(account_id, data)
+            touched += 1
+        return touched
+
+    def remove(self, keys: Iterable[str]) -> int:
+        accounts = self._load()
+        removed = 0
+        for key in keys:
+            data = accounts.pop(key, None)
+            if data is not None:
+                self._unindex(key, data)
+                self._dirty.add(key)
+                removed += 1
+        return removed
+
+    def expire(
+        self, cutoff: datetime, keep_statuses: Iterable[str], min_count: int = 1
+    ) -> List[str]:
+        """
+        حذف الحسابات اللي last_check بتاعها أقدم من cutoff وحالتها مش في keep_statuses
+
+        بيلف على الأقدم بس (heap) - لو العدد أقل من min_count ما بيحذفش حاجة
+        """
+        accounts = self._load()
+        keep_statuses = set(keep_statuses)
+        cutoff_ts = cutoff.timestamp()
+
+        popped: List[Tuple[float, int, str]] = []
+        expired: List[str] = []
+
+        while self._expiry and self._expiry[0][0] < cutoff_ts:
+            entry = heapq.heappop(self._expiry)
+            ts, _, key = entry
+            data = accounts.get(key)
+
+            # entry قديم (الحساب اتشال أو last_check اتحدث)
+            if data is None or _timestamp(data.get("last_check")) != ts:
+                continue
+
+            popped.append(entry)
+            if data.get("last_known_status", "") not in keep_statuses:
+                expired.append(key)
+
+        if len(expired) < min_count:
+            # مفيش حذف المرة دي → نرجّع الحسابات للـ heap عشان الدورة الجاية
+            for entry in popped:
+                heapq.heappush(self._expiry, entry)
+            return []
+
+        # الحسابات المهمة اللي اتخطيناها تفضل متتبعة
+        expired_set = set(expired)
+        for entry in popped:
+            if entry[2] not in expired_set:
+                heapq.heappush(self._expiry, entry)
+
+        self.remove(expired)
+        return expired
+
+    # ───────────────────────────────────────────────────────────
+    # 💾 الحفظ (write-behind)
+    # ───────────────────────────────────────────────────────────
+
+    @property
+    def dirty_count(self) -> int:
+        return len(self._dirty)
+
+    def _take_payload(self) -> Optional[Dict[str, Dict]]:
+        """
+        snapshot للحفظ (shallow copy) وتصفير الـ dirty
+
+        التحويل لـ JSON بيحصل في thread الكتابة - الـ dicts الداخلية عمرها
+        ما بتتعدل في مكانها (copy-on-write) فالـ snapshot بيفضل ثابت
+        """
+        if not self._dirty or self._accounts is None:
+            return None
+        payload = dict(self._accounts)
+        self._dirty.clear()
+        return payload
+
+    def flush(self) -> bool:
+        """حفظ فوري لو فيه تعديلات (shutdown / atexit) - بيستنى الكتابة تخلص"""
+        if not self.flush_async():
+            return False
+        return storage_writer.flush()
+
+    def flush_async(self) -> bool:
+        """تسليم المحتوى لـ storage_writer (الكتابة في thread منفصل)"""
+        payload = self._take_payload()
+        if payload is None:
+            return False
+        storage_writer.write_json(self.path, payload)
+        return True
+
+    def start_flusher(self):
+        """تشغيل الـ flush الدوري (مرة واحدة)"""
+        if self._flusher is None or self._flusher.done():
+            self._flusher = asyncio.ensure_future(self._flush_loop())
+
+    async def _flush_loop(self):
+        logger.info(
+            f"🗃️ Monitored store flusher started ({MONITORED_FLUSH_INTERVAL}s)"
+        )
+        try:
+            while True:
+                await asyncio.sleep(MONITORED_FLUSH_INTERVAL)
+                self.flush_async()
+        finally:
+            self.flush()
+
+
+# Global monitored accounts store
+monitored_store = MonitoredAccountStore()
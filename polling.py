@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+⏰ Polling Scheduler
+جدولة فحص كل حساب مراقب حسب حالته (POLLING_INTERVALS)
+✅ Min-heap بمواعيد الفحص الجاية - O(log n) للإضافة والسحب
+✅ المراقب بيصحى ويعمل fetch بس لما يكون فيه حسابات عليها الدور
+"""
+
+import heapq
+import itertools
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+
+class PollingScheduler:
+    """
+    مواعيد الفحص الجاية لكل حساب
+
+    - schedule(id, status): الموعد الجاي = دلوقتي + interval_fn(status)
+    - pop_due(): الحسابات اللي جه دورها (وبتتشال لحد ما تتجدول تاني)
+    - المواعيد القديمة في الـ heap بتتشال lazy (مقارنة بالموعد الحالي للحساب)
+    """
+
+    def __init__(self, interval_fn: Callable[[str], float]):
+        self.interval_fn = interval_fn
+        self._heap: List[Tuple[float, int, str]] = []
+        self._due_at: Dict[str, float] = {}
+        self._seq = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._due_at)
+
+    def __contains__(self, account_id: str) -> bool:
+        return account_id in self._due_at
+
+    def schedule(self, account_id: str, status: str, now: Optional[float] = None):
+        """جدولة الفحص الجاي حسب الحالة"""
+        now = time.monotonic() if now is None else now
+        self.schedule_at(account_id, now + self.interval_fn(status))
+
+    def schedule_at(self, account_id: str, due_at: float):
+        self._due_at[account_id] = due_at
+        heapq.heappush(self._heap, (due_at, next(self._seq), account_id))
+
+    def remove(self, account_id: str):
+        self._due_at.pop(account_id, None)
+
+    def sync(
+        self, account_ids: Iterable[str], now: Optional[float] = None
+    ) -> List[str]:
+        """
+        مطابقة الجدول مع قائمة الحسابات المراقبة
+
+        - حساب جديد → عليه الدور فوراً
+        - حساب اتشال من المراقبة → يتشال من الجدول
+
+        Returns:
+            الحسابات الجديدة
+        """
+        now = time.monotonic() if now is None else now
+        account_ids = set(account_ids)
+
+        for account_id in list(self._due_at):
+            if account_id not in account_ids:
+                del self._due_at[account_id]
+
+        added = [a for a in account_ids if a not in self._due_at]
+        for account_id in added:
+            self.schedule_at(account_id, now)
+        return added
+
+    def _peek(self) -> Optional[Tuple[float, str]]:
+        while self._heap:
+            due_at, _, account_id = self._heap[0]
+            if self._due_at.get(account_id) != due_at:
+                heapq.heappop(self._heap)  # موعد قديم أو حساب اتشال
+                continue
+            return due_at, account_id
+        return None
+
+    def pop_due(self, now: Optional[float] = None) -> List[str]:
+        """كل الحسابات اللي موعدها جه (بتتشال لحد ما تتجدول تاني)"""
+        now = time.monotonic() if now is None else now
+        due = []
+        while True:
+            head = self._peek()
+            if head is None or head[0] > now:
+                return due
+            heapq.heappop(self._heap)
+            del self._due_at[head[1]]
+            due.append(head[1])
+
+    def next_due_in(self, now: Optional[float] = None) -> Optional[float]:
+        """الثواني لحد أقرب موعد (None لو الجدول فاضي)"""
+        now = time.monotonic() if now is None else now
+        head = self._peek()
+        if head is None:
+            return None
+        return max(0.0, head[0] - now)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🧱 Sender Records
+تمثيل مضغوط لصفوف updateSenderPage (__slots__ + tuple بدل dict لكل صف)
+✅ Column projection: الأعمدة اللي محدش بيقراها مش بتتخزن أصلاً
+✅ واجهة dict-like (get / [] / in / keys / items) للكود القديم
+"""
+
+import sys
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple
+
+from config import SENDER_COLUMNS
+
+# ═══════════════════════════════════════════════════════════════
+# 📐 ترتيب الأعمدة في رد updateSenderPage
+# ═══════════════════════════════════════════════════════════════
+
+UPSTREAM_INDEX_MAP: Dict[str, int] = {
+    "idAccount": 0,
+    "image": 1,
+    "Sender": 2,
+    "Start": 3,
+    "Last Update": 4,
+    "Taken": 5,
+    "Status": 6,
+    "Available": 7,
+    "password": 8,
+    "backupCodes": 9,
+    "Group": 10,
+    "groupNameId": 11,
+    "Take": 12,
+    "Keep": 13,
+}
+
+# أعمدة قيمها بتتكرر كتير (نعمل لها intern عشان كل الصفوف تشاور على نفس الـ string)
+_INTERNED_COLUMNS = {"Status", "Group", "groupNameId"}
+
+
+class RecordSchema:
+    """
+    وصف الأعمدة المحتفظ بيها (مشترك بين كل الصفوف - مش بيتكرر لكل صف)
+    """
+
+    __slots__ = ("columns", "positions", "_source", "_interned")
+
+    def __init__(self, columns: Sequence[str]):
+        unknown = [c for c in columns if c not in UPSTREAM_INDEX_MAP]
+        if unknown:
+            raise ValueError(f"❌ Unknown sender columns: {unknown}")
+
+        self.columns: Tuple[str, ...] = tuple(columns)
+        self.positions: Dict[str, int] = {c: i for i, c in enumerate(self.columns)}
+        self._source: Tuple[int, ...] = tuple(UPSTREAM_INDEX_MAP[c] for c in self.columns)
+        self._interned: Tuple[bool, ...] = tuple(
+            c in _INTERNED_COLUMNS for c in self.columns
+        )
+
+    def from_row(self, row: Sequence[Any]) -> "SenderRecord":
+        """تحويل صف خام من الموقع لـ SenderRecord (نفس قواعد التحويل القديمة)"""
+        size = len(row)
+        values = []
+        for idx, intern_it in zip(self._source, self._interned):
+            value = str(row[idx]) if idx < size and row[idx] else ""
+            values.append(sys.intern(value) if intern_it else value)
+        return SenderRecord(self, tuple(values))
+
+    def from_values(self, values: Sequence[Any]) -> "SenderRecord":
+        """بناء SenderRecord من قيم بنفس ترتيب columns (زي الـ snapshot المحفوظ)"""
+        return SenderRecord(
+            self,
+            tuple(
+                sys.intern(str(value)) if intern_it else str(value)
+                for value, intern_it in zip(values, self._interned)
+            ),
+        )
+
+    def from_dict(self, data: Mapping) -> "SenderRecord":
+        """بناء SenderRecord من dict (للبيانات المحفوظة أو المُصنّعة محلياً)"""
+        values = []
+        for column, intern_it in zip(self.columns, self._interned):
+            value = str(data.get(column) or "")
+            values.append(sys.intern(value) if intern_it else value)
+        return SenderRecord(self, tuple(values))
+
+
+class SenderRecord(Mapping):
+    """
+    صف حساب واحد - immutable
+
+    بيتعامل زي dict للقراءة: record.get("Status") / record["Sender"] / dict(record)
+    """
+
+    __slots__ = ("_schema", "_values")
+
+    def __init__(self, schema: RecordSchema, values: Tuple[str, ...]):
+        self._schema = schema
+        self._values = values
+
+    def get(self, key: str, default: Optional[Any] = None) -> Any:
+        pos = self._schema.positions.get(key)
+        if pos is None:
+            return default
+        return self._values[pos]
+
+    def __getitem__(self, key: str) -> str:
+        pos = self._schema.positions.get(key)
+        if pos is None:
+            raise KeyError(key)
+        return self._values[pos]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._schema.positions
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._schema.columns)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __repr__(self) -> str:
+        return f"SenderRecord({self.to_dict()!r})"
+
+    @property
+    def values_tuple(self) -> Tuple[str, ...]:
+        """القيم الخام بنفس ترتيب schema.columns"""
+        return self._values
+
+    def to_dict(self) -> Dict[str, str]:
+        return dict(zip(self._schema.columns, self._values))
+
+    def replace(self, **changes: str) -> "SenderRecord":
+        """نسخة جديدة مع تعديل بعض الأعمدة (الأعمدة غير المحتفظ بيها بتتجاهل)"""
+        values = list(self._values)
+        for key, value in changes.items():
+            pos = self._schema.positions.get(key)
+            if pos is not None:
+                values[pos] = str(value or "")
+        return SenderRecord(self._schema, tuple(values))
+
+
+# Global schema (حسب SENDER_COLUMNS في config.py)
+SENDER_SCHEMA = RecordSchema(SENDER_COLUMNS)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🚦 Upstream Request Scheduler
+كل طلب للموقع بياخد تصريح من هنا الأول
+✅ Token bucket عام (حماية من الـ BLOCK عند الضغط)
+✅ أولويات: BURST > INTERACTIVE > BACKGROUND
+✅ مقاييس الطابور ووقت الانتظار لكل أولوية
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from enum import IntEnum
+from typing import Dict, List, Optional, Tuple
+
+from config import UPSTREAM_BURST_SIZE, UPSTREAM_RATE_LIMIT
+
+logger = logging.getLogger(__name__)
+
+
+class Priority(IntEnum):
+    """أولوية الطلب (الرقم الأصغر بيتخدم الأول)"""
+
+    BURST = 0  # مراقبة Burst بعد الإضافة/التعديل
+    INTERACTIVE = 1  # أوامر المستخدم (/search، إضافة، تعديل، Web API)
+    BACKGROUND = 2  # المراقب المستمر والتحديثات في الخلفية
+
+
+class Ticket:
+    """
+    تصريح طلب واحد في الطابور
+
+    ممكن يترقى لأولوية أعلى وهو مستني (لو طلب أهم انضم لنفس الـ batch)
+
+    seq: رقم الـ entry الحالي في الـ heap - أي entry تاني لنفس التذكرة
+    (قبل الترقية أو من acquire قديم) بيتشال lazy ومش بيتخدم
+    """
+
+    __slots__ = ("priority", "enqueued_at", "future", "seq")
+
+    def __init__(self, priority: Priority):
+        self.priority = priority
+        self.enqueued_at: Optional[float] = None
+        self.future: Optional[asyncio.Future] = None
+        self.seq: Optional[int] = None
+
+
+class LaneMetrics:
+    """مقاييس أولوية واحدة"""
+
+    __slots__ = ("granted", "total_wait", "max_wait")
+
+    def __init__(self):
+        self.granted = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, wait: float):
+        self.granted += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.granted if self.granted else 0.0
+
+
+class RequestScheduler:
+    """
+    Token bucket + طابور أولويات (heap)
+
+    - rate: عدد الطلبات المسموحة في الثانية (على المدى الطويل)
+    - burst: أقصى عدد طلبات متتالية من غير انتظار
+    - الطلب بياخد التصريح فوراً لو فيه token ومفيش حد أهم مستني
+    """
+
+    def __init__(
+        self, rate: float = UPSTREAM_RATE_LIMIT, burst: int = UPSTREAM_BURST_SIZE
+    ):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+
+        self._heap: List[Tuple[int, int, Ticket]] = []
+        self._seq = itertools.count()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.lanes: Dict[Priority, LaneMetrics] = {
+            p: LaneMetrics() for p in Priority
+        }
+
+    # ───────────────────────────────────────────────────────────
+    # 🪣 Token bucket
+    # ───────────────────────────────────────────────────────────
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_refill
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.last_refill = now
+
+    # ───────────────────────────────────────────────────────────
+    # 🎟️ التصاريح
+    # ───────────────────────────────────────────────────────────
+
+    async def acquire(
+        self,
+        priority: Priority = Priority.BACKGROUND,
+        ticket: Optional[Ticket] = None,
+    ):
+        """
+        انتظار تصريح لطلب واحد للموقع
+
+        Args:
+            priority: أولوية الطلب
+            ticket: تذكرة معمولة مسبقاً (عشان حد تاني يقدر يرقيها بـ promote)
+        """
+        ticket = ticket or Ticket(priority)
+        ticket.priority = min(ticket.priority, priority)
+        ticket.enqueued_at = time.monotonic()
+
+        self._refill()
+        if self._pop_waiting() is None and self.tokens >= 1:
+            self.tokens -= 1
+            self.lanes[ticket.priority].record(0.0)
+            return
+
+        ticket.future = asyncio.get_running_loop().create_future()
+        self._push(ticket)
+        self._ensure_dispatcher()
+
+        try:
+            await ticket.future
+        except asyncio.CancelledError:
+            # التصريح اتدى بالفعل؟ رجّع الـ token
+            if ticket.future.done() and not ticket.future.cancelled():
+                self.tokens = min(self.capacity, self.tokens + 1)
+            raise
+
+    def promote(self, ticket: Optional[Ticket], priority: Priority):
+        """ترقية تذكرة لسه مستنية لأولوية أعلى"""
+        if ticket is None or priority >= ticket.priority:
+            return
+
+        ticket.priority = priority
+        if ticket.future is not None and not ticket.future.done():
+            # الـ entry القديم بيتشال lazy لما يطلع من الـ heap (seq مش مطابق)
+            self._push(ticket)
+            if self._wakeup is not None:
+                self._wakeup.set()
+
+    def _push(self, ticket: Ticket):
+        """entry جديد للتذكرة (وهو بس اللي صالح)"""
+        ticket.seq = next(self._seq)
+        heapq.heappush(self._heap, (ticket.priority, ticket.seq, ticket))
+
+    @staticmethod
+    def _is_live(seq: int, ticket: Ticket) -> bool:
+        return (
+            seq == ticket.seq
+            and ticket.future is not None
+            and not ticket.future.done()
+        )
+
+    def _ensure_dispatcher(self):
+        if self._wakeup is None:
+            self._wakeup = asyncio.Event()
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.ensure_future(self._dispatch())
+
+    def _pop_waiting(self) -> Optional[Ticket]:
+        """أعلى تذكرة لسه مستنية (بيشيل المتخدمة والملغية والـ entries القديمة)"""
+        while self._heap:
+            _, seq, ticket = self._heap[0]
+            if not self._is_live(seq, ticket):
+                heapq.heappop(self._heap)
+                continue
+            return ticket
+        return None
+
+    async def _dispatch(self):
+        """توزيع التصاريح بالترتيب كل ما يتوفر token"""
+        while self._pop_waiting() is not None:
+            self._refill()
+
+            if self.tokens < 1:
+                delay = (1 - self.tokens) / self.rate
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            _, _, ticket = heapq.heappop(self._heap)
+            self.tokens -= 1
+            wait = time.monotonic() - ticket.enqueued_at
+            self.lanes[ticket.priority].record(wait)
+            ticket.future.set_result(None)
+
+            if wait > 5:
+                logger.warning(
+                    f"🚦 {ticket.priority.name} request waited {wait:.1f}s "
+                    f"for an upstream slot"
+                )
+
+    # ───────────────────────────────────────────────────────────
+    # 📊 المقاييس
+    # ───────────────────────────────────────────────────────────
+
+    def queue_depth(self) -> Dict[Priority, int]:
+        """عدد الطلبات المستنية في كل أولوية"""
+        depth = {p: 0 for p in Priority}
+        for _, seq, ticket in self._heap:
+            if self._is_live(seq, ticket):
+                depth[ticket.priority] += 1
+        return depth
+
+    def metrics_summary(self) -> str:
+        """سطر لكل أولوية: طابور / عدد / متوسط وأقصى انتظار"""
+        depth = self.queue_depth()
+        lines = []
+        for priority in Priority:
+            lane = self.lanes[priority]
+            lines.append(
+                f"{priority.name}: queue={depth[priority]} granted={lane.granted} "
+                f"wait avg={lane.avg_wait * 1000:.0f}ms max={lane.max_wait * 1000:.0f}ms"
+            )
+        return "\n".join(lines)
+
+
+# Global scheduler
+request_scheduler = RequestScheduler()
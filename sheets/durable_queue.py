@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+📼 Durable Queue
+Queue على الديسك بـ journal (JSONL) بيتكتب append-only
+✅ put / ack / nack = سطر واحد بيتضاف للملف (مش إعادة كتابة الملف كله)
+✅ Lease + visibility timeout: العنصر اللي اتسحب ومتعملوش ack بيرجع تاني
+✅ next_attempt_at لكل عنصر (تأجيل المحاولة الجاية)
+✅ Compaction دوري: إعادة كتابة الـ journal بالعناصر الحية بس (في thread الكتابة)
+"""
+
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from storage import codec, read_json, storage_writer
+
+logger = logging.getLogger(__name__)
+
+QUEUES_DIR = Path("data/queues")
+
+# Compaction لما عدد السطور يعدي (live × COMPACT_RATIO + COMPACT_MIN_RECORDS)
+COMPACT_RATIO = 2
+COMPACT_MIN_RECORDS = 200
+
+# العنصر المسحوب بيرجع للـ queue لو متعملوش ack خلال المدة دي
+DEFAULT_VISIBILITY_TIMEOUT = 300
+
+
+@dataclass
+class QueueEntry:
+    """عنصر في الـ queue (seq بيتستخدم في ack / nack)"""
+
+    seq: int
+    item: Dict
+    next_attempt_at: float = 0.0
+    leased_until: float = 0.0
+
+
+class DurableQueue:
+    """
+    Queue دائم بـ journal
+
+    سطور الـ journal:
+    - {"op": "put", "seq": n, "item": {...}, "at": next_attempt_at}
+    - {"op": "nack", "seq": n, "item": {...}, "at": next_attempt_at}
+    - {"op": "ack", "seq": n}
+
+    key_field: لو متحدد، put لعنصر بنفس المفتاح بيستبدل القديم (آخر قيمة بس)
+    legacy_file: ملف JSON القديم ({legacy_key: [...]}) بيتنقل للـ journal أول مرة
+    """
+
+    def __init__(
+        self,
+        name: str,
+        key_field: Optional[str] = None,
+        legacy_file: Optional[Path] = None,
+        legacy_key: str = "emails",
+        directory: Path = QUEUES_DIR,
+    ):
+        self.name = name
+        self.path = Path(directory) / f"{name}.jsonl"
+        self.key_field = key_field
+        self.legacy_file = legacy_file
+        self.legacy_key = legacy_key
+
+        self._entries: Optional[Dict[int, QueueEntry]] = None
+        self._by_key: Dict[str, int] = {}
+        self._next_seq = 1
+        self._records = 0
+        self._journal = None
+
+        # الـ journal handle مشترك مع thread الكتابة وقت الـ compaction
+        self._lock = threading.Lock()
+        self._compacting = False
+
+    # ───────────────────────────────────────────────────────────
+    # 📥 التحميل (replay للـ journal)
+    # ───────────────────────────────────────────────────────────
+
+    def _load(self) -> Dict[int, QueueEntry]:
+        if self._entries is not None:
+            return self._entries
+
+        self._entries = {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.path.exists():
+            self._replay()
+        elif self.legacy_file is not None and Path(self.legacy_file).exists():
+            self._migrate_legacy()
+
+        self._journal = open(self.path, "a", encoding="utf-8")
+        return self._entries
+
+    def _replay(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = codec.loads(line)
+                except ValueError:
+                    # آخر سطر ممكن يكون اتقطع لو العملية وقفت فجأة
+                    logger.warning(f"⚠️ Skipping corrupt line in {self.path.name}")
+                    continue
+
+                self._records += 1
+                seq = record["seq"]
+                self._next_seq = max(self._next_seq, seq + 1)
+
+                if record["op"] == "ack":
+                    self._drop(seq)
+                else:
+                    self._apply(seq, record["item"], record.get("at", 0.0))
+
+    def _migrate_legacy(self):
+        try:
+            items = read_json(self.legacy_file).get(self.legacy_key, [])
+        except Exception as e:
+            logger.error(f"❌ Error migrating {self.legacy_file}: {e}")
+            return
+
+        for item in items:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._apply(seq, item, 0.0)
+
+        self._rewrite()
+        os.replace(self.legacy_file, f"{self.legacy_file}.migrated")
+        logger.info(
+            f"📼 Migrated {len(items)} items from {Path(self.legacy_file).name} "
+            f"to {self.path.name}"
+        )
+
+    def _apply(self, seq: int, item: Dict, next_attempt_at: float):
+        """put / nack في الذاكرة (مع استبدال العنصر القديم بنفس المفتاح)"""
+        if self.key_field:
+            key = str(item.get(self.key_field, ""))
+            old_seq = self._by_key.get(key)
+            if old_seq is not None and old_seq != seq:
+                self._entries.pop(old_seq, None)
+            self._by_key[key] = seq
+
+        entry = self._entries.get(seq)
+        if entry is None:
+            self._entries[seq] = QueueEntry(seq, item, next_attempt_at)
+        else:
+            entry.item = item
+            entry.next_attempt_at = next_attempt_at
+
+    def _drop(self, seq: int) -> Optional[QueueEntry]:
+        entry = self._entries.pop(seq, None)
+        if entry is not None and self.key_field:
+            key = str(entry.item.get(self.key_field, ""))
+            if self._by_key.get(key) == seq:
+                del self._by_key[key]
+        return entry
+
+    # ───────────────────────────────────────────────────────────
+    # 📝 الـ journal
+    # ───────────────────────────────────────────────────────────
+
+    def _append(self, record: Dict):
+        line = codec.dumps_line(record) + "\n"
+        with self._lock:
+            self._journal.write(line)
+            self._journal.flush()
+            self._records += 1
+
+    def _maybe_compact(self):
+        if self._compacting:
+            return
+        live = len(self._entries)
+        if self._records > live * COMPACT_RATIO + COMPACT_MIN_RECORDS:
+            self.compact()
+
+    def _rewrite(self):
+        """كتابة العناصر الحية بس في journal جديد (atomic)"""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for entry in self._entries.values():
+                record = {
+                    "op": "put",
+                    "seq": entry.seq,
+                    "item": entry.item,
+                    "at": entry.next_attempt_at,
+                }
+                f.write(codec.dumps_line(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._records = len(self._entries)
+
+    def compact(self):
+        """
+        Compaction: الـ journal بيرجع بحجم العناصر الحية
+
+        الـ loop بياخد snapshot بس (نسخة من العناصر + مكان آخر سطر)، والكتابة
+        والـ fsync بيحصلوا في storage_writer. السطور اللي بتتضاف في الوقت ده
+        بتتنقل للـ journal الجديد قبل الاستبدال
+        """
+        self._load()
+        if self._compacting:
+            return
+
+        with self._lock:
+            self._journal.flush()
+            offset = self._journal.tell()
+
+        # نسخة من كل item (الـ workers ممكن يعدلوا فيه قبل nack)
+        snapshot = [
+            {
+                "op": "put",
+                "seq": entry.seq,
+                "item": dict(entry.item),
+                "at": entry.next_attempt_at,
+            }
+            for entry in self._entries.values()
+        ]
+        self._compacting = True
+        storage_writer.write_with(
+            self.path, lambda: self._write_compacted(snapshot, offset)
+        )
+
+    def _write_compacted(self, snapshot: List[Dict], offset: int):
+        """(thread الكتابة) snapshot + السطور اللي بعد offset → journal جديد (atomic)"""
+        tmp_path = f"{self.path}.tmp"
+        before = self._records
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for record in snapshot:
+                    f.write(codec.dumps_line(record) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+
+                # الـ lock بيقفل الإضافة بس وقت نقل الذيل الصغير والاستبدال
+                with self._lock:
+                    self._journal.flush()
+                    with open(self.path, "rb") as journal:
+                        journal.seek(offset)
+                        tail = journal.read().decode("utf-8")
+                    f.write(tail)
+                    f.flush()
+                    os.fsync(f.fileno())
+
+                    os.replace(tmp_path, self.path)
+                    self._journal.close()
+                    self._journal = open(self.path, "a", encoding="utf-8")
+                    self._records = len(snapshot) + tail.count("\n")
+        finally:
+            self._compacting = False
+
+        logger.debug(
+            f"📼 Compacted {self.path.name}: {before} → {self._records} records"
+        )
+
+    # ───────────────────────────────────────────────────────────
+    # 🔄 العمليات
+    # ───────────────────────────────────────────────────────────
+
+    def put(self, item: Dict, delay: float = 0.0) -> int:
+        """إضافة عنصر (متاح بعد delay ثانية) - سطر واحد في الـ journal"""
+        self._load()
+        seq = self._next_seq
+        self._next_seq += 1
+
+        next_attempt_at = time.time() + delay if delay else 0.0
+        self._apply(seq, item, next_attempt_at)
+        self._append({"op": "put", "seq": seq, "item": item, "at": next_attempt_at})
+        self._maybe_compact()
+        return seq
+
+    def lease(
+        self,
+        limit: Optional[int] = None,
+        visibility_timeout: float = DEFAULT_VISIBILITY_TIMEOUT,
+    ) -> List[QueueEntry]:
+        """
+        سحب العناصر الجاهزة (next_attempt_at عدى ومش مسحوبة)
+
+        العنصر بيفضل مخفي لحد ack / nack أو لحد ما الـ visibility timeout يخلص
+        """
+        now = time.time()
+        leased: List[QueueEntry] = []
+
+        for entry in self._load().values():
+            if entry.next_attempt_at > now or entry.leased_until > now:
+                continue
+            entry.leased_until = now + visibility_timeout
+            leased.append(entry)
+            if limit is not None and len(leased) >= limit:
+                break
+
+        return leased
+
+    def ack(self, seqs: Iterable[int]) -> int:
+        """تأكيد المعالجة (نجاح أو فشل نهائي) - سطر لكل عنصر"""
+        self._load()
+        acked = 0
+        for seq in seqs:
+            if self._drop(seq) is not None:
+                self._append({"op": "ack", "seq": seq})
+                acked += 1
+        if acked:
+            self._maybe_compact()
+        return acked
+
+    def nack(self, seq: int, delay: float = 0.0, item: Optional[Dict] = None) -> bool:
+        """رجوع العنصر للـ queue بعد delay (مع تحديث بياناته لو اتبعتت)"""
+        entry = self._load().get(seq)
+        if entry is None:
+            return False
+
+        next_attempt_at = time.time() + delay if delay else 0.0
+        entry.leased_until = 0.0
+        self._apply(seq, item if item is not None else entry.item, next_attempt_at)
+        self._append(
+            {"op": "nack", "seq": seq, "item": entry.item, "at": next_attempt_at}
+        )
+        self._maybe_compact()
+        return True
+
+    def remove_key(self, key: str) -> bool:
+        """مسح العنصر اللي ليه المفتاح ده (لو key_field متحدد)"""
+        self._load()
+        seq = self._by_key.get(str(key))
+        return seq is not None and self.ack([seq]) == 1
+
+    def items(self) -> List[Dict]:
+        """كل العناصر الحية (للعرض / الإحصائيات)"""
+        return [entry.item for entry in self._load().values()]
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def close(self):
+        """قفل الـ journal (العملية الجاية بتعمل replay من الأول)"""
+        if self._compacting:
+            storage_writer.flush()
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = None
+        self._entries = None
+        self._by_key = {}
+        self._next_seq = 1
+        self._records = 0
@@ -6,18 +6,20 @@
 ✅ تحديث Email في نفس الصف (بدون إضافة صف جديد)
 ✅ البحث بالـ ID في عمود Z
 ✅ المقارنة قبل التحديث (توفير الموارد)
+✅ Batch: batchGet واحد للإيميلات الحالية + batchUpdate واحد للي اتغير بس
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 """
 
 import asyncio
-import json
 import logging
 import random
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Tuple
 
+from .durable_queue import DurableQueue, QueueEntry
 from .error_notifier import track_sheets_errors
+from .google_api import UPDATE_CHUNK_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -33,26 +35,10 @@ EDIT_QUEUE_FILE = Path("data/edit_queue.json")
 # ═══════════════════════════════════════════════════════════
 
 
-def load_edit_queue() -> List[Dict]:
-    """تحميل queue التعديلات"""
-    if EDIT_QUEUE_FILE.exists():
-        try:
-            with open(EDIT_QUEUE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data.get("edits", [])
-        except Exception as e:
-            logger.error(f"❌ Error loading edit_queue.json: {e}")
-    return []
-
-
-def save_edit_queue(edits: List[Dict]):
-    """حفظ queue التعديلات"""
-    try:
-        EDIT_QUEUE_FILE.parent.mkdir(exist_ok=True)
-        with open(EDIT_QUEUE_FILE, "w", encoding="utf-8") as f:
-            json.dump({"edits": edits}, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"❌ Error saving edit_queue.json: {e}")
+# آخر تعديل بس لكل حساب (put بنفس الـ id بيستبدل القديم)
+edit_queue = DurableQueue(
+    "edit_queue", key_field="id", legacy_file=EDIT_QUEUE_FILE, legacy_key="edits"
+)
 
 
 def add_to_edit_queue(account_id: str, new_email: str) -> bool:
@@ -67,19 +53,14 @@ def add_to_edit_queue(account_id: str, new_email: str) -> bool:
         True إذا تمت الإضافة بنجاح
     """
     try:
-        edits = load_edit_queue()
-
-        # تجنب التكرار - نسجل آخر تعديل فقط (overwrite)
-        edits = [edit for edit in edits if edit.get("id") != account_id]
-
-        new_edit = {
-            "id": account_id,
-            "new_email": new_email,
-            "edited_at": datetime.now().isoformat(),
-        }
-
-        edits.append(new_edit)
-        save_edit_queue(edits)
+        # تجنب التكرار - نسجل آخر تعديل فقط (overwrite بالـ key_field)
+        edit_queue.put(
+            {
+                "id": account_id,
+                "new_email": new_email,
+                "edited_at": datetime.now().isoformat(),
+            }
+        )
 
         logger.info(
             f"📝 Added to Edit queue: ID {account_id} → {new_email}"
@@ -91,221 +72,112 @@ def add_to_edit_queue(account_id: str, new_email: str) -> bool:
         return False
 
 
-def clear_edit_entry(account_id: str):
-    """مسح تعديل من الـ queue (نجاح أو فشل)"""
-    try:
-        edits = load_edit_queue()
-        original_count = len(edits)
-
-        edits = [edit for edit in edits if edit.get("id") != account_id]
-
-        if len(edits) < original_count:
-            save_edit_queue(edits)
-            logger.info(f"🗑️ Cleared from Edit queue: ID {account_id}")
-            return True
-
-        return False
-
-    except Exception as e:
-        logger.error(f"❌ Error clearing from Edit queue: {e}")
-        return False
-
-
 # ═══════════════════════════════════════════════════════════
-# 🔍 البحث والقراءة من Google Sheet
+# 📦 معالجة Batch (batchGet واحد + batchUpdate واحد)
 # ═══════════════════════════════════════════════════════════
 
 
-def find_row_by_id(sheets_api, account_id: str) -> Optional[int]:
-    """
-    البحث عن ID في عمود Z والحصول على رقم الصف
-
-    Args:
-        sheets_api: Google Sheets API instance
-        account_id: ID الحساب
+def _read_rows(sheets_api, rows: Dict[str, int]) -> Dict[str, Tuple[str, str]]:
+    """Email (A) و ID (Z) لكل صف في batchGet واحد → {account_id: (email, id)}"""
+    cells = []
+    for row_number in rows.values():
+        cells.append(("A", row_number))
+        cells.append((sheets_api.ID_COLUMN_LETTER, row_number))
 
-    Returns:
-        رقم الصف (1-based) أو None
-    """
-    try:
-        logger.info(f"🔍 Searching for ID {account_id} in column Z...")
-
-        # قراءة عمود Z كامل
-        column_range = f"{sheets_api.sheet_name}!Z:Z"
-        result = (
-            sheets_api.service.spreadsheets()
-            .values()
-            .get(spreadsheetId=sheets_api.spreadsheet_id, range=column_range)
-            .execute()
+    values = sheets_api.read_cells(cells)
+    return {
+        account_id: (
+            values.get(("A", row_number), ""),
+            values.get((sheets_api.ID_COLUMN_LETTER, row_number), "").strip(),
         )
+        for account_id, row_number in rows.items()
+    }
 
-        values = result.get("values", [])
-
-        if not values:
-            logger.warning("⚠️ Column Z is empty")
-            return None
-
-        # البحث عن ID
-        for idx, row in enumerate(values, start=1):
-            if row and str(row[0]).strip() == str(account_id).strip():
-                logger.info(f"✅ Found ID {account_id} at row {idx}")
-                return idx
 
-        logger.warning(f"⚠️ ID {account_id} not found in Sheet")
-        return None
-
-    except Exception as e:
-        logger.error(f"❌ Error searching Sheet: {e}")
-        return None
-
-
-def read_email_from_sheet(sheets_api, row_number: int) -> Optional[str]:
+def process_edit_batch(sheets_api, entries: List[QueueEntry]) -> int:
     """
-    قراءة Email من عمود A
+    معالجة كل التعديلات المسحوبة مع بعض
 
-    Args:
-        sheets_api: Google Sheets API instance
-        row_number: رقم الصف (1-based)
+    1. أرقام الصفوف لكل الـ IDs مرة واحدة (فهرس sheets_api)
+    2. Email + ID الحاليين لكل الصفوف في batchGet واحد
+       (لو الـ ID في الصف مش هو → الفهرس قديم → refresh وقراءة الصفوف دي تاني)
+    3. المقارنة محلياً وكتابة الإيميلات اللي اتغيرت بس في batchUpdate واحد
 
     Returns:
-        Email أو None
+        عدد الإيميلات اللي اتحدثت
     """
-    try:
-        cell_range = f"{sheets_api.sheet_name}!A{row_number}"
-
-        logger.debug(f"📖 Reading {cell_range}...")
-
-        result = (
-            sheets_api.service.spreadsheets()
-            .values()
-            .get(spreadsheetId=sheets_api.spreadsheet_id, range=cell_range)
-            .execute()
-        )
-
-        values = result.get("values", [])
-
-        if values and values[0]:
-            email = values[0][0]
-            logger.debug(f"✅ Read email: {email}")
-            return email
+    edits: Dict[str, str] = {}
+    for entry in entries:
+        account_id = str(entry.item.get("id", "")).strip()
+        new_email = entry.item.get("new_email", "")
+
+        if not account_id or not new_email:
+            logger.warning("⚠️ Invalid edit item - skipping")
+            continue
+
+        logger.info(f"🔄 Processing edit: ID {account_id} → {new_email}")
+        edits[account_id] = new_email
+
+    if not edits:
+        return 0
+
+    # 1. البحث عن الـ IDs في عمود Z (التأكيد بيحصل في قراءة الخطوة 2)
+    rows = sheets_api.find_rows(list(edits), verify=False)
+    for account_id in edits:
+        if account_id not in rows:
+            logger.warning(f"⚠️ ID {account_id} not found in Sheet")
+
+    # 2. قراءة Email + ID الحاليين
+    current = _read_rows(sheets_api, rows)
+
+    stale = [
+        account_id
+        for account_id, (_, row_id) in current.items()
+        if row_id != account_id
+    ]
+    if stale:
+        logger.info(f"🗂️ {len(stale)} rows moved in Sheet - refreshing row index")
+        sheets_api.invalidate_row_index()
+        moved = sheets_api.find_rows(stale, verify=False)
+        for account_id in stale:
+            rows.pop(account_id, None)
+            current.pop(account_id, None)
+        rows.update(moved)
+        current.update(_read_rows(sheets_api, moved))
+
+    # 3. المقارنة
+    cells = []
+    for account_id, row_number in rows.items():
+        current_email, row_id = current.get(account_id, ("", ""))
+        new_email = edits[account_id]
+
+        if row_id != account_id:
+            logger.warning(f"⚠️ ID {account_id} not found in Sheet")
+            continue
+
+        if not current_email:
+            logger.error(f"❌ Could not read email from row {row_number}")
+            continue
 
-        logger.warning(f"⚠️ Cell A{row_number} is empty")
-        return None
-
-    except Exception as e:
-        logger.error(f"❌ Error reading cell A{row_number}: {e}")
-        return None
-
-
-# ═══════════════════════════════════════════════════════════
-# ✏️ تحديث Email في Google Sheet
-# ═══════════════════════════════════════════════════════════
-
-
-@track_sheets_errors(operation="update_email_cell", worker="edit")
-def update_email_cell(
-    sheets_api, row_number: int, new_email: str
-) -> Tuple[bool, str]:
-    """
-    تحديث Email في عمود A
-
-    Args:
-        sheets_api: Google Sheets API instance
-        row_number: رقم الصف (1-based)
-        new_email: البريد الإلكتروني الجديد
-
-    Returns:
-        (success: bool, message: str)
-    """
-    try:
-        cell_range = f"{sheets_api.sheet_name}!A{row_number}"
-
-        logger.info(f"✏️ Updating {cell_range} with email: '{new_email}'")
-
-        body = {"values": [[new_email]]}
-
-        sheets_api.service.spreadsheets().values().update(
-            spreadsheetId=sheets_api.spreadsheet_id,
-            range=cell_range,
-            valueInputOption="USER_ENTERED",
-            body=body,
-        ).execute()
-
-        logger.info(f"✅ Successfully updated {cell_range}")
-        return True, f"Updated {cell_range}"
-
-    except Exception as e:
-        logger.error(f"❌ Error updating cell A{row_number}: {e}")
-        return False, str(e)
-
-
-# ═══════════════════════════════════════════════════════════
-# 🔄 المعالج الرئيسي
-# ═══════════════════════════════════════════════════════════
-
-
-def update_email_in_sheet(
-    sheets_api, account_id: str, new_email: str
-) -> Tuple[bool, str]:
-    """
-    تحديث Email لحساب موجود (بدون إضافة صف جديد)
-
-    الخطوات:
-    1. البحث في عمود Z عن الـ ID
-    2. الحصول على رقم الصف
-    3. قراءة Email الحالي من عمود A
-    4. المقارنة: لو مختلف → تحديث عمود A في نفس الصف
-    5. لو متطابق → مافيش حاجة تتعمل
-
-    Args:
-        sheets_api: Google Sheets API instance
-        account_id: ID الحساب
-        new_email: البريد الإلكتروني الجديد
-
-    Returns:
-        (success: bool, message: str)
-    """
-    try:
-        logger.info(
-            f"🔄 Starting email update for ID {account_id} → {new_email}"
-        )
-
-        # 1. البحث عن ID في عمود Z
-        row_number = find_row_by_id(sheets_api, account_id)
-
-        if not row_number:
-            msg = f"ID {account_id} not found in Sheet"
-            logger.warning(f"⚠️ {msg}")
-            return False, msg
-
-        # 2. قراءة Email الحالي من عمود A
-        current_email = read_email_from_sheet(sheets_api, row_number)
+        if current_email.strip().lower() == new_email.strip().lower():
+            logger.info(f"ℹ️ Email unchanged for ID {account_id} - no update needed")
+            continue
 
-        if current_email is None:
-            msg = f"Could not read email from row {row_number}"
-            logger.error(f"❌ {msg}")
-            return False, msg
+        logger.info(f"✏️ Row {row_number}: {current_email} → {new_email}")
+        cells.append(("A", row_number, new_email))
 
-        # 3. المقارنة
-        if current_email.strip().lower() == new_email.strip().lower():
-            msg = f"Email unchanged for ID {account_id} - no update needed"
-            logger.info(f"ℹ️ {msg}")
-            return True, msg  # مافيش داعي للتحديث
+    if not cells:
+        return 0
 
-        # 4. تحديث عمود A فقط
-        success, update_msg = update_email_cell(sheets_api, row_number, new_email)
+    # 4. تحديث عمود A فقط (طلب واحد)
+    success, message = sheets_api.update_cells(cells)
 
-        if success:
-            logger.info(
-                f"✅ Updated email in row {row_number}: {current_email} → {new_email}"
-            )
-            return True, f"Updated row {row_number}"
-        else:
-            return False, update_msg
+    if not success:
+        logger.error(f"❌ Failed to update {len(cells)} emails: {message}")
+        return 0
 
-    except Exception as e:
-        logger.exception(f"❌ Error in update_email_in_sheet: {e}")
-        return False, str(e)
+    logger.info(f"✅ Updated {len(cells)} emails in one request")
+    return len(cells)
 
 
 # ═══════════════════════════════════════════════════════════
@@ -319,12 +191,10 @@ async def edit_worker(config: Dict, sheets_api):
     🔄 Worker معالجة تعديلات Emails
 
     التدفق:
-    1. قراءة edit_queue.json كل 1-10 ثواني
-    2. لكل تعديل:
-       - البحث في Sheet (عمود Z)
-       - قراءة Email الحالي (عمود A)
-       - المقارنة والتحديث إذا مختلف
-       - مسح من edit_queue.json
+    1. سحب التعديلات من Edit queue كل 1-10 ثواني
+    2. process_edit_batch: أرقام الصفوف + batchGet للإيميلات الحالية
+       + batchUpdate واحد للي اتغير بس
+    3. ack لكل الـ batch مرة واحدة
 
     Args:
         config: إعدادات التطبيق
@@ -347,47 +217,29 @@ async def edit_worker(config: Dict, sheets_api):
 
     while True:
         try:
-            # قراءة Queue
-            edits = load_edit_queue()
+            # سحب التعديلات (lease لحد الـ ack)
+            entries = edit_queue.lease(UPDATE_CHUNK_SIZE)
 
-            if not edits:
+            if not entries:
                 # لا يوجد شيء للمعالجة
                 await asyncio.sleep(random.uniform(interval_min, interval_max))
                 continue
 
-            logger.info(f"📋 Processing {len(edits)} edits from Edit queue")
+            logger.info(f"📋 Processing {len(entries)} edits from Edit queue")
 
-            for edit_item in edits:
-                try:
-                    account_id = edit_item.get("id", "")
-                    new_email = edit_item.get("new_email", "")
+            try:
+                process_edit_batch(sheets_api, entries)
+            except Exception as e:
+                logger.exception(f"❌ Error processing Edit batch: {e}")
 
-                    if not account_id or not new_email:
-                        logger.warning("⚠️ Invalid edit item - skipping")
-                        clear_edit_entry(account_id)
-                        continue
+            # مسح كل الـ batch من Queue مرة واحدة (نجح أو فشل - بدون retry)
+            cleared = edit_queue.ack(entry.seq for entry in entries)
+            logger.info(f"🗑️ Cleared {cleared} edits from Edit queue")
 
-                    logger.info(
-                        f"🔄 Processing edit: ID {account_id} → {new_email}"
-                    )
-
-                    # تحديث Email في Sheet
-                    success, message = update_email_in_sheet(
-                        sheets_api, account_id, new_email
-                    )
-
-                    if success:
-                        logger.info(f"✅ Edit processed successfully: {message}")
-                    else:
-                        logger.error(f"❌ Edit failed: {message}")
-
-                    # مسح من Queue (نجح أو فشل - بدون retry)
-                    clear_edit_entry(account_id)
-
-                except Exception as e:
-                    logger.exception(f"❌ Error processing edit item: {e}")
-                    # مسح حتى لو حصل خطأ
-                    clear_edit_entry(edit_item.get("id", ""))
+            # لسه فيه تعديلات → الـ batch الجاي على طول
+            if len(entries) >= UPDATE_CHUNK_SIZE:
+                await asyncio.sleep(0)
+                continue
 
             # انتظار عشوائي قبل الدورة التالية
             interval = random.uniform(interval_min, interval_max)
@@ -5,19 +5,38 @@
 التعامل مع Google Sheets
 ✅ ID دايماً في عمود Z (ثابت)
 ✅ يكتب في الأعمدة المحددة فقط بدون مسح باقي البيانات
+✅ فهرس ID → رقم الصف في الذاكرة (قراءة عمود Z مرة واحدة بدل كل بحث)
+✅ تتبع الصف الجاي في الذاكرة + تأكيد بقراءة صغيرة بدل تحميل عمود A كامل
 """
 
 import logging
-from typing import Dict, List, Tuple
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
 from google.oauth2.service_account import Credentials
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from storage import read_json, storage_writer
+
 from .error_notifier import track_sheets_errors
 
 logger = logging.getLogger(__name__)
 
+# 🗂️ فهرس ID → صف (بيتحفظ للـ warm restart)
+ROW_INDEX_FILE = Path("data/sheet_row_index.json")
+ROW_INDEX_MAX_AGE = 6 * 3600  # إعادة قراءة عمود Z كاملة لو الفهرس أقدم من كده
+ROW_INDEX_MISS_COOLDOWN = 30  # أقل فاصل بين refresh بسبب ID مش موجود (ثواني)
+
+INVALID_IDS = ["N/A", "pending", "api", ""]
+
+# 📤 أقصى عدد صفوف في كل append (الـ workers بيقسموا الـ batch الكبير على كده)
+APPEND_CHUNK_SIZE = 500
+
+# ✏️ أقصى عدد خلايا في batchUpdate واحد (taken / edit workers)
+UPDATE_CHUNK_SIZE = 500
+
 
 class GoogleSheetsAPI:
     """
@@ -40,6 +59,14 @@ class GoogleSheetsAPI:
         self.spreadsheet_id = spreadsheet_id
         self.sheet_name = sheet_name
 
+        # 🗂️ ID → رقم الصف (1-based) - بيتحمل lazily
+        self._row_index: Optional[Dict[str, int]] = None
+        self._row_index_at: float = 0.0  # وقت آخر قراءة كاملة لعمود Z (epoch)
+        self._row_index_path = ROW_INDEX_FILE
+
+        # 📍 أول صف فاضي في عمود A (None = لازم قراءة كاملة)
+        self._next_row: Optional[int] = None
+
         # Authentication
         try:
             self.creds = Credentials.from_service_account_file(
@@ -92,6 +119,264 @@ class GoogleSheetsAPI:
         except Exception as e:
             logger.warning(f"⚠️ Could not verify/set ID header: {e}")
 
+    # ───────────────────────────────────────────────────────────
+    # 🗂️ فهرس ID → صف
+    # ───────────────────────────────────────────────────────────
+
+    def _load_row_index(self) -> Dict[str, int]:
+        """الفهرس من الذاكرة → من الملف (لو لنفس الشيت ومش قديم) → قراءة عمود Z"""
+        if self._row_index is not None:
+            return self._row_index
+
+        try:
+            saved = read_json(self._row_index_path)
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load row index: {e}")
+            saved = None
+
+        if (
+            saved
+            and saved.get("spreadsheet_id") == self.spreadsheet_id
+            and saved.get("sheet_name") == self.sheet_name
+            and time.time() - saved.get("refreshed_at", 0) < ROW_INDEX_MAX_AGE
+        ):
+            self._row_index = {str(k): int(v) for k, v in saved["rows"].items()}
+            self._row_index_at = saved["refreshed_at"]
+            logger.info(f"🗂️ Row index loaded from disk ({len(self._row_index)} IDs)")
+            return self._row_index
+
+        return self.refresh_row_index()
+
+    def _save_row_index(self):
+        storage_writer.write_json(
+            self._row_index_path,
+            {
+                "spreadsheet_id": self.spreadsheet_id,
+                "sheet_name": self.sheet_name,
+                "refreshed_at": self._row_index_at,
+                "rows": dict(self._row_index),
+            },
+        )
+
+    @track_sheets_errors(operation="refresh_row_index", worker="google_api")
+    def refresh_row_index(self) -> Dict[str, int]:
+        """قراءة عمود Z مرة واحدة وبناء الفهرس من جديد"""
+        result = (
+            self.sheet.values()
+            .get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{self.sheet_name}!{self.ID_COLUMN_LETTER}:{self.ID_COLUMN_LETTER}",
+            )
+            .execute()
+        )
+
+        index: Dict[str, int] = {}
+        for row_number, row in enumerate(result.get("values", []), start=1):
+            if row:
+                # أول صف للـ ID هو اللي بيكسب (نفس سلوك البحث القديم)
+                index.setdefault(str(row[0]).strip(), row_number)
+
+        self._row_index = index
+        self._row_index_at = time.time()
+        self._save_row_index()
+
+        logger.info(f"🗂️ Row index refreshed from column Z ({len(index)} IDs)")
+        return index
+
+    def _row_index_expired(self) -> bool:
+        return time.time() - self._row_index_at >= ROW_INDEX_MAX_AGE
+
+    def find_rows(
+        self, account_ids: List[str], verify: bool = True
+    ) -> Dict[str, int]:
+        """
+        أرقام الصفوف لمجموعة IDs
+
+        - كلهم من الفهرس لو موجودين (من غير أي طلب)
+        - لو فيه ID مش موجود: refresh واحد (مش أكتر من مرة كل ROW_INDEX_MISS_COOLDOWN)
+        - verify: الصفوف اللي جاية من فهرس قديم بتتأكد من عمود Z في batchGet واحد
+          (حد ضاف/مسح صفوف في الشيت) - لو فيه اختلاف: refresh وإعادة البحث
+
+        Args:
+            verify: False لو الطالب بيقرا عمود Z بنفسه قبل الكتابة
+
+        Returns:
+            {account_id: row_number} للـ IDs اللي اتلقت بس
+        """
+        started = time.time()
+        index = self._load_row_index()
+        if self._row_index_expired():
+            index = self.refresh_row_index()
+
+        wanted = [str(account_id).strip() for account_id in account_ids]
+        missing = [account_id for account_id in wanted if account_id not in index]
+
+        if missing and time.time() - self._row_index_at >= ROW_INDEX_MISS_COOLDOWN:
+            logger.info(f"🗂️ {len(missing)} IDs not in row index - refreshing")
+            index = self.refresh_row_index()
+
+        rows = {
+            account_id: index[account_id] for account_id in wanted if account_id in index
+        }
+
+        # الفهرس اتقرا من الشيت في الطلب ده → مضمون
+        if not verify or not rows or self._row_index_at >= started:
+            return rows
+
+        current = self.read_cells(
+            [(self.ID_COLUMN_LETTER, row_number) for row_number in rows.values()]
+        )
+        moved = [
+            account_id
+            for account_id, row_number in rows.items()
+            if current.get((self.ID_COLUMN_LETTER, row_number), "").strip()
+            != account_id
+        ]
+        if not moved:
+            return rows
+
+        logger.info(f"🗂️ {len(moved)} rows moved in Sheet - refreshing row index")
+        index = self.refresh_row_index()
+        for account_id in moved:
+            rows.pop(account_id)
+            if account_id in index:
+                rows[account_id] = index[account_id]
+        return rows
+
+    def find_row(self, account_id: str) -> Optional[int]:
+        """رقم الصف (1-based) للـ ID أو None - متأكد منه في عمود Z"""
+        return self.find_rows([account_id]).get(str(account_id).strip())
+
+    def invalidate_row_index(self):
+        """الفهرس مش مضمون (مثلاً الكتابة اترفضت) → قراءة كاملة في أول بحث"""
+        self._row_index_at = 0.0
+
+    def _index_appended_rows(self, first_row: int, id_values: List[List[str]]):
+        """تحديث الفهرس بالصفوف اللي append_emails لسه كاتبها"""
+        if self._row_index is None:
+            return
+
+        for offset, (item_id,) in enumerate(id_values):
+            if item_id:
+                self._row_index.setdefault(item_id, first_row + offset)
+        self._save_row_index()
+
+    # ───────────────────────────────────────────────────────────
+    # 📍 الصف الجاي
+    # ───────────────────────────────────────────────────────────
+
+    def _read_next_row(self) -> int:
+        """قراءة عمود A كامل (أول مرة أو لو التأكيد فشل)"""
+        result_range = (
+            self.sheet.values()
+            .get(spreadsheetId=self.spreadsheet_id, range=f"{self.sheet_name}!A:A")
+            .execute()
+        )
+        return len(result_range.get("values", [])) + 1
+
+    def _verify_next_row(self, next_row: int, count: int) -> bool:
+        """
+        قراءة صغيرة بحجم الـ batch: الصف اللي قبل next_row مليان والصفوف
+        اللي هنكتب فيها فاضية (محدش ضاف صفوف في الشيت من برة)
+        """
+        first = max(next_row - 1, 1)
+        last = next_row + count - 1
+        result = (
+            self.sheet.values()
+            .get(
+                spreadsheetId=self.spreadsheet_id,
+                range=f"{self.sheet_name}!A{first}:A{last}",
+            )
+            .execute()
+        )
+        values = result.get("values", [])
+
+        if next_row > 1:
+            if not values or not values[0] or values[0][0] == "":
+                return False
+            values = values[1:]
+
+        return not any(row and row[0] != "" for row in values)
+
+    def _resolve_next_row(self, count: int) -> int:
+        if self._next_row is not None:
+            if self._verify_next_row(self._next_row, count):
+                return self._next_row
+            logger.info("   📍 Tracked next row is outdated - re-reading column A")
+
+        self._next_row = self._read_next_row()
+        return self._next_row
+
+    def _append_chunk(self, emails_data: List[Dict], next_row: int) -> int:
+        """كتابة chunk واحد (Email في A و ID في Z) في batchUpdate واحد - بيرجع عدد الصفوف"""
+        logger.info(f"   📍 Next row: {next_row}")
+
+        # تجهيز البيانات لكل عمود على حدة
+        email_values = []  # للـ Email (عمود A فقط)
+        id_values = []  # للـ ID (عمود Z فقط)
+
+        for item in emails_data:
+            # Email في عمود A
+            email = item.get("email", "")
+            email_values.append([email])  # قيمة واحدة فقط
+
+            # ID في عمود Z
+            item_id = item.get("id", "")
+
+            # ✅ تحقق: ID صالح
+            if item_id and item_id not in INVALID_IDS:
+                id_values.append([str(item_id)])  # قيمة واحدة فقط
+            else:
+                id_values.append([""])  # فراغ لو مافيش ID
+
+        # استخدام batchUpdate للكتابة في الأعمدة المحددة فقط
+        last_row = next_row + len(emails_data) - 1
+
+        # Range لكل عمود على حدة
+        email_range = f"{self.sheet_name}!A{next_row}:A{last_row}"
+        id_range = f"{self.sheet_name}!Z{next_row}:Z{last_row}"
+
+        logger.info(f"   📧 Email range: {email_range}")
+        logger.info(f"   🆔 ID range: {id_range}")
+
+        batch_data = [
+            {"range": email_range, "values": email_values},
+            {"range": id_range, "values": id_values},
+        ]
+
+        body = {"valueInputOption": "USER_ENTERED", "data": batch_data}
+
+        logger.info(f"   🔧 Using batchUpdate (writes to specific columns only)")
+
+        result = (
+            self.sheet.values()
+            .batchUpdate(spreadsheetId=self.spreadsheet_id, body=body)
+            .execute()
+        )
+
+        # معلومات عن النتيجة
+        total_updated_cells = result.get("totalUpdatedCells", 0)
+        total_updated_rows = result.get("totalUpdatedRows", 0)
+
+        self._next_row = last_row + 1
+
+        # 🗂️ الصفوف اللي اتكتبت معروفة → الفهرس يتحدث من غير قراءة
+        self._index_appended_rows(next_row, id_values)
+
+        logger.info(f"✅ Success!")
+        logger.info(f"   ✅ Updated rows: {total_updated_rows}")
+        logger.info(f"   ✅ Updated cells: {total_updated_cells}")
+        logger.info(f"   ✅ Only Email (A) and ID (Z) columns were modified")
+        logger.info(f"   ✅ Other columns in the row remain untouched")
+
+        # عرض عينة من البيانات
+        if email_values and id_values:
+            sample_email = email_values[0][0]
+            sample_id = id_values[0][0]
+            logger.info(f"   📝 Sample: Email='{sample_email}', ID='{sample_id}'")
+
+        return len(emails_data)
+
     @track_sheets_errors(operation="append_emails", worker="google_api")
     def append_emails(self, emails_data: List[Dict]) -> Tuple[bool, str]:
         """
@@ -100,6 +385,10 @@ class GoogleSheetsAPI:
         - يكتب Email في عمود A فقط
         - يكتب ID في عمود Z فقط
         - لا يمسح أو يعدل أي أعمدة أخرى نهائياً
+        - طلب batchUpdate لكل APPEND_CHUNK_SIZE صف (الصف الجاي بيتقدم مع كل chunk)
+
+        لو chunk فشل بعد chunks نجحت، الصفوف اللي قبله بتفضل في الشيت وعددها
+        بيتسجل في اللوج (الـ workers بيبعتوا chunk واحد بالظبط فمش بيتأثروا)
 
         Args:
             emails_data: List of {"email": str, "id": str}
@@ -110,100 +399,127 @@ class GoogleSheetsAPI:
         if not emails_data:
             return True, "No emails to add"
 
+        added = 0
         try:
             logger.info(f"📤 Adding {len(emails_data)} rows (Email + ID only)")
 
-            # 1️⃣ الحصول على آخر صف في العمود A (نفس الكود القديم)
-            result_range = (
-                self.sheet.values()
-                .get(spreadsheetId=self.spreadsheet_id, range=f"{self.sheet_name}!A:A")
-                .execute()
-            )
+            for start in range(0, len(emails_data), APPEND_CHUNK_SIZE):
+                chunk = emails_data[start : start + APPEND_CHUNK_SIZE]
+
+                # الصف الجاي: أول chunk بيتأكد منه (قراءة صغيرة، أو عمود A أول مرة)،
+                # والباقي بيكمل بعد اللي لسه كاتبينه
+                if added:
+                    next_row = self._next_row
+                else:
+                    next_row = self._resolve_next_row(len(chunk))
 
-            existing_values = result_range.get("values", [])
-            next_row = len(existing_values) + 1
+                added += self._append_chunk(chunk, next_row)
 
-            logger.info(f"   📍 Last row: {len(existing_values)}, Next row: {next_row}")
+            return True, f"Added {added} rows"
+
+        except HttpError as e:
+            # مش متأكدين الكتابة حصلت ولا لأ → قراءة كاملة في المرة الجاية
+            self._next_row = None
+            if added:
+                logger.warning(f"⚠️ {added} rows were added before the failure")
+            error_details = e.error_details if hasattr(e, "error_details") else str(e)
 
-            # 2️⃣ تجهيز البيانات لكل عمود على حدة
-            email_values = []  # للـ Email (عمود A فقط)
-            id_values = []  # للـ ID (عمود Z فقط)
+            # Rate Limit
+            if e.resp.status == 429:
+                logger.warning("⚠️ Rate limit hit, will retry later")
+                return False, "Rate limit"
 
-            for item in emails_data:
-                # Email في عمود A
-                email = item.get("email", "")
-                email_values.append([email])  # قيمة واحدة فقط
+            # Quota exceeded
+            if e.resp.status == 403:
+                logger.warning("⚠️ Quota exceeded, will retry later")
+                return False, "Quota exceeded"
 
-                # ID في عمود Z
-                item_id = item.get("id", "")
+            logger.error(f"❌ Google Sheets API error: {error_details}")
+            return False, str(error_details)
 
-                # ✅ تحقق: ID صالح
-                if item_id and item_id not in ["N/A", "pending", "api", ""]:
-                    id_values.append([str(item_id)])  # قيمة واحدة فقط
-                else:
-                    id_values.append([""])  # فراغ لو مافيش ID
+        except Exception as e:
+            self._next_row = None
+            if added:
+                logger.warning(f"⚠️ {added} rows were added before the failure")
+            logger.exception(f"❌ Unexpected error while adding emails: {e}")
+            return False, str(e)
+
+    @track_sheets_errors(operation="read_cells", worker="google_api")
+    def read_cells(self, cells: List[Tuple[str, int]]) -> Dict[Tuple[str, int], str]:
+        """
+        📖 قراءة خلايا متفرقة في batchGet واحد
+
+        Args:
+            cells: List of (column_letter, row_number)
 
-            # 3️⃣ استخدام batchUpdate للكتابة في الأعمدة المحددة فقط
-            last_row = next_row + len(emails_data) - 1
+        Returns:
+            {(column_letter, row_number): value} - الخلية الفاضية = ""
+        """
+        if not cells:
+            return {}
+
+        result = (
+            self.sheet.values()
+            .batchGet(
+                spreadsheetId=self.spreadsheet_id,
+                ranges=[f"{self.sheet_name}!{column}{row}" for column, row in cells],
+            )
+            .execute()
+        )
 
-            # Range لكل عمود على حدة
-            email_range = f"{self.sheet_name}!A{next_row}:A{last_row}"
-            id_range = f"{self.sheet_name}!Z{next_row}:Z{last_row}"
+        values = {}
+        for cell, value_range in zip(cells, result.get("valueRanges", [])):
+            rows = value_range.get("values", [])
+            values[cell] = str(rows[0][0]) if rows and rows[0] else ""
+        return values
 
-            logger.info(f"   📧 Email range: {email_range}")
-            logger.info(f"   🆔 ID range: {id_range}")
+    @track_sheets_errors(operation="update_cells", worker="google_api")
+    def update_cells(self, cells: List[Tuple[str, int, str]]) -> Tuple[bool, str]:
+        """
+        ✏️ كتابة خلايا متفرقة في batchUpdate واحد
 
-            # 4️⃣ استخدام batchUpdate - يكتب في الأعمدة المحددة فقط
-            batch_data = [
-                {"range": email_range, "values": email_values},
-                {"range": id_range, "values": id_values},
-            ]
+        Args:
+            cells: List of (column_letter, row_number, value)
 
-            body = {"valueInputOption": "USER_ENTERED", "data": batch_data}
+        Returns:
+            (success: bool, message: str)
+        """
+        if not cells:
+            return True, "No cells to update"
 
-            logger.info(f"   🔧 Using batchUpdate (writes to specific columns only)")
+        data = [
+            {"range": f"{self.sheet_name}!{column}{row}", "values": [[value]]}
+            for column, row, value in cells
+        ]
 
+        try:
             result = (
                 self.sheet.values()
-                .batchUpdate(spreadsheetId=self.spreadsheet_id, body=body)
+                .batchUpdate(
+                    spreadsheetId=self.spreadsheet_id,
+                    body={"valueInputOption": "USER_ENTERED", "data": data},
+                )
                 .execute()
             )
 
-            # معلومات عن النتيجة
-            total_updated_cells = result.get("totalUpdatedCells", 0)
-            total_updated_rows = result.get("totalUpdatedRows", 0)
-            responses = result.get("responses", [])
-
-            logger.info(f"✅ Success!")
-            logger.info(f"   ✅ Updated rows: {total_updated_rows}")
-            logger.info(f"   ✅ Updated cells: {total_updated_cells}")
-            logger.info(f"   ✅ Only Email (A) and ID (Z) columns were modified")
-            logger.info(f"   ✅ Other columns in the row remain untouched")
-
-            # عرض عينة من البيانات
-            if email_values and id_values:
-                sample_email = email_values[0][0]
-                sample_id = id_values[0][0]
-                logger.info(f"   📝 Sample: Email='{sample_email}', ID='{sample_id}'")
-
-            return True, f"Added {len(emails_data)} rows"
+            updated = result.get("totalUpdatedCells", len(cells))
+            logger.info(f"✅ Updated {updated} cells in one batchUpdate")
+            return True, f"Updated {updated} cells"
 
         except HttpError as e:
             error_details = e.error_details if hasattr(e, "error_details") else str(e)
 
-            # Rate Limit
             if e.resp.status == 429:
-                logger.warning("⚠️ Rate limit hit, will retry later")
+                logger.warning("⚠️ Rate limit hit while updating cells")
                 return False, "Rate limit"
 
-            # Quota exceeded
             if e.resp.status == 403:
-                logger.warning("⚠️ Quota exceeded, will retry later")
+                logger.warning("⚠️ Quota exceeded while updating cells")
                 return False, "Quota exceeded"
 
             logger.error(f"❌ Google Sheets API error: {error_details}")
             return False, str(error_details)
 
         except Exception as e:
-            logger.exception(f"❌ Unexpected error while adding emails: {e}")
+            logger.exception(f"❌ Unexpected error while updating cells: {e}")
             return False, str(e)
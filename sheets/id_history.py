@@ -4,13 +4,18 @@
 📜 ID History Manager
 تسجيل الـ IDs المضافة للشيت والاحتفاظ بآخر 7 أيام فقط
 ✅ مع دعم الإضافة الدفعية
+✅ ملف لكل يوم (bucket) - الإضافة سطر في ملف اليوم، والتنظيف = حذف ملفات الأيام القديمة
+✅ Set في الذاكرة: التحقق من ID بـ O(1) من غير قراءة ملفات
 """
 
-import json
 import logging
-from datetime import datetime, timedelta
+import os
+from collections import Counter
+from datetime import date, datetime, timedelta
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional
+
+from storage import codec, read_json
 
 logger = logging.getLogger(__name__)
 
@@ -18,43 +23,196 @@ logger = logging.getLogger(__name__)
 # ⚙️ ثوابت
 # ═══════════════════════════════════════════════════════════════
 
-HISTORY_FILE = Path("data/id_history.json")
+HISTORY_FILE = Path("data/id_history.json")  # الشكل القديم (بيتنقل أول مرة)
+HISTORY_DIR = Path("data/id_history")  # ملف لكل يوم: YYYY-MM-DD.jsonl
 RETENTION_DAYS = 7  # الاحتفاظ بآخر 7 أيام فقط
 
+INVALID_IDS = ["N/A", "pending", "api", "", None]
+
 
 # ═══════════════════════════════════════════════════════════════
-# 🔧 دوال مساعدة داخلية (Private)
+# 🗂️ Bucketed History (ملف لكل يوم + Set في الذاكرة)
 # ═══════════════════════════════════════════════════════════════
 
 
-def _load_history() -> dict:
+class IDHistory:
     """
-    تحميل سجل الـ IDs (داخلي)
+    سجل الـ IDs مقسم بالأيام
+
+    - _buckets: اليوم → [(id, added_at), ...] بترتيب الإضافة
+    - _counts: id → عدد مرات ظهوره في الأيام المحتفظ بيها (membership O(1))
+    - الـ retention بيحذف أيام كاملة: يوم بيتمسح لما يبقى كله أقدم من RETENTION_DAYS
     """
-    if HISTORY_FILE.exists():
+
+    def __init__(self, directory: Path = HISTORY_DIR, legacy_file: Path = HISTORY_FILE):
+        self.directory = Path(directory)
+        self.legacy_file = Path(legacy_file)
+        self._buckets: Optional[Dict[date, List[tuple]]] = None
+        self._counts: Counter = Counter()
+
+    # ───────────────────────────────────────────────────────────
+    # 📥 التحميل
+    # ───────────────────────────────────────────────────────────
+
+    def _bucket_path(self, day: date) -> Path:
+        return self.directory / f"{day.isoformat()}.jsonl"
+
+    def _load(self) -> Dict[date, List[tuple]]:
+        if self._buckets is not None:
+            return self._buckets
+
+        self._buckets = {}
+        self._counts = Counter()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        if self.legacy_file.exists():
+            self._migrate_legacy()
+
+        for path in sorted(self.directory.glob("*.jsonl")):
+            try:
+                day = date.fromisoformat(path.stem)
+            except ValueError:
+                continue
+
+            entries = []
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        entry = codec.loads(line)
+                    except ValueError:
+                        continue
+                    entries.append((str(entry["id"]), entry.get("added_at", "")))
+
+            self._buckets[day] = entries
+            self._counts.update(item_id for item_id, _ in entries)
+
+        self._drop_expired()
+        return self._buckets
+
+    def _migrate_legacy(self):
+        """id_history.json القديم → ملفات الأيام"""
         try:
-            with open(HISTORY_FILE, "r", encoding="utf-8") as f:
-                return json.load(f)
+            entries = read_json(self.legacy_file).get("ids", [])
         except Exception as e:
-            logger.error(f"❌ Error loading history: {e}")
-    return {"ids": []}
+            logger.error(f"❌ Error migrating history: {e}")
+            return
 
+        by_day: Dict[date, List[dict]] = {}
+        for entry in entries:
+            try:
+                day = datetime.fromisoformat(entry["added_at"]).date()
+            except (KeyError, TypeError, ValueError):
+                # التاريخ مش مقروء → نحسبه على النهارده عشان ما يضيعش
+                day = date.today()
+            by_day.setdefault(day, []).append(entry)
+
+        for day, day_entries in by_day.items():
+            self._append_lines(day, day_entries)
+
+        os.replace(self.legacy_file, f"{self.legacy_file}.migrated")
+        logger.info(f"📜 Migrated {len(entries)} IDs into {len(by_day)} day buckets")
+
+    # ───────────────────────────────────────────────────────────
+    # 🧹 Retention (حذف أيام كاملة)
+    # ───────────────────────────────────────────────────────────
+
+    def _drop_expired(self) -> int:
+        cutoff_day = (datetime.now() - timedelta(days=RETENTION_DAYS)).date()
+        removed = 0
+
+        for day in [d for d in self._buckets if d < cutoff_day]:
+            entries = self._buckets.pop(day)
+            self._counts.subtract(item_id for item_id, _ in entries)
+            removed += len(entries)
+            try:
+                self._bucket_path(day).unlink()
+            except FileNotFoundError:
+                pass
 
-def _save_history(data: dict):
-    """
-    حفظ سجل الـ IDs (داخلي)
-    """
-    try:
-        HISTORY_FILE.parent.mkdir(exist_ok=True)
-        with open(HISTORY_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"❌ Error saving history: {e}")
+        if removed:
+            self._counts = +self._counts  # شيل اللي عدده بقى صفر
+            logger.info(
+                f"🧹 Cleaned {removed} old entries (older than {RETENTION_DAYS} days)"
+            )
+        return removed
+
+    # ───────────────────────────────────────────────────────────
+    # ✏️ الإضافة
+    # ───────────────────────────────────────────────────────────
+
+    def _append_lines(self, day: date, entries: List[dict]):
+        with open(self._bucket_path(day), "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(codec.dumps_line(entry) + "\n")
+
+    def add(self, ids_list: List[str]) -> int:
+        """إضافة IDs (سطر لكل ID في ملف النهارده) - بيرجع عدد الـ IDs الصالحة"""
+        buckets = self._load()
+        self._drop_expired()
+
+        now = datetime.now()
+        now_iso = now.isoformat()
+        entries = [
+            {"id": str(item_id), "added_at": now_iso}
+            for item_id in ids_list
+            if item_id not in INVALID_IDS
+        ]
+        if not entries:
+            return 0
+
+        self._append_lines(now.date(), entries)
+        bucket = buckets.setdefault(now.date(), [])
+        for entry in entries:
+            bucket.append((entry["id"], now_iso))
+            self._counts[entry["id"]] += 1
+        return len(entries)
+
+    def clear(self):
+        buckets = self._load()
+        for day in list(buckets):
+            try:
+                self._bucket_path(day).unlink()
+            except FileNotFoundError:
+                pass
+        buckets.clear()
+        self._counts = Counter()
+
+    # ───────────────────────────────────────────────────────────
+    # 📖 القراءة
+    # ───────────────────────────────────────────────────────────
+
+    def __contains__(self, id_value: object) -> bool:
+        self._load()
+        return self._counts.get(str(id_value), 0) > 0
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._load().values())
+
+    def entries(self) -> List[dict]:
+        """كل الإدخالات بالشكل القديم [{"id", "added_at"}] بترتيب الأيام"""
+        buckets = self._load()
+        return [
+            {"id": item_id, "added_at": added_at}
+            for day in sorted(buckets)
+            for item_id, added_at in buckets[day]
+        ]
+
+
+# Global history
+id_history = IDHistory()
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔧 دوال مساعدة داخلية (Private)
+# ═══════════════════════════════════════════════════════════════
 
 
 def _cleanup_old_ids(data: dict) -> dict:
     """
-    حذف الإدخالات القديمة (أكتر من 7 أيام) - داخلي
+    حذف الإدخالات القديمة (أكتر من 7 أيام) من dict بالشكل القديم - داخلي
     """
     cutoff_date = datetime.now() - timedelta(days=RETENTION_DAYS)
 
@@ -89,14 +247,31 @@ def load_history() -> dict:
     """
     تحميل سجل الـ IDs (للاستخدام الخارجي)
     """
-    return _load_history()
+    return {"ids": id_history.entries()}
 
 
 def save_history(data: dict):
     """
-    حفظ سجل الـ IDs (للاستخدام الخارجي)
+    حفظ سجل الـ IDs (للاستخدام الخارجي) - بيستبدل السجل كله
     """
-    _save_history(data)
+    try:
+        id_history.clear()
+        by_day: Dict[date, List[dict]] = {}
+        for entry in data.get("ids", []):
+            try:
+                day = datetime.fromisoformat(entry["added_at"]).date()
+            except (KeyError, TypeError, ValueError):
+                day = date.today()
+            by_day.setdefault(day, []).append(entry)
+
+        for day, entries in by_day.items():
+            id_history._append_lines(day, entries)
+
+        # إعادة التحميل من ملفات الأيام
+        id_history._buckets = None
+        id_history._load()
+    except Exception as e:
+        logger.error(f"❌ Error saving history: {e}")
 
 
 def cleanup_old_entries(data: dict) -> dict:
@@ -117,28 +292,11 @@ def add_ids_to_history(ids_list: List[str]):
         return
 
     try:
-        # تحميل البيانات
-        data = _load_history()
-
-        # تنظيف القديم
-        data = _cleanup_old_ids(data)
-
-        # إضافة كل الـ IDs
-        now = datetime.now().isoformat()
-        added_count = 0
-
-        for item_id in ids_list:
-            # فلترة الـ IDs غير الصالحة
-            if item_id and item_id not in ["N/A", "pending", "api", "", None]:
-                data["ids"].append({"id": str(item_id), "added_at": now})
-                added_count += 1
-
-        # حفظ
-        _save_history(data)
+        added_count = id_history.add(ids_list)
 
         if added_count > 0:
             logger.info(
-                f"📝 Added {added_count} IDs to history (total: {len(data['ids'])})"
+                f"📝 Added {added_count} IDs to history (total: {len(id_history)})"
             )
         else:
             logger.debug("ℹ️ No valid IDs to add")
@@ -154,25 +312,14 @@ def add_id_to_history(id_value: str):
     Args:
         id_value: الـ ID المراد إضافته
     """
-    if not id_value or id_value in ["N/A", "pending", "api", "", None]:
+    if not id_value or id_value in INVALID_IDS:
         return
 
     try:
-        # تحميل السجل الحالي
-        history = _load_history()
-
-        # إضافة الـ ID
-        now = datetime.now().isoformat()
-        history["ids"].append({"id": str(id_value), "added_at": now})
-
-        # تنظيف القديم
-        history = _cleanup_old_ids(history)
-
-        # حفظ
-        _save_history(history)
+        id_history.add([id_value])
 
         logger.info(f"📜 Added ID {id_value} to history")
-        logger.debug(f"📊 Total IDs in history: {len(history['ids'])}")
+        logger.debug(f"📊 Total IDs in history: {len(id_history)}")
 
     except Exception as e:
         logger.error(f"❌ Error adding ID to history: {e}")
@@ -186,15 +333,14 @@ def get_history_count() -> int:
         عدد الـ IDs المسجلة
     """
     try:
-        history = _load_history()
-        return len(history.get("ids", []))
+        return len(id_history)
     except:
         return 0
 
 
 def check_id_exists(id_value: str) -> bool:
     """
-    التحقق من وجود ID في السجل
+    التحقق من وجود ID في السجل - O(1) من الذاكرة
 
     Args:
         id_value: الـ ID المراد البحث عنه
@@ -203,9 +349,7 @@ def check_id_exists(id_value: str) -> bool:
         True إذا كان موجود
     """
     try:
-        history = _load_history()
-        id_list = [entry.get("id") for entry in history.get("ids", [])]
-        return str(id_value) in id_list
+        return id_value in id_history
     except:
         return False
 
@@ -221,11 +365,10 @@ def get_recent_ids(days: int = 7) -> List[str]:
         قائمة بالـ IDs
     """
     try:
-        history = _load_history()
         cutoff_date = datetime.now() - timedelta(days=days)
 
         recent_ids = []
-        for entry in history.get("ids", []):
+        for entry in id_history.entries():
             try:
                 added_at = datetime.fromisoformat(entry["added_at"])
                 if added_at > cutoff_date:
@@ -245,7 +388,7 @@ def clear_history():
     مسح السجل بالكامل (استخدام حذر!)
     """
     try:
-        _save_history({"ids": []})
+        id_history.clear()
         logger.warning("⚠️ History cleared!")
     except Exception as e:
         logger.error(f"❌ Error clearing history: {e}")
@@ -2,75 +2,57 @@
 # -*- coding: utf-8 -*-
 """
 📦 Queue Manager
-إدارة الـ 3 ملفات JSON (pending, retry, failed)
+إدارة الـ 3 queues (pending, retry, failed)
+✅ كل queue هو DurableQueue (journal append-only) بدل إعادة كتابة ملف JSON
 """
 
-import json
 import logging
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Iterable, List, Optional
+
+from .durable_queue import DurableQueue, QueueEntry
 
 logger = logging.getLogger(__name__)
 
 DATA_DIR = Path("data")
 
+# ═══════════════════════════════════════════════════════════════
+# 📼 الـ Queues (ملفات JSON القديمة بتتنقل أول مرة)
+# ═══════════════════════════════════════════════════════════════
 
-def load_queue(filename: str) -> Dict:
-    """
-    تحميل ملف queue
-
-    Args:
-        filename: اسم الملف (مثل: pending.json)
-
-    Returns:
-        Dict مع key "emails" يحتوي على list
-    """
-    file_path = DATA_DIR / filename
-
-    if file_path.exists():
-        try:
-            with open(file_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"❌ Error loading {filename}: {e}")
-
-    return {"emails": []}
+pending_queue = DurableQueue("pending", legacy_file=DATA_DIR / "pending.json")
+retry_queue = DurableQueue("retry", legacy_file=DATA_DIR / "retry.json")
+failed_queue = DurableQueue("failed", legacy_file=DATA_DIR / "failed.json")
 
 
-def save_queue(filename: str, data: Dict):
+def add_to_pending(email: str, account_id: str = "N/A"):
     """
-    حفظ ملف queue
+    إضافة إيميل لـ pending (سطر واحد في الـ journal)
 
     Args:
-        filename: اسم الملف
-        data: البيانات للحفظ
+        email: البريد الإلكتروني
+        account_id: ID الحساب ("N/A" لو مش معروف - زي الـ Web API)
     """
-    DATA_DIR.mkdir(exist_ok=True)
-    file_path = DATA_DIR / filename
-
-    try:
-        with open(file_path, "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"❌ Error saving {filename}: {e}")
+    pending_queue.put(
+        {"email": email, "id": account_id, "added_at": datetime.now().isoformat()}
+    )
 
 
-def move_to_retry(email_data: Dict):
+def move_to_retry(email_data: Dict, delay: float = 0.0):
     """
     نقل من pending إلى retry
 
     Args:
         email_data: بيانات الإيميل
+        delay: ثواني قبل ما يبقى جاهز للمحاولة الجاية
     """
     # تحديث عدد المحاولات
     email_data["attempts"] = email_data.get("attempts", 0) + 1
     email_data["last_attempt"] = datetime.now().isoformat()
 
     # إضافة لـ retry
-    retry_data = load_queue("retry.json")
-    retry_data["emails"].append(email_data)
-    save_queue("retry.json", retry_data)
+    retry_queue.put(email_data, delay=delay)
 
     logger.info(
         f"📝 Moved {email_data['email']} to retry queue (attempt {email_data['attempts']})"
@@ -87,50 +69,45 @@ def move_to_failed(email_data: Dict):
     email_data["failed_at"] = datetime.now().isoformat()
 
     # إضافة لـ failed
-    failed_data = load_queue("failed.json")
-    failed_data["emails"].append(email_data)
-    save_queue("failed.json", failed_data)
+    failed_queue.put(email_data)
 
     logger.warning(f"❌ Moved {email_data['email']} to failed queue")
 
 
-def get_pending_batch() -> List[Dict]:
+def get_pending_batch(limit: Optional[int] = None) -> List[QueueEntry]:
     """
-    الحصول على batch من pending
+    الحصول على batch من pending (مسحوب لحد ack)
+
+    Args:
+        limit: أقصى عدد عناصر (None = الكل)
 
     Returns:
-        List من الإيميلات
+        List من QueueEntry (entry.item فيه بيانات الإيميل)
     """
-    data = load_queue("pending.json")
-    return data.get("emails", [])
+    return pending_queue.lease(limit)
 
 
-def get_retry_batch() -> List[Dict]:
+def get_retry_batch(limit: Optional[int] = None) -> List[QueueEntry]:
     """
-    الحصول على batch من retry
+    الحصول على batch من retry (العناصر اللي next_attempt_at بتاعها عدى بس)
+
+    Args:
+        limit: أقصى عدد عناصر (None = الكل)
 
     Returns:
-        List من الإيميلات
+        List من QueueEntry
     """
-    data = load_queue("retry.json")
-    return data.get("emails", [])
+    return retry_queue.lease(limit)
 
 
-def clear_batch(filename: str, processed_emails: List[str]):
+def clear_batch(queue: DurableQueue, entries: Iterable[QueueEntry]):
     """
-    مسح الإيميلات اللي اتعالجت بنجاح
+    مسح العناصر اللي اتعالجت (ack)
 
     Args:
-        filename: اسم الملف
-        processed_emails: List من الإيميلات اللي تمت معالجتها
+        queue: الـ queue
+        entries: العناصر اللي تمت معالجتها
     """
-    data = load_queue(filename)
-
-    # إزالة الإيميلات الناجحة
-    data["emails"] = [
-        item for item in data["emails"] if item.get("email") not in processed_emails
-    ]
-
-    save_queue(filename, data)
+    cleared = queue.ack(entry.seq for entry in entries)
 
-    logger.info(f"✅ Cleared {len(processed_emails)} emails from {filename}")
+    logger.info(f"✅ Cleared {cleared} emails from {queue.name}")
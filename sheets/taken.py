@@ -4,17 +4,20 @@
 💰 Taken Handler - معالج الكوينز المسحوبة
 ✅ معالجة AMOUNT_TAKEN و DISABLED تلقائياً
 ✅ بسيط - بدون تعقيد - بدون retry
+✅ Batch: كل العناصر المستنية في batchUpdate واحد + ack واحد
 """
 
 import asyncio
-import json
 import logging
 import random
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List
 
+from .durable_queue import DurableQueue, QueueEntry
 from .error_notifier import track_sheets_errors
+from .google_api import UPDATE_CHUNK_SIZE
+from .id_history import check_id_exists
 
 logger = logging.getLogger(__name__)
 
@@ -23,7 +26,6 @@ logger = logging.getLogger(__name__)
 # ═══════════════════════════════════════════════════════════════
 
 TAKEN_QUEUE_FILE = Path("data/Taken.json")
-ID_HISTORY_FILE = Path("data/id_history.json")
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -31,26 +33,10 @@ ID_HISTORY_FILE = Path("data/id_history.json")
 # ═══════════════════════════════════════════════════════════════
 
 
-def load_taken_queue() -> List[Dict]:
-    """تحميل queue الكوينز المسحوبة"""
-    if TAKEN_QUEUE_FILE.exists():
-        try:
-            with open(TAKEN_QUEUE_FILE, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                return data.get("items", [])
-        except Exception as e:
-            logger.error(f"❌ Error loading Taken.json: {e}")
-    return []
-
-
-def save_taken_queue(items: List[Dict]):
-    """حفظ queue الكوينز المسحوبة"""
-    try:
-        TAKEN_QUEUE_FILE.parent.mkdir(exist_ok=True)
-        with open(TAKEN_QUEUE_FILE, "w", encoding="utf-8") as f:
-            json.dump({"items": items}, f, indent=2, ensure_ascii=False)
-    except Exception as e:
-        logger.error(f"❌ Error saving Taken.json: {e}")
+# آخر قيمة بس لكل حساب (put بنفس الـ id بيستبدل القديم)
+taken_queue = DurableQueue(
+    "Taken", key_field="id", legacy_file=TAKEN_QUEUE_FILE, legacy_key="items"
+)
 
 
 def add_to_taken_queue(
@@ -69,21 +55,16 @@ def add_to_taken_queue(
         True إذا تمت الإضافة بنجاح
     """
     try:
-        items = load_taken_queue()
-
-        # تجنب التكرار - نسجل آخر قيمة فقط (overwrite)
-        items = [item for item in items if item.get("id") != account_id]
-
-        new_item = {
-            "id": account_id,
-            "email": email,
-            "status": status,
-            "taken": str(taken_value),
-            "added_at": datetime.now().isoformat(),
-        }
-
-        items.append(new_item)
-        save_taken_queue(items)
+        # تجنب التكرار - نسجل آخر قيمة فقط (overwrite بالـ key_field)
+        taken_queue.put(
+            {
+                "id": account_id,
+                "email": email,
+                "status": status,
+                "taken": str(taken_value),
+                "added_at": datetime.now().isoformat(),
+            }
+        )
 
         logger.info(
             f"📝 Added to Taken queue: {email} (ID: {account_id}, Status: {status}, Taken: {taken_value})"
@@ -95,26 +76,6 @@ def add_to_taken_queue(
         return False
 
 
-def clear_taken_entry(account_id: str):
-    """مسح عملية من الـ queue (نجاح أو فشل)"""
-    try:
-        items = load_taken_queue()
-        original_count = len(items)
-
-        items = [item for item in items if item.get("id") != account_id]
-
-        if len(items) < original_count:
-            save_taken_queue(items)
-            logger.info(f"🗑️ Cleared from Taken queue: ID {account_id}")
-            return True
-
-        return False
-
-    except Exception as e:
-        logger.error(f"❌ Error clearing from Taken queue: {e}")
-        return False
-
-
 # ═══════════════════════════════════════════════════════════════
 # 🔍 التحقق من ID History
 # ═══════════════════════════════════════════════════════════════
@@ -122,7 +83,7 @@ def clear_taken_entry(account_id: str):
 
 def check_id_in_history(account_id: str) -> bool:
     """
-    التحقق من وجود ID في id_history.json
+    التحقق من وجود ID في سجل الـ IDs (O(1) من الذاكرة)
 
     Args:
         account_id: ID الحساب
@@ -130,26 +91,11 @@ def check_id_in_history(account_id: str) -> bool:
     Returns:
         True إذا كان ID موجود
     """
-    try:
-        if not ID_HISTORY_FILE.exists():
-            logger.warning("⚠️ id_history.json not found")
-            return False
-
-        with open(ID_HISTORY_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            ids_list = data.get("ids", [])
-
-            # البحث عن ID
-            for entry in ids_list:
-                if str(entry.get("id")) == str(account_id):
-                    return True
-
-            logger.warning(f"⚠️ ID {account_id} not in id_history.json")
-            return False
+    if check_id_exists(str(account_id)):
+        return True
 
-    except Exception as e:
-        logger.error(f"❌ Error checking ID history: {e}")
-        return False
+    logger.warning(f"⚠️ ID {account_id} not in id history")
+    return False
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -194,94 +140,85 @@ def convert_coins_to_thousands(taken_value: str) -> str:
 
 
 # ═══════════════════════════════════════════════════════════════
-# 🔍 البحث في Google Sheet
+# 📦 معالجة Batch (قراءة واحدة + batchUpdate واحد)
 # ═══════════════════════════════════════════════════════════════
 
 
-def find_row_by_id(sheets_api, account_id: str) -> Optional[int]:
+def process_taken_batch(
+    sheets_api, entries: List[QueueEntry], amount_taken_col: str, disabled_col: str
+) -> int:
     """
-    البحث عن ID في عمود Z والحصول على رقم الصف
+    معالجة كل عناصر الـ Taken queue المسحوبة مع بعض
 
-    Args:
-        sheets_api: Google Sheets API instance
-        account_id: ID الحساب
+    1. التحقق من سجل الـ IDs والحالة لكل عنصر (من الذاكرة)
+    2. أرقام الصفوف لكل الـ IDs مرة واحدة (فهرس sheets_api، متأكد منها في
+       عمود Z بـ batchGet واحد عشان ما نكتبش في صف اتزق)
+    3. كل خلايا C / F في batchUpdate واحد
 
     Returns:
-        رقم الصف (1-based) أو None
+        عدد الخلايا اللي اتكتبت
     """
-    try:
-        logger.info(f"🔍 Searching for ID {account_id} in column Z...")
-
-        # قراءة عمود Z كامل
-        column_range = f"{sheets_api.sheet_name}!Z:Z"
-        result = (
-            sheets_api.service.spreadsheets()
-            .values()
-            .get(spreadsheetId=sheets_api.spreadsheet_id, range=column_range)
-            .execute()
-        )
-
-        values = result.get("values", [])
-
-        if not values:
-            logger.warning("⚠️ Column Z is empty")
-            return None
-
-        # البحث عن ID
-        for idx, row in enumerate(values, start=1):
-            if row and str(row[0]).strip() == str(account_id).strip():
-                logger.info(f"✅ Found ID {account_id} at row {idx}")
-                return idx
-
-        logger.warning(f"⚠️ ID {account_id} not found in Sheet")
-        return None
-
-    except Exception as e:
-        logger.error(f"❌ Error searching Sheet: {e}")
-        return None
-
-
-# ═══════════════════════════════════════════════════════════════
-# ✏️ تحديث الخلية في Google Sheet
-# ═══════════════════════════════════════════════════════════════
-
-
-@track_sheets_errors(operation="update_sheet_cell", worker="taken")
-def update_sheet_cell(
-    sheets_api, row_number: int, column_letter: str, value: str
-) -> Tuple[bool, str]:
-    """
-    تحديث خلية واحدة في Google Sheet
-
-    Args:
-        sheets_api: Google Sheets API instance
-        row_number: رقم الصف (1-based)
-        column_letter: حرف العمود (مثل "C" أو "F")
-        value: القيمة المراد كتابتها
+    pending = []  # (item, account_id, target_column, converted_value)
+
+    for entry in entries:
+        item = entry.item
+        account_id = str(item.get("id", ""))
+        email = item.get("email", "unknown")
+        status = item.get("status", "").upper()
+
+        logger.info(f"🔄 Processing: {email} (ID: {account_id}, Status: {status})")
+
+        # ✅ الخطوة 1: التحقق من سجل الـ IDs
+        if not check_id_in_history(account_id):
+            logger.warning(f"⚠️ ID {account_id} not in history - skipping")
+            continue
+
+        # ✅ الخطوة 2: تحديد العمود المناسب
+        if status == "AMOUNT_TAKEN":
+            target_column = amount_taken_col
+        elif status == "DISABLED":
+            target_column = disabled_col
+        else:
+            logger.warning(f"⚠️ Unknown status: {status} - skipping")
+            continue
+
+        # ✅ الخطوة 3: تحويل الكوينز
+        converted_value = convert_coins_to_thousands(item.get("taken", "0"))
+        pending.append((item, account_id, target_column, converted_value))
+
+    if not pending:
+        return 0
+
+    # ✅ الخطوة 4: البحث في Sheet (كل الـ IDs مرة واحدة + تأكيد عمود Z)
+    rows = sheets_api.find_rows(
+        [account_id for _, account_id, _, _ in pending], verify=True
+    )
 
-    Returns:
-        (success: bool, message: str)
-    """
-    try:
-        cell_range = f"{sheets_api.sheet_name}!{column_letter}{row_number}"
+    cells = []
+    for item, account_id, target_column, converted_value in pending:
+        row_number = rows.get(account_id.strip())
+        if not row_number:
+            logger.warning(f"⚠️ ID {account_id} not found in Sheet - skipping")
+            continue
 
-        logger.info(f"✏️ Updating {cell_range} with value: '{value}'")
+        cells.append((target_column, row_number, converted_value))
+        logger.info(
+            f"✏️ {target_column}{row_number} = '{converted_value}' "
+            f"for {item.get('email', 'unknown')} ({item.get('status', '')})"
+        )
 
-        body = {"values": [[value]]}
+    if not cells:
+        return 0
 
-        sheets_api.service.spreadsheets().values().update(
-            spreadsheetId=sheets_api.spreadsheet_id,
-            range=cell_range,
-            valueInputOption="USER_ENTERED",
-            body=body,
-        ).execute()
+    # ✅ الخطوة 5: التحديث في Sheet (طلب واحد)
+    success, message = sheets_api.update_cells(cells)
 
-        logger.info(f"✅ Successfully updated {cell_range}")
-        return True, f"Updated {cell_range}"
+    if not success:
+        logger.error(f"❌ Failed to update {len(cells)} Taken cells: {message}")
+        return 0
 
-    except Exception as e:
-        logger.error(f"❌ Error updating cell {column_letter}{row_number}: {e}")
-        return False, str(e)
+    logger.info(f"✅ Updated {len(cells)} Taken cells in one request")
+    return len(cells)
 
 
 # ═══════════════════════════════════════════════════════════════
@@ -295,12 +232,9 @@ async def taken_worker(config: Dict, sheets_api):
     🔄 Worker معالجة الكوينز المسحوبة
 
     التدفق:
-    1. قراءة Taken.json كل 1-10 ثواني
-    2. لكل عنصر:
-       - التحقق من id_history.json
-       - البحث في Sheet (عمود Z)
-       - تحديث العمود المناسب (C أو F)
-       - مسح من Taken.json (نجح أو فشل)
+    1. سحب العناصر من Taken queue كل 1-10 ثواني
+    2. process_taken_batch: تحقق + أرقام الصفوف + batchUpdate واحد للكل
+    3. ack لكل الـ batch مرة واحدة (نجح أو فشل)
 
     Args:
         config: إعدادات التطبيق
@@ -328,78 +262,31 @@ async def taken_worker(config: Dict, sheets_api):
 
     while True:
         try:
-            # قراءة Queue
-            items = load_taken_queue()
+            # سحب العناصر (lease لحد الـ ack)
+            entries = taken_queue.lease(UPDATE_CHUNK_SIZE)
 
-            if not items:
+            if not entries:
                 # لا يوجد شيء للمعالجة
                 await asyncio.sleep(random.uniform(interval_min, interval_max))
                 continue
 
-            logger.info(f"📋 Processing {len(items)} items from Taken queue")
-
-            for item in items:
-                try:
-                    account_id = item.get("id", "")
-                    email = item.get("email", "unknown")
-                    status = item.get("status", "").upper()
-                    taken_value = item.get("taken", "0")
-
-                    logger.info(
-                        f"🔄 Processing: {email} (ID: {account_id}, Status: {status})"
-                    )
-
-                    # ✅ الخطوة 1: التحقق من id_history.json
-                    if not check_id_in_history(account_id):
-                        logger.warning(f"⚠️ ID {account_id} not in history - skipping")
-                        clear_taken_entry(account_id)
-                        continue
-
-                    # ✅ الخطوة 2: البحث في Sheet
-                    row_number = find_row_by_id(sheets_api, account_id)
-
-                    if not row_number:
-                        logger.warning(
-                            f"⚠️ ID {account_id} not found in Sheet - skipping"
-                        )
-                        clear_taken_entry(account_id)
-                        continue
-
-                    # ✅ الخطوة 3: تحويل الكوينز
-                    converted_value = convert_coins_to_thousands(taken_value)
-
-                    # ✅ الخطوة 4: تحديد العمود المناسب
-                    if status == "AMOUNT_TAKEN":
-                        target_column = amount_taken_col
-                    elif status == "DISABLED":
-                        target_column = disabled_col
-                    else:
-                        logger.warning(f"⚠️ Unknown status: {status} - skipping")
-                        clear_taken_entry(account_id)
-                        continue
-
-                    # ✅ الخطوة 5: التحديث في Sheet
-                    success, message = update_sheet_cell(
-                        sheets_api, row_number, target_column, converted_value
-                    )
-
-                    if success:
-                        logger.info(
-                            f"✅ Updated {target_column}{row_number} = '{converted_value}' "
-                            f"for {email} ({status})"
-                        )
-                    else:
-                        logger.error(
-                            f"❌ Failed to update {target_column}{row_number}: {message}"
-                        )
-
-                    # ✅ الخطوة 6: مسح من Queue (نجح أو فشل - بدون retry)
-                    clear_taken_entry(account_id)
-
-                except Exception as e:
-                    logger.exception(f"❌ Error processing item: {e}")
-                    # مسح حتى لو حصل خطأ (بدون retry)
-                    clear_taken_entry(item.get("id", ""))
+            logger.info(f"📋 Processing {len(entries)} items from Taken queue")
+
+            try:
+                process_taken_batch(
+                    sheets_api, entries, amount_taken_col, disabled_col
+                )
+            except Exception as e:
+                logger.exception(f"❌ Error processing Taken batch: {e}")
+
+            # ✅ مسح كل الـ batch من Queue مرة واحدة (نجح أو فشل - بدون retry)
+            cleared = taken_queue.ack(entry.seq for entry in entries)
+            logger.info(f"🗑️ Cleared {cleared} items from Taken queue")
+
+            # لسه فيه عناصر → الـ batch الجاي على طول
+            if len(entries) >= UPDATE_CHUNK_SIZE:
+                await asyncio.sleep(0)
+                continue
 
             # انتظار عشوائي قبل الدورة التالية
             interval = random.uniform(interval_min, interval_max)
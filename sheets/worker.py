@@ -12,7 +12,7 @@ import random
 from typing import Dict
 
 from .error_notifier import start_error_notification_worker, track_sheets_errors
-from .google_api import GoogleSheetsAPI
+from .google_api import APPEND_CHUNK_SIZE, GoogleSheetsAPI
 from .id_history import add_ids_to_history
 from .logger import WeeklyLogger
 from .queue_manager import (
@@ -21,7 +21,8 @@ from .queue_manager import (
     get_retry_batch,
     move_to_failed,
     move_to_retry,
-    save_queue,
+    pending_queue,
+    retry_queue,
 )
 
 # 🆕 استيراد آمن للـ Taken Worker
@@ -50,7 +51,7 @@ async def pending_worker(
     config: Dict, sheets_api: GoogleSheetsAPI, weekly_log: WeeklyLogger
 ):
     """
-    Timer 1: معالجة pending.json (1-10 ثواني)
+    Timer 1: معالجة pending queue (1-10 ثواني)
     """
     queue_config = config.get("queue", {})
     min_interval = queue_config.get("pending_interval_min", 1)
@@ -61,7 +62,10 @@ async def pending_worker(
 
     while True:
         try:
-            batch = get_pending_batch()
+            # 📤 chunk محدود في كل مرة (الباقي في الدورة الجاية على طول)
+            entries = get_pending_batch(APPEND_CHUNK_SIZE)
+            batch = [entry.item for entry in entries]
+            drained = True
 
             if batch:
                 emails_data = [
@@ -84,12 +88,14 @@ async def pending_worker(
                     if ids_to_record:
                         add_ids_to_history(ids_to_record)
 
-                    clear_batch("pending.json", emails)
+                    clear_batch(pending_queue, entries)
 
                     log_msg = f"✅ Added {len(emails)} emails to Sheet"
                     logger.info(log_msg)
                     weekly_log.write(log_msg)
 
+                    drained = len(entries) < APPEND_CHUNK_SIZE
+
                 else:
                     logger.warning(f"⚠️ Failed to add emails: {message}")
 
@@ -104,7 +110,12 @@ async def pending_worker(
                             logger.warning(log_msg)
                             weekly_log.write(log_msg)
 
-                    clear_batch("pending.json", emails)
+                    clear_batch(pending_queue, entries)
+
+            if not drained:
+                # لسه فيه backlog → الـ chunk الجاي من غير انتظار
+                await asyncio.sleep(0)
+                continue
 
             interval = random.uniform(min_interval, max_interval)
             await asyncio.sleep(interval)
@@ -119,7 +130,7 @@ async def retry_worker(
     config: Dict, sheets_api: GoogleSheetsAPI, weekly_log: WeeklyLogger
 ):
     """
-    Timer 2: معالجة retry.json (30-60 ثانية)
+    Timer 2: معالجة retry queue (30-60 ثانية)
     """
     queue_config = config.get("queue", {})
     min_interval = queue_config.get("retry_interval_min", 30)
@@ -130,7 +141,9 @@ async def retry_worker(
 
     while True:
         try:
-            batch = get_retry_batch()
+            entries = get_retry_batch(APPEND_CHUNK_SIZE)
+            batch = [entry.item for entry in entries]
+            drained = True
 
             if batch:
                 emails_data = [
@@ -153,37 +166,43 @@ async def retry_worker(
                     if ids_to_record:
                         add_ids_to_history(ids_to_record)
 
-                    clear_batch("retry.json", emails)
+                    clear_batch(retry_queue, entries)
 
                     log_msg = f"✅ Added {len(emails)} emails to Sheet (retry)"
                     logger.info(log_msg)
                     weekly_log.write(log_msg)
 
+                    drained = len(entries) < APPEND_CHUNK_SIZE
+
                 else:
                     logger.warning(f"⚠️ Retry failed: {message}")
 
-                    updated_batch = []
                     failed_emails = []
 
-                    for item in batch:
+                    for entry in entries:
+                        item = entry.item
                         attempts = item.get("attempts", 0) + 1
                         item["attempts"] = attempts
 
                         if attempts < max_retries:
-                            updated_batch.append(item)
+                            # ⏳ يرجع للـ queue ويتحاول تاني في الدورة الجاية
+                            retry_queue.nack(entry.seq, delay=min_interval, item=item)
                         else:
                             move_to_failed(item)
+                            retry_queue.ack([entry.seq])
                             failed_emails.append(item["email"])
                             log_msg = f"❌ {item['email']} moved to failed (max retries: {max_retries})"
                             logger.warning(log_msg)
                             weekly_log.write(log_msg)
 
-                    save_queue("retry.json", {"emails": updated_batch})
-
                     if failed_emails:
                         log_msg = f"❌ {len(failed_emails)} emails moved to failed"
                         weekly_log.write(log_msg)
 
+            if not drained:
+                await asyncio.sleep(0)
+                continue
+
             interval = random.uniform(min_interval, max_interval)
             await asyncio.sleep(interval)
 
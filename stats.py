@@ -5,11 +5,12 @@
 مدير الإحصائيات المركزي - ملف منفصل لتجنب Circular Import
 """
 
-import json
 from dataclasses import asdict, dataclass
 from datetime import datetime
 from pathlib import Path
 
+from storage import read_json, storage_writer
+
 STATS_FILE = "request_stats.json"
 
 
@@ -20,27 +21,35 @@ class RequestStats:
     total_requests: int = 0
     csrf_refreshes: int = 0
     batch_fetches: int = 0
+    incremental_fetches: int = 0  # 🔀 batches اللي جابت الصفوف المتغيرة بس
+    coalesced_fetches: int = 0  # 🔗 طلبات انضمت لـ batch شغال بدل طلب جديد
+    lookup_delta_decisions: int = 0  # 🧮 حساب مش في الـ snapshot → delta
+    lookup_full_decisions: int = 0  # 🧮 حساب مش في الـ snapshot → full batch
+    lookup_delta_misses: int = 0  # 🧮 delta ما جابش الحساب → full بعده
     cache_hits: int = 0
+    stale_serves: int = 0  # ♻️ ردود من snapshot قديم والتحديث شغال في الخلفية
+    background_revalidations: int = 0  # ♻️ batches اتعملت في الخلفية من غير ما حد يستنى
     errors: int = 0
     fast_detections: int = 0
     burst_activations: int = 0
+    burst_ticks: int = 0  # ⏱️ عدد الـ fetches اللي عملها الـ Burst ticker المشترك
+    burst_ticks_reused: int = 0  # ⏱️ ticks اتخدمت من snapshot طازة من غير fetch
+    burst_targets_resolved: int = 0  # 🎯 أهداف Burst وصلت لحالة نهائية
+    burst_targets_expired: int = 0  # 🎯 أهداف Burst خلص وقتها من غير حالة نهائية
+    burst_target_seconds: float = 0.0  # 🎯 مجموع أعمار أهداف الـ Burst
+    burst_target_ticks: int = 0  # 🎯 مجموع الـ ticks اللي خدمت أهداف الـ Burst
     adaptive_adjustments: int = 0
     last_reset: str = datetime.now().isoformat()
 
     def save(self):
-        try:
-            with open(STATS_FILE, "w") as f:
-                json.dump(asdict(self), f, indent=2)
-        except Exception as e:
-            print(f"❌ Error saving stats: {e}")
+        """الحفظ في storage_writer (asdict بيعمل نسخة جديدة)"""
+        storage_writer.write_json(STATS_FILE, asdict(self))
 
     @classmethod
     def load(cls):
         if Path(STATS_FILE).exists():
             try:
-                with open(STATS_FILE, "r") as f:
-                    data = json.load(f)
-                return cls(**data)
+                return cls(**read_json(STATS_FILE))
             except:
                 pass
         return cls()
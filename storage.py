@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+💾 Storage Writer
+Thread واحد مسؤول عن كتابة ملفات الحالة (JSON) بعيد عن الـ event loop
+✅ write_json / write_text بيرجعوا فوراً (الكتابة في الخلفية)
+✅ Coalescing: كذا كتابة لنفس الملف قبل ما يتكتب = كتابة واحدة بآخر نسخة
+✅ كتابة atomic (ملف مؤقت + os.replace)
+✅ قياس زمن الانتظار في الـ queue (من أول طلب لحد ما الملف يتكتب)
+✅ Codec قابل للتبديل (json / orjson) + أمر export لنسخة مقروءة
+
+Export:
+    python storage.py export monitored_accounts.json [-o out.json]
+    python storage.py export data/queues/pending.jsonl
+"""
+
+import argparse
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from config import STORAGE_CODEC
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 🔤 Codecs
+# ═══════════════════════════════════════════════════════════════
+
+
+class JsonCodec:
+    """JSON مضغوط بالـ json العادي (ensure_ascii=False)"""
+
+    name = "json"
+
+    def dumps(self, obj: Any, indent: Optional[int] = None) -> bytes:
+        separators = None if indent is not None else (",", ":")
+        return json.dumps(
+            obj, ensure_ascii=False, indent=indent, separators=separators
+        ).encode("utf-8")
+
+    def loads(self, data) -> Any:
+        return json.loads(data)
+
+    def dumps_line(self, obj: Any) -> str:
+        """سطر JSONL (من غير \\n) للـ journals"""
+        return json.dumps(obj, ensure_ascii=False, separators=(",", ":"))
+
+
+class OrjsonCodec(JsonCodec):
+    """orjson (أسرع بكتير في التحويل والقراءة) - نفس شكل الملف"""
+
+    name = "orjson"
+
+    def dumps(self, obj: Any, indent: Optional[int] = None) -> bytes:
+        option = orjson.OPT_INDENT_2 if indent else 0
+        return orjson.dumps(obj, option=option)
+
+    def loads(self, data) -> Any:
+        return orjson.loads(data)
+
+    def dumps_line(self, obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+
+def get_codec(name: str = STORAGE_CODEC) -> JsonCodec:
+    """اختيار الـ codec ("auto" = orjson لو متسطب)"""
+    if name in ("auto", "orjson") and orjson is not None:
+        return OrjsonCodec()
+    if name == "orjson":
+        logger.warning("⚠️ orjson not installed - falling back to json")
+    return JsonCodec()
+
+
+# Global codec
+codec = get_codec()
+
+
+def read_json(path, default: Any = None) -> Any:
+    """قراءة ملف حالة بالـ codec (default لو الملف مش موجود)"""
+    try:
+        data = Path(path).read_bytes()
+    except FileNotFoundError:
+        return default
+    return codec.loads(data)
+
+
+def read_jsonl(path) -> List[Any]:
+    """قراءة ملف JSONL (السطور البايظة بتتخطى)"""
+    records = []
+    with open(path, "rb") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                records.append(codec.loads(line))
+            except ValueError:
+                continue
+    return records
+
+
+@dataclass
+class _WriteJob:
+    """
+    كتابة مستنية: data بتتحول بالـ codec في thread الكتابة لو raw مش موجود
+
+    task: كتابة مخصوصة (زي compaction الـ journals) بتتنفذ بدل الكتابة العادية
+    """
+
+    data: Any
+    raw: Optional[bytes]
+    indent: Optional[int]
+    enqueued_at: float
+    task: Optional[Callable[[], None]] = None
+
+
+class StorageWriter:
+    """
+    Actor للكتابة على الديسك
+
+    - ملف واحد = job واحد في الـ queue (الأحدث بيستبدل الأقدم ويحتفظ بوقت أول طلب)
+    - الـ data اللي بتتبعت لـ write_json لازم تكون نسخة مش هتتعدل بعد كده
+      (لو الكائن بيتعدل في مكانه حوّله بـ codec.dumps وابعته لـ write_text)
+    """
+
+    def __init__(self, name: str = "storage-writer"):
+        self.name = name
+        self._pending: Dict[str, _WriteJob] = {}
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._busy = False
+
+        # 📊 Metrics
+        self.writes = 0
+        self.coalesced = 0
+        self.errors = 0
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+        atexit.register(self.flush)
+
+    # ───────────────────────────────────────────────────────────
+    # 📨 الطلبات
+    # ───────────────────────────────────────────────────────────
+
+    def write_json(self, path, data: Any, indent: Optional[int] = None):
+        """كتابة data كـ JSON (التحويل بيحصل في thread الكتابة)"""
+        self._submit(str(path), _WriteJob(data, None, indent, time.monotonic()))
+
+    def write_text(self, path, text: Union[str, bytes]):
+        """كتابة محتوى جاهز (str أو bytes متحولة بالـ codec)"""
+        raw = text.encode("utf-8") if isinstance(text, str) else text
+        self._submit(str(path), _WriteJob(None, raw, None, time.monotonic()))
+
+    def write_with(self, path, task: Callable[[], None]):
+        """كتابة مخصوصة لـ path (task بتتنفذ في thread الكتابة وبتكتب بنفسها)"""
+        self._submit(str(path), _WriteJob(None, None, None, time.monotonic(), task))
+
+    def _submit(self, path: str, job: _WriteJob):
+        with self._cond:
+            previous = self._pending.pop(path, None)
+            if previous is not None:
+                job.enqueued_at = previous.enqueued_at
+                self.coalesced += 1
+            self._pending[path] = job
+            self._ensure_thread()
+            self._cond.notify()
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name=self.name, daemon=True
+            )
+            self._thread.start()
+
+    # ───────────────────────────────────────────────────────────
+    # ✍️ الكتابة
+    # ───────────────────────────────────────────────────────────
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                path = next(iter(self._pending))
+                job = self._pending.pop(path)
+                self._busy = True
+
+            try:
+                self._write(path, job)
+                latency = time.monotonic() - job.enqueued_at
+                self.writes += 1
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self.total_latency += latency
+            except Exception as e:
+                self.errors += 1
+                logger.error(f"❌ Storage write error ({path}): {e}")
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    @staticmethod
+    def _write(path: str, job: _WriteJob):
+        if job.task is not None:
+            job.task()
+            return
+
+        payload = job.raw
+        if payload is None:
+            payload = codec.dumps(job.data, indent=job.indent)
+
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """استنى لحد ما كل الكتابات المستنية تخلص (shutdown / atexit)"""
+        with self._cond:
+            if self._pending:
+                self._ensure_thread()
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+
+    # ───────────────────────────────────────────────────────────
+    # 📊 Metrics
+    # ───────────────────────────────────────────────────────────
+
+    @property
+    def pending_count(self) -> int:
+        return len(self._pending)
+
+    @property
+    def avg_latency(self) -> float:
+        return self.total_latency / self.writes if self.writes else 0.0
+
+    def summary(self) -> str:
+        return (
+            f"{self.writes} writes / {self.coalesced} coalesced, "
+            f"queue {self.avg_latency * 1000:.1f}ms avg / "
+            f"{self.max_latency * 1000:.1f}ms max"
+            + (f", {self.errors} errors" if self.errors else "")
+        )
+
+
+# Global storage writer
+storage_writer = StorageWriter()
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📤 Export (نسخة مقروءة للبني آدمين)
+# ═══════════════════════════════════════════════════════════════
+
+
+def export_readable(path, out=None) -> str:
+    """
+    تحويل ملف حالة (JSON أو JSONL) لـ JSON بمسافات (indent=2)
+
+    ملفات JSONL بتطلع كـ list بالسطور بالترتيب
+    """
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        data = read_jsonl(path)
+    else:
+        data = read_json(path)
+
+    text = json.dumps(data, ensure_ascii=False, indent=2) + "\n"
+    if out is None:
+        return text
+
+    Path(out).write_text(text, encoding="utf-8")
+    return text
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="💾 State files tools")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="Export a state file as readable JSON")
+    export_cmd.add_argument("path")
+    export_cmd.add_argument("-o", "--out", help="Output file (default: stdout)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        text = export_readable(args.path, args.out)
+        if args.out is None:
+            sys.stdout.write(text)
+        else:
+            print(f"✅ Exported {args.path} → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+🔮 Transition Latency Model
+تعلم زمن الانتقال بين الحالات (LOGGING → AVAILABLE ...) لكل جروب
+✅ Burst polling متوقع: فحص متباعد في الأول وكثيف قرب الموعد المتوقع
+✅ نفس سرعة الاكتشاف بعدد fetches أقل بكتير
+"""
+
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Deque, Dict, List, Optional, Tuple
+
+from config import (
+    BURST_MODE_INTERVAL,
+    TRANSITION_MAX_POLL_GAP,
+    TRANSITION_MAX_SAMPLES,
+    TRANSITION_MIN_SAMPLES,
+    TRANSITION_STATS_FILE,
+)
+from storage import read_json, storage_writer
+
+logger = logging.getLogger(__name__)
+
+# (from_status, to_status, group)
+TransitionKey = Tuple[str, str, str]
+
+
+def _quantile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    pos = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[pos]
+
+
+class TransitionModel:
+    """
+    آخر TRANSITION_MAX_SAMPLES زمن انتقال لكل (حالة قديمة, حالة جديدة, جروب)
+
+    - record(): بعد كل تغيير حالة اتشاف في مراقبة الـ Burst
+    - poll_delay(): الفاصل قبل الفحص الجاي حسب الوقت اللي عدى في الحالة
+    """
+
+    def __init__(self, path: str = TRANSITION_STATS_FILE):
+        self.path = path
+        self.samples: Dict[TransitionKey, Deque[float]] = {}
+
+    # ───────────────────────────────────────────────────────────
+    # 📝 التسجيل
+    # ───────────────────────────────────────────────────────────
+
+    def record(self, from_status: str, to_status: str, group: str, seconds: float):
+        """تسجيل انتقال واحد وحفظه"""
+        if not from_status or not to_status or seconds < 0:
+            return
+
+        key = (from_status.upper(), to_status.upper(), group or "")
+        bucket = self.samples.get(key)
+        if bucket is None:
+            bucket = self.samples[key] = deque(maxlen=TRANSITION_MAX_SAMPLES)
+        bucket.append(round(seconds, 1))
+
+        logger.debug(f"🔮 {key[0]} → {key[1]} ({key[2]}): {seconds:.1f}s")
+        self.save()
+
+    def _latencies(self, from_status: str, group: str) -> List[float]:
+        """
+        أزمنة الخروج من الحالة (لأي حالة جديدة)
+
+        عينات الجروب لو كفاية، وإلا كل الجروبات مع بعض
+        """
+        from_status = from_status.upper()
+        group_samples: List[float] = []
+        all_samples: List[float] = []
+
+        for (source, _, key_group), bucket in self.samples.items():
+            if source != from_status:
+                continue
+            all_samples.extend(bucket)
+            if key_group == group:
+                group_samples.extend(bucket)
+
+        if len(group_samples) >= TRANSITION_MIN_SAMPLES:
+            return group_samples
+        return all_samples
+
+    # ───────────────────────────────────────────────────────────
+    # ⏱️ جدولة الفحص
+    # ───────────────────────────────────────────────────────────
+
+    def expected_window(
+        self, from_status: str, group: str
+    ) -> Optional[Tuple[float, float]]:
+        """(p10, p90) لزمن الخروج من الحالة - None لو العينات مش كفاية"""
+        latencies = self._latencies(from_status, group)
+        if len(latencies) < TRANSITION_MIN_SAMPLES:
+            return None
+        return _quantile(latencies, 0.1), _quantile(latencies, 0.9)
+
+    def poll_delay(self, from_status: str, group: str, elapsed: float) -> float:
+        """
+        الفاصل قبل الفحص الجاي
+
+        - قبل p10: نص المسافة المتبقية لـ p10 (متباعد وبيقرب كل مرة)
+        - بين p10 و p90: BURST_MODE_INTERVAL (كثيف)
+        - بعد p90: بيتباعد تدريجياً لحد TRANSITION_MAX_POLL_GAP
+        """
+        window = self.expected_window(from_status, group) if from_status else None
+        if window is None:
+            return BURST_MODE_INTERVAL
+
+        low, high = window
+        if elapsed < low:
+            gap = (low - elapsed) / 2
+        elif elapsed <= high:
+            gap = BURST_MODE_INTERVAL
+        else:
+            gap = (elapsed - high) / 2
+
+        return min(max(gap, BURST_MODE_INTERVAL), TRANSITION_MAX_POLL_GAP)
+
+    def summary(self) -> str:
+        total = sum(len(bucket) for bucket in self.samples.values())
+        return f"{len(self.samples)} pairs / {total} samples"
+
+    # ───────────────────────────────────────────────────────────
+    # 💾 الحفظ والتحميل
+    # ───────────────────────────────────────────────────────────
+
+    def save(self):
+        """الحفظ في storage_writer (نسخة من العينات عشان الـ thread)"""
+        data = [
+            {"from": source, "to": target, "group": group, "samples": list(bucket)}
+            for (source, target, group), bucket in self.samples.items()
+        ]
+        storage_writer.write_json(self.path, data)
+
+    @classmethod
+    def load(cls, path: str = TRANSITION_STATS_FILE) -> "TransitionModel":
+        model = cls(path)
+        if not Path(path).exists():
+            return model
+
+        try:
+            for entry in read_json(path, default=[]):
+                key = (entry["from"], entry["to"], entry.get("group", ""))
+                model.samples[key] = deque(
+                    entry["samples"], maxlen=TRANSITION_MAX_SAMPLES
+                )
+        except Exception as e:
+            logger.error(f"❌ Error loading transition stats: {e}")
+
+        return model
+
+
+# Global transition model
+transition_model = TransitionModel.load()